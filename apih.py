@@ -5,36 +5,233 @@
 import os
 import json
 import urllib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tornado.web
+import tornado.gen
+import tornado.locks
+import tornado.ioloop
+import tornado.queues
+import tornado.iostream
 
 import logging
 logger = logging.getLogger(__name__)
 
+import settings
 import core.project as project
 import core.job as job
+import core.runs as runs
+import core.snapshot as snapshot
+import core.cache as cache
 import core.resource as resource
 import core.translation as translation
 import core.repository as repository
 
+# Blocking work of handlers (local file I/O, git commands and queries to translation/resource platforms)
+# runs in thread pools so that IOLoop, which is shared with the scheduler, is not blocked. Platform
+# queries have their own pool so that slow platforms do not hold up local operations.
+_io_executor = ThreadPoolExecutor(max_workers=settings.API_IO_WORKERS)
+_platform_executor = ThreadPoolExecutor(max_workers=settings.API_PLATFORM_WORKERS)
+_semaphores = {} # (handler class name, method name) -> tornado.locks.Semaphore
+
+def _run_io(fn, *args, **kwargs):
+    """ Run a function for local file I/O or git commands in thread pool. Return Future. """
+    return _io_executor.submit(fn, *args, **kwargs)
+
+def _run_platform(fn, *args, **kwargs):
+    """ Run a function which queries translation/resource platforms in thread pool. Return Future. """
+    return _platform_executor.submit(fn, *args, **kwargs)
+
+def _limit_concurrency(max_requests):
+    """ Decorator for a coroutine method of a handler.
+        Requests more than max_requests at a time to the method wait (without blocking IOLoop)
+        for preceding requests to finish.
+    """
+    def decorator(method):
+        @tornado.gen.coroutine
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (type(self).__name__, method.__name__)
+            if not key in _semaphores:
+                _semaphores[key] = tornado.locks.Semaphore(max_requests)
+            with (yield _semaphores[key].acquire()):
+                yield method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _read_lines(path):
+    with open(path) as fi:
+        return fi.readlines()
+
+def _list_git_directories(rootdir):
+    return [f for f in os.listdir(rootdir) if os.path.isdir(os.path.join(rootdir, f, '.git'))]
+
+def _list_directory(path):
+    """ Return list of files and directories in a directory, or None when the directory is not found. """
+    if not os.path.isdir(path):
+        return None
+    results = []
+    for x in os.listdir(path):
+        if os.path.isfile(os.path.join(path, x)):
+            results.append({'type': 'file', 'name': x})
+        elif os.path.isdir(os.path.join(path, x)):
+            results.append({'type': 'dir', 'name': x})
+        else:
+            logger.error("Skipped listing unknwon file type. Path: '{}'.".format(os.path.join(path, x)))
+    return results
+
+class _StringsReader(object):
+    """ Read strings from an iterator in a thread, and pass them to a coroutine through a queue
+        in this order:
+
+            True (or False when func returns None), lists of n strings (at most), then None
+            at the end, or an exception raised while reading.
+
+        The iterator is obtained and exhausted in the reading thread since it might read or
+        write strings with an sqlite connection, which can be used only in the thread where it
+        is created. At most MAX_PENDING items are read ahead of the coroutine: the reading thread
+        waits until the coroutine calls done() for an item it has got, so that memory usage does
+        not depend on how fast a client reads. Reading stops when cancel() is called (e.g. the
+        client disconnected), and the iterator is closed.
+    """
+    MAX_PENDING = 2
+
+    def __init__(self, io_loop, n):
+        self._io_loop = io_loop
+        self._n = n
+        # one more than MAX_PENDING for an item put by the reading thread when it is cancelled.
+        self._queue = tornado.queues.Queue(maxsize=self.MAX_PENDING + 1)
+        self._pending = threading.Semaphore(self.MAX_PENDING)
+        self._cancelled = threading.Event()
+
+    def _put(self, x):
+        """ Wait until the number of pending items goes below MAX_PENDING, then put x to the queue.
+            Return False when cancelled.
+        """
+        self._pending.acquire()
+        if self._cancelled.is_set():
+            return False
+        self._io_loop.add_callback(self._queue.put_nowait, x)
+        return True
+
+    def read(self, func, *args):
+        """ Call func to obtain an iterator of strings and read all of them. Call this in a thread. """
+        it = None
+        try:
+            it = func(*args)
+            if not self._put(it != None) or it == None:
+                return
+            l = []
+            for x in it:
+                l.append(x)
+                if len(l) >= self._n:
+                    if not self._put(l):
+                        return
+                    l = []
+            if l and not self._put(l):
+                return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+        finally:
+            if hasattr(it, 'close'):
+                it.close()
+
+    def get(self):
+        """ Return a future of the next item. Call done() when the item is processed. """
+        return self._queue.get()
+
+    def done(self):
+        self._pending.release()
+
+    def cancel(self):
+        """ Stop reading. Call this in IOLoop thread. Future of get() results in None when the
+            queue is empty.
+        """
+        if self._cancelled.is_set():
+            return
+        self._cancelled.set()
+        self._pending.release()
+        if self._queue.empty():
+            self._queue.put_nowait(None)
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+def _get_list_argument(handler, name):
+    """ Return list of values of a query argument. Values are given as comma separated list and/or repeated arguments. """
+    results = []
+    for v in handler.get_arguments(name):
+        for x in v.split(','):
+            x = x.strip()
+            if x:
+                results.append(x)
+    return results
+
 class JobExecutionHandler(tornado.web.RequestHandler):
+    """
+    Queue a job to be executed. Returns the run of the job.
+    """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def post(self, param):
         job_id = urllib.unquote(param)
-        c = job.get_configuration(id=job_id)
+        c = yield _run_io(job.get_configuration, id=job_id)
         if c:
-            job.execute(c)
+            run_id = job.submit(self.settings['scheduler'], c)
+            self.finish(json.dumps(runs.to_dict(job.get_run(run_id))))
         else:
             logger.error("Faild to get configuration for job. id: '{}'.".format(job_id))
+            self.set_status(404)
+            self.finish("<html><body>Job not found. id: '{}'.</body></html>".format(job_id))
+
+class JobRunsHandler(tornado.web.RequestHandler):
+    """
+    Runs of a job in the scheduler, the most recent first.
+    """
+    def get(self, param):
+        job_id = urllib.unquote(param)
+        self.finish(json.dumps([runs.to_dict(x) for x in runs.select(job_id)]))
+
+class RunStatusHandler(tornado.web.RequestHandler):
+    """
+    State of a run.
+    """
+    def get(self, param):
+        run_id = urllib.unquote(param)
+        r = job.get_run(run_id)
+        if r:
+            self.finish(json.dumps(runs.to_dict(r)))
+        else:
+            self.set_status(404)
+            self.finish("<html><body>Run not found. id: '{}'.</body></html>".format(run_id))
+
+class RunCancelHandler(tornado.web.RequestHandler):
+    """
+    Cancel a queued or running run. Returns the run.
+    """
+    def post(self, param):
+        run_id = urllib.unquote(param)
+        r = job.cancel_run(run_id)
+        if r:
+            self.finish(json.dumps(runs.to_dict(r)))
+        else:
+            self.set_status(404)
+            self.finish("<html><body>Run not found. id: '{}'.</body></html>".format(run_id))
 
 class JobResourceSlugsHandler(tornado.web.RequestHandler):
     """ 
     Returns resource/slug information for given job.
     The job has to be resource uploader job.
     """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        j = job.get_details(job_id)
+        j = yield _run_io(job.get_details, job_id)
         if j.class_name == 'ResourceUploaderJob':
-            r = resource.get_details(j.resource_config_filename)
+            r = yield _run_io(resource.get_details, j.resource_config_filename)
             if r:
                 resources = []
                 for res in r.resources:
@@ -42,9 +239,9 @@ class JobResourceSlugsHandler(tornado.web.RequestHandler):
             else:
                 self.set_status(500)
                 self.finish("<html><body>Failed to get resource details from '{}'.</body></html>".format(j.resource_config_filename))
-            t = translation.get_details(j.translation_config_filename)
+            t = yield _run_io(translation.get_details, j.translation_config_filename)
             if t:
-                results = job.get_resource_slugs(t.platform, t.project_name, r.name, resources)
+                results = yield _run_platform(job.get_resource_slugs, t.platform, t.project_name, r.name, resources)
                 if results:
                     try:
                         data = json.dumps(results) # results is list of dictionary.
@@ -68,11 +265,13 @@ class JobTranslationSlugsHandler(tornado.web.RequestHandler):
     Returns slug/name information for given job.
     The job has to be resource uploader job.
     """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        j = job.get_details(job_id)
+        j = yield _run_io(job.get_details, job_id)
         if j.class_name == 'ResourceUploaderJob':
-            r = resource.get_details(j.resource_config_filename)
+            r = yield _run_io(resource.get_details, j.resource_config_filename)
             if r:
                 resources = []
                 for res in r.resources:
@@ -80,9 +279,9 @@ class JobTranslationSlugsHandler(tornado.web.RequestHandler):
             else:
                 self.set_status(500)
                 self.finish("<html><body>Failed to get resource details from '{}'.</body></html>".format(j.resource_config_filename))
-            t = translation.get_details(j.translation_config_filename)
+            t = yield _run_io(translation.get_details, j.translation_config_filename)
             if t:
-                results = job.get_translation_slugs(t.platform, t.project_name)
+                results = yield _run_platform(job.get_translation_slugs, t.platform, t.project_name)
             else:
                 self.set_status(500)
                 self.finish("<html><body>Failed to get translation details from '{}'.</body></html>".format(j.translation_config_filename))
@@ -101,9 +300,11 @@ class JobTranslationSlugsHandler(tornado.web.RequestHandler):
 
 class JobTranslationStatusHandler(tornado.web.RequestHandler):
     """ Translation status for a job. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        results = job.get_translation_status(job_id)
+        results = yield _run_platform(job.get_translation_status, job_id)
         try:
             data = json.dumps(results)
         except ValueError as e:
@@ -117,13 +318,15 @@ class JobSyncStatusHandler(tornado.web.RequestHandler):
     Sync status for a job.
     Currently, sync status is only applicable to resource uploader job or translation uploader job.
     """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        j = job.get_details(job_id)
+        j = yield _run_io(job.get_details, job_id)
         if j.class_name == 'ResourceUploaderJob':
             # get resource repository name from resource configuration because translation configuration can contain
             # multiple resource repositories.
-            r = resource.get_details(j.resource_config_filename)
+            r = yield _run_io(resource.get_details, j.resource_config_filename)
             if r:
                 resources = []
                 for res in r.resources:
@@ -131,16 +334,16 @@ class JobSyncStatusHandler(tornado.web.RequestHandler):
             else:
                 self.set_status(500)
                 self.finish("<html><body>Failed to get resource details from '{}'.</body></html>".format(j.resource_config_filename))
-            t = translation.get_details(j.translation_config_filename)
+            t = yield _run_io(translation.get_details, j.translation_config_filename)
             if t:
-                results = job.get_sync_status(job_id=job_id, job_class=j.class_name, translation_platform=t.platform, translation_project_name=t.project_name, resource_repository_name=r.name, resources=resources)
+                results = yield _run_platform(job.get_sync_status, job_id=job_id, job_class=j.class_name, translation_platform=t.platform, translation_project_name=t.project_name, resource_repository_name=r.name, resources=resources)
             else:
                 self.set_status(500)
                 self.finish("<html><body>Failed to get translation details from '{}'.</body></html>".format(j.translation_config_filename))
         elif j.class_name == 'TranslationUploaderJob':
-            r = resource.get_details(j.resource_config_filename)
+            r = yield _run_io(resource.get_details, j.resource_config_filename)
             if r:
-                results = job.get_sync_status(job_id=job_id, job_class=j.class_name, resource_platform=r.platform, repository_owner=r.owner, repository_name=r.name)
+                results = yield _run_platform(job.get_sync_status, job_id=job_id, job_class=j.class_name, resource_platform=r.platform, repository_owner=r.owner, repository_name=r.name)
             else:
                 self.set_status(500)
                 self.finish("<html><body>Failed to get resource details from '{}'.</body></html>".format(j.resource_config_filename))
@@ -161,14 +364,16 @@ class JobExecStatusHandler(tornado.web.RequestHandler):
     """ 
     Exec status for a job.
     """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        c = job.get_configuration(job_id=job_id)
+        c = yield _run_io(job.get_configuration, job_id=job_id)
         if not c:
             self.set_status(500)
             self.finish("<html><body>Failed to get resource configuration for: '{}'.</body></html>".format(job_id))
        
-        lists = job.get_execution_status(job_id)
+        lists = yield _run_io(job.get_execution_status, job_id)
         if lists:
             temp = []
             for l in lists:
@@ -184,17 +389,52 @@ class JobExecStatusHandler(tornado.web.RequestHandler):
         else:
             self.finish('{}')
 
+class ListJobExecStatusHandler(tornado.web.RequestHandler):
+    """ 
+    The most recent exec status for each job.
+    """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self):
+        l = []
+        statuses = yield _run_io(job.get_latest_execution_status)
+        for x in statuses:
+            l.append(job.to_dict(x))
+
+        try:
+            results = json.dumps(l)
+        except ValueError as e:
+            self.set_status(500)
+            self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
+        else:
+            self.finish(results)
+
+class SchedulerStatsHandler(tornado.web.RequestHandler):
+    """ 
+    Number of queued/running jobs per repository and lock wait time.
+    """
+    def get(self):
+        try:
+            results = json.dumps(job.get_scheduler_stats())
+        except ValueError as e:
+            self.set_status(500)
+            self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
+        else:
+            self.finish(results)
+
 class JobResourceDetailsHandler(tornado.web.RequestHandler):
     """ Details of resource for a job.
         The job should be ResourceUploaderJob.
     """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        j = job.get_details(job_id)
+        j = yield _run_io(job.get_details, job_id)
         if j.class_name != 'ResourceUploaderJob':
             self.set_status(500)
             self.finish("<html><body>API resource/details is not applicable for this type of job: '{}'.</body></html>".format(j.class_name))
-        results = resource.get_details(j.resource_config_filename)
+        results = yield _run_io(resource.get_details, j.resource_config_filename)
         if not results:
             self.set_status(500)
             self.finish("<html><body>Failed to get resource details from: '{}'.</body></html>".format(j.resource_config_filename))
@@ -208,9 +448,11 @@ class JobResourceDetailsHandler(tornado.web.RequestHandler):
 
 class JobDetailsHandler(tornado.web.RequestHandler):
     """ Details for a job. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        results = job.get_details(job_id)
+        results = yield _run_io(job.get_details, job_id)
         try:
             data = json.dumps(job.to_dict(results))
         except ValueError as e:
@@ -221,9 +463,11 @@ class JobDetailsHandler(tornado.web.RequestHandler):
 
 class JobSummaryHandler(tornado.web.RequestHandler):
     """ Summary for a job. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        results = job.get_summary(job_id=job_id)
+        results = yield _run_io(job.get_summary, job_id=job_id)
         try:
             data = json.dumps(job.to_dict(results))
         except ValueError as e:
@@ -234,8 +478,10 @@ class JobSummaryHandler(tornado.web.RequestHandler):
 
 class ListJobSummaryHandler(tornado.web.RequestHandler):
     """ List of summary for jobs. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self):
-        data = job.get_summary()
+        data = yield _run_io(job.get_summary)
         l = []
         for d in data:
             l.append(job.to_dict(d))
@@ -248,11 +494,53 @@ class ListJobSummaryHandler(tornado.web.RequestHandler):
         else:
             self.finish(j)
 
+class ListJobDetailsHandler(tornado.web.RequestHandler):
+    """ List of details for jobs specified by 'ids' (comma separated job ids). """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self):
+        job_ids = _get_list_argument(self, 'ids')
+        if not job_ids:
+            self.set_status(400)
+            self.finish("<html><body>No job ids specified.</body></html>")
+            return
+        l = yield _run_io(job.get_details_of_jobs, job_ids)
+        try:
+            data = json.dumps([job.to_dict(x) for x in l])
+        except ValueError as e:
+            self.set_status(500)
+            self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
+        else:
+            self.finish(data)
+
+class ListJobSyncStatusHandler(tornado.web.RequestHandler):
+    """ List of sync status for jobs specified by 'ids' (comma separated job ids).
+        Sync status is only applicable to resource uploader job or translation uploader job.
+    """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self):
+        job_ids = _get_list_argument(self, 'ids')
+        if not job_ids:
+            self.set_status(400)
+            self.finish("<html><body>No job ids specified.</body></html>")
+            return
+        l = yield _run_platform(job.get_sync_status_of_jobs, job_ids)
+        try:
+            data = json.dumps([job.to_dict(x) for x in l])
+        except ValueError as e:
+            self.set_status(500)
+            self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
+        else:
+            self.finish(data)
+
 class ProjectTranslationStatusHandler(tornado.web.RequestHandler):
     """ Translation status for each language. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         project_id = urllib.unquote(param)
-        list_status = project.get_translation_status(project_id)
+        list_status = yield _run_platform(project.get_translation_status, project_id)
         if list_status:
             results = []
             for status in list_status:
@@ -271,14 +559,16 @@ class ProjectTranslationStatusHandler(tornado.web.RequestHandler):
 
 class ProjectResourceDetailsHandler(tornado.web.RequestHandler):
     """ Details of resources for a prject. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         project_id = urllib.unquote(param)
-        p = project.get_details(id=project_id)
+        p = yield _run_io(project.get_details, id=project_id)
         if p:
             for job_id in p.jobs:
-                j = job.get_details(job_id)
+                j = yield _run_io(job.get_details, job_id)
                 if j.class_name == 'ResourceUploaderJob':
-                    results = resource.get_details(j.resource_config_filename)
+                    results = yield _run_io(resource.get_details, j.resource_config_filename)
                     try:
                         data = json.dumps(resource.to_dict(results))
                     except ValueError as e:
@@ -293,9 +583,11 @@ class ProjectResourceDetailsHandler(tornado.web.RequestHandler):
 
 class ProjectDetailsHandler(tornado.web.RequestHandler):
     """ Details for a project. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         project_id = urllib.unquote(param)
-        p = project.get_details(id=project_id)
+        p = yield _run_io(project.get_details, id=project_id)
         if p:
             try:
                 data = json.dumps(project.to_dict(p))
@@ -308,11 +600,39 @@ class ProjectDetailsHandler(tornado.web.RequestHandler):
             self.set_status(500)
             self.finish("<html><body>Failed to get project details for id: '{}'.</body></html>".format(project_id))
 
+class ProjectOverviewHandler(tornado.web.RequestHandler):
+    """ Snapshot of details, resources, translation status and job sync status for a project, with its age.
+        Snapshot is refreshed in background, so that translation/resource platforms are not queried
+        except for the first snapshot of a project, which is waited for in the refresh queue.
+    """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self, param):
+        project_id = urllib.unquote(param)
+        o = yield _run_io(snapshot.get, project_id)
+        if not o:
+            p = yield _run_io(project.get_details, id=project_id)
+            if p:
+                o = yield snapshot.request_refresh(project_id)
+        if o:
+            try:
+                data = json.dumps(snapshot.to_dict(o))
+            except ValueError as e:
+                self.set_status(500)
+                self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
+            else:
+                self.finish(data)
+        else:
+            self.set_status(404)
+            self.finish("<html><body>Project snapshot is not available for id: '{}'.</body></html>".format(project_id))
+
 class ListProjectSummaryHandler(tornado.web.RequestHandler):
     """ List of projects. """ 
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self):
         results = []
-        projects = project.get_summary()
+        projects = yield _run_io(project.get_summary)
         if projects:
             for p in projects:
                 results.append(project.to_dict(p))
@@ -331,18 +651,19 @@ class ListProjectSummaryHandler(tornado.web.RequestHandler):
 
 class LogContextHandler(tornado.web.RequestHandler):
     """ Raw context of a text log. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param):
         log_path = urllib.unquote(param)
         if os.path.isfile(log_path):
-            with open(log_path) as fi:
-                lines = fi.readlines()
-                try:
-                    data = json.dumps(lines)
-                except ValueError as e:
-                    self.set_status(500)
-                    self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
-                else:
-                    self.finish(data)
+            lines = yield _run_io(_read_lines, log_path)
+            try:
+                data = json.dumps(lines)
+            except ValueError as e:
+                self.set_status(500)
+                self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
+            else:
+                self.finish(data)
         else:
             self.set_status(500)
             self.finish("<html><body>Failed to get log context. File not found: '{}'.</body></html>".format(log_path))
@@ -350,8 +671,10 @@ class LogContextHandler(tornado.web.RequestHandler):
 # NOT USING now but keep it for a while
 class ConfigurationHandler(tornado.web.RequestHandler):
     """ Raw context of a configuration file. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, job_id, key): # key is attribute name of resource or translation configuration file in job configuration file.
-        lists = job.get_configuration(job_id=job_id)
+        lists = yield _run_io(job.get_configuration, job_id=job_id)
         if lists:
             try:
                 v = getattr(lists[0], key)
@@ -360,7 +683,7 @@ class ConfigurationHandler(tornado.web.RequestHandler):
                 self.finish("<html><body>Failed to get a value in configuration. job_id: '{}', key: '{}'.</body></html>".format(job_id, key))
             else:
                 if key == 'resource_config_filename':
-                    c = resource.get_configuration(filename=v)
+                    c = yield _run_io(resource.get_configuration, filename=v)
                     try:
                         data = json.dumps(resource.to_dict(c))
                     except ValueError as e:
@@ -369,7 +692,7 @@ class ConfigurationHandler(tornado.web.RequestHandler):
                     else:
                         self.finish(data)
                 elif key == 'translation_config_filename':
-                    translation.get_configuration(filename=v)
+                    yield _run_io(translation.get_configuration, filename=v)
                     try:
                         data = json.dumps(translation.to_dict(c))
                     except ValueError as e:
@@ -386,9 +709,11 @@ class ConfigurationHandler(tornado.web.RequestHandler):
 
 class ResourceConfigurationHandler(tornado.web.RequestHandler):
     """ Raw context of a resource configuration file. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param): # resource config filename
         filename = urllib.unquote(param)
-        c = resource.get_configuration(filename=filename)
+        c = yield _run_io(resource.get_configuration, filename=filename)
         if c:
             try:
                 data = json.dumps(resource.to_dict(c))
@@ -401,6 +726,8 @@ class ResourceConfigurationHandler(tornado.web.RequestHandler):
             self.set_status(500)
             self.finish("<html><body>Failed to get resource configuration file context. filename '{}'.</body></html>".format(filename))
 
+    @_limit_concurrency(1)
+    @tornado.gen.coroutine
     def post(self, resource_configuration_filename):
         config = urllib.unquote(resource_configuration_filename)
         try:
@@ -409,8 +736,9 @@ class ResourceConfigurationHandler(tornado.web.RequestHandler):
             self.set_status(500)
             self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(e))
         else: 
-            r = resource.update_configuration(config, j)
+            r = yield _run_io(resource.update_configuration, config, j)
             if r:
+                _io_executor.submit(repository.remove_unused_worktrees) # e.g. branch is changed.
                 try:
                     s = json.dumps(resource.to_dict(r))
                 except ValueError as e:
@@ -424,9 +752,11 @@ class ResourceConfigurationHandler(tornado.web.RequestHandler):
 
 class TranslationConfigurationHandler(tornado.web.RequestHandler):
     """ Raw context of a translation configuration file. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, param): # translation config filename
         filename = urllib.unquote(param)
-        c = translation.get_configuration(filename=filename)
+        c = yield _run_io(translation.get_configuration, filename=filename)
         if c:
             try:
                 data = json.dumps(translation.to_dict(c))
@@ -441,9 +771,11 @@ class TranslationConfigurationHandler(tornado.web.RequestHandler):
 
 class ListTranslationProjectsHandler(tornado.web.RequestHandler):
     """ Return list of summary of projects in translation repository. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, arg): # translation platform name
         platform = urllib.unquote(arg)
-        l = translation.get_platform_projects(platform)
+        l = yield _run_platform(translation.get_platform_projects, platform)
         if l == None:
             self.set_status(400)
             self.finish("<html><body>Failed to obtain translation project listings for: '{}'.</body></html>".format(str(platform)))
@@ -461,10 +793,12 @@ class ListTranslationProjectsHandler(tornado.web.RequestHandler):
 
 class TranslationProjectDetailsHandler(tornado.web.RequestHandler):
     """ Return details of a project in translation repository. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, arg1, arg2):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
-        d = translation.get_platform_project_details(platform, pslug)
+        d = yield _run_platform(translation.get_platform_project_details, platform, pslug)
         if d == None:
             self.set_status(400)
             self.finish("<html><body>Failed to obtain translation project details. Platform: '{}', Slug: '{}'.</body></html>".format(platform, pslug))
@@ -479,11 +813,13 @@ class TranslationProjectDetailsHandler(tornado.web.RequestHandler):
 
 class TranslationResourceDetailsHandler(tornado.web.RequestHandler):
     """ Return resource details for a resource in translation repository project. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, arg1, arg2, arg3):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
         rslug = urllib.unquote(arg3)
-        d = translation.get_platform_project_resource_details(platform, pslug, rslug)
+        d = yield _run_platform(translation.get_platform_project_resource_details, platform, pslug, rslug)
         if d == None:
             self.set_status(400)
             self.finish("<html><body>Failed to obtain translation project resource details. Platform: '{}', Pslug: '{}', Rslug: '{}'.</body></html>".format(platform, pslug, rslug))
@@ -496,31 +832,96 @@ class TranslationResourceDetailsHandler(tornado.web.RequestHandler):
             else:
                 self.finish(j)
 
-class TranslationTranslationStringsHandler(tornado.web.RequestHandler):
-    """ Return list of translation strings for language of a resource in translation repository project. """
-    def get(self, arg1, arg2, arg3, arg4):
+class TranslationResourcesDetailsHandler(tornado.web.RequestHandler):
+    """ Return list of resource details for resources specified by 'slugs' (comma separated resource slugs),
+        or all resources in translation repository project when not specified.
+    """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self, arg1, arg2):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
-        rslug = urllib.unquote(arg3)
-        lang = urllib.unquote(arg4)
-        d = translation.get_platform_project_translation_strings(platform, pslug, rslug, lang)
-        if d == None:
+        rslugs = _get_list_argument(self, 'slugs')
+        l = yield _run_platform(translation.get_platform_project_resources_details, platform, pslug, rslugs if rslugs else None)
+        if l == None:
             self.set_status(400)
-            self.finish("<html><body>Failed to obtain translation project translation strings. Platform: '{}', Pslug: '{}', Rslug: '{}', Lang: '{}'.</body></html>".format(platform, pslug, rslug, lang))
+            self.finish("<html><body>Failed to obtain translation project resource details. Platform: '{}', Pslug: '{}'.</body></html>".format(platform, pslug))
         else:
             try:
-                l = []
-                for x in d:
-                    l.append(translation.to_dict(x))
-                j = json.dumps(l)
+                j = json.dumps([translation.to_dict(x) for x in l])
             except ValueError as e:
                 self.set_status(500)
                 self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(str(e)))
             else:
                 self.finish(j)
 
+class TranslationTranslationStringsHandler(tornado.web.RequestHandler):
+    """ Return list of translation strings for language of a resource in translation repository project.
+        Strings are written as they are read (chunked), so that all of them need not to be in memory.
+    """
+    # number of strings written before flushing.
+    FLUSH_INTERVAL = 500
+
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self, arg1, arg2, arg3, arg4):
+        platform = urllib.unquote(arg1)
+        pslug = urllib.unquote(arg2)
+        rslug = urllib.unquote(arg3)
+        lang = urllib.unquote(arg4)
+        reader = _StringsReader(tornado.ioloop.IOLoop.current(), self.FLUSH_INTERVAL)
+        self._reader = reader
+        _platform_executor.submit(reader.read, translation.iter_platform_project_translation_strings, platform, pslug, rslug, lang)
+        try:
+            x = yield reader.get()
+            reader.done()
+            if reader.is_cancelled():
+                return
+            if x != True:
+                if isinstance(x, Exception):
+                    logger.error("Failed to obtain translation strings. Reason: '{}'.".format(x))
+                self.set_status(400)
+                self.finish("<html><body>Failed to obtain translation project translation strings. Platform: '{}', Pslug: '{}', Rslug: '{}', Lang: '{}'.</body></html>".format(platform, pslug, rslug, lang))
+                return
+
+            self.set_header('Content-Type', 'application/json; charset=UTF-8')
+            self.write('[')
+            n = 0
+            while True:
+                # strings are read from translation platform (or string store) in thread pool.
+                l = yield reader.get()
+                if reader.is_cancelled():
+                    return
+                if l == None:
+                    break
+                if isinstance(l, Exception):
+                    # response has been started. it is finished without closing the array so that the
+                    # client fails to parse it.
+                    logger.error("Failed to obtain translation strings after {} strings. Reason: '{}'.".format(n, l))
+                    self.finish()
+                    return
+                for x in l:
+                    if n > 0:
+                        self.write(',')
+                    self.write(json.dumps(translation.to_dict(x)))
+                    n += 1
+                yield self.flush()
+                reader.done()
+            self.finish(']')
+        except tornado.iostream.StreamClosedError:
+            logger.info("Client disconnected while writing translation strings. Platform: '{}', Pslug: '{}', Rslug: '{}', Lang: '{}'.".format(platform, pslug, rslug, lang))
+        finally:
+            reader.cancel()
+
+    def on_connection_close(self):
+        reader = getattr(self, '_reader', None)
+        if reader:
+            reader.cancel()
+
 class TranslationSourceStringDetailsHandler(tornado.web.RequestHandler):
     """ Return details for a source string in translation repository project. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, arg1, arg2, arg3, arg4):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
@@ -529,7 +930,7 @@ class TranslationSourceStringDetailsHandler(tornado.web.RequestHandler):
 
         string_id = translation.get_platform_string_id(platform=platform, string_key=string_key)
         if string_id:
-            d = translation.get_platform_project_source_string_details(platform, pslug, rslug, string_id)
+            d = yield _run_platform(translation.get_platform_project_source_string_details, platform, pslug, rslug, string_id)
             if d == None:
                 self.set_status(400)
                 self.finish("<html><body>Failed to obtain translation project source string details. Platform: '{}', Pslug: '{}', Rslug: '{}', StringKey: '{}'.</body></html>".format(platform, pslug, rslug, string_key))
@@ -545,15 +946,88 @@ class TranslationSourceStringDetailsHandler(tornado.web.RequestHandler):
             self.set_status(400)
             self.finish("<html><body>Failed to obtain sting id for source string details. Platform: '{}', Pslug: '{}', Rslug: '{}', StringKey: '{}'.</body></html>".format(platform, pslug, rslug, string_key))
 
+class TranslationSearchHandler(tornado.web.RequestHandler):
+    """ Return list of strings which contain words in query, across projects in translation repository. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self, arg):
+        platform = urllib.unquote(arg)
+        q = self.get_argument('q', '')
+        lang = self.get_argument('lang', None)
+        try:
+            limit = int(self.get_argument('limit', 50))
+        except ValueError as e:
+            self.set_status(400)
+            self.finish("<html><body>Invalid limit. Reason: '{}'.</body></html>".format(str(e)))
+            return
+        l = yield _run_io(translation.search_platform_strings, platform, q, lang, limit)
+        if l == None:
+            self.set_status(500)
+            self.finish("<html><body>Failed to search strings. Platform: '{}', Query: '{}'.</body></html>".format(platform, q))
+        else:
+            try:
+                j = json.dumps([translation.to_dict(x) for x in l])
+            except ValueError as e:
+                self.set_status(500)
+                self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(str(e)))
+            else:
+                self.finish(j)
+
+class TranslationSourceStringsPrefetchHandler(tornado.web.RequestHandler):
+    """ Obtain details of all source strings of a resource in translation repository project in bulk. """
+    @_limit_concurrency(settings.API_PLATFORM_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def post(self, arg1, arg2, arg3):
+        platform = urllib.unquote(arg1)
+        pslug = urllib.unquote(arg2)
+        rslug = urllib.unquote(arg3)
+        n = yield _run_platform(translation.prefetch_platform_project_source_string_details, platform, pslug, rslug)
+        if n == None:
+            self.set_status(400)
+            self.finish("<html><body>Failed to prefetch source string details. Platform: '{}', Pslug: '{}', Rslug: '{}'.</body></html>".format(platform, pslug, rslug))
+        else:
+            self.finish(json.dumps({'platform': platform, 'project_slug': pslug, 'resource_slug': rslug, 'num_strings': n}))
+
+class CacheStatsHandler(tornado.web.RequestHandler):
+    """ Return stats (hits, misses, evictions etc.) of cache for translation platform queries. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def get(self):
+        stats = yield _run_io(cache.get_stats)
+        try:
+            j = json.dumps(stats)
+        except ValueError as e:
+            self.set_status(500)
+            self.finish("<html><body>Failed to json.load(). Reason: '{}'.</body></html>".format(str(e)))
+        else:
+            self.finish(j)
+
+class CacheInvalidationHandler(tornado.web.RequestHandler):
+    """ Invalidate cache for a project or a resource in translation platform. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
+    def post(self, arg1, arg2, arg3=None):
+        platform = urllib.unquote(arg1)
+        pslug = urllib.unquote(arg2)
+        rslug = urllib.unquote(arg3) if arg3 else None
+        n = yield _run_io(cache.invalidate, platform, pslug, rslug)
+        if n == None:
+            self.set_status(400)
+            self.finish("<html><body>Invalid cache entry. Platform: '{}', Pslug: '{}', Rslug: '{}'.</body></html>".format(platform, pslug, rslug))
+            return
+        self.finish(json.dumps({'platform': platform, 'project_slug': pslug, 'resource_slug': rslug, 'invalidated': n}))
+
 class ListLocalRepositoriesHandler(tornado.web.RequestHandler):
     """ Return list of git directories under local repo directory. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self):
-        rootdir = repository.get_local_repository_directory()
+        rootdir = yield _run_io(repository.get_local_repository_directory)
         if rootdir == None:
             self.set_status(500)
             self.finish("<html><body>Local repository directory not found.</body></html>")
         else:
-            l = [f for f in os.listdir(rootdir) if os.path.isdir(os.path.join(rootdir, f, '.git'))]
+            l = yield _run_io(_list_git_directories, rootdir)
             try:
                 j  = json.dumps(l)
             except ValueError as e:
@@ -564,22 +1038,18 @@ class ListLocalRepositoriesHandler(tornado.web.RequestHandler):
 
 class ListLocalRepositoryFilesHandler(tornado.web.RequestHandler):
     """ Return list of specified directory in local repo directory. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, arg1, arg2): # arg1: repository name, arg2: relative path in the repository
-        rootdir = repository.get_local_repository_directory()
-        if rootdir == None:
+        branch = self.get_argument('branch', default=None) # branch worktree, when settings.GIT_WORKTREE_PER_BRANCH.
+        workdir = yield _run_io(repository.get_local_repository_work_directory, urllib.unquote(arg1), branch)
+        if workdir == None:
             self.set_status(500)
             self.finish("<html><body>Local repository directory not found.</body></html>")
         else:
-            fullpath = os.path.join(rootdir, urllib.unquote(arg1), urllib.unquote(arg2))   
-            if os.path.isdir(fullpath):
-                r = []
-                for x in os.listdir(fullpath):
-                    if os.path.isfile(os.path.join(fullpath, x)):
-                        r.append({'type': 'file', 'name': x})
-                    elif os.path.isdir(os.path.join(fullpath, x)):
-                        r.append({'type': 'dir', 'name': x})
-                    else:
-                        logger.error("Skipped listing unknwon file type. Path: '{}'.".format(os.path.join(fullpath, x)))
+            fullpath = os.path.join(workdir, urllib.unquote(arg2))
+            r = yield _run_io(_list_directory, fullpath)
+            if r != None:
                 try:
                     j = json.dumps(r)
                 except ValueError as e:
@@ -593,14 +1063,16 @@ class ListLocalRepositoryFilesHandler(tornado.web.RequestHandler):
 
 class ListLocalRepositoryBranchesHandler(tornado.web.RequestHandler):
     """ Return list of branch names for specified local repository. """
+    @_limit_concurrency(settings.API_ENDPOINT_CONCURRENCY)
+    @tornado.gen.coroutine
     def get(self, arg):
-        rootdir = repository.get_local_repository_directory()
+        rootdir = yield _run_io(repository.get_local_repository_directory)
         if rootdir == None:
             self.set_status(500)
             self.finish("<html><body>Local repository directory not found.</body></html>")
         else:
             repo = os.path.join(rootdir, urllib.unquote(arg))   
-            l = repository.get_local_repository_branches(repo)
+            l = yield _run_io(repository.get_local_repository_branches, repo)
             if l != None:
                 try:
                     j = json.dumps(l)
@@ -611,5 +1083,5 @@ class ListLocalRepositoryBranchesHandler(tornado.web.RequestHandler):
                     self.finish(j)
             else:
                 self.set_status(500)
-                self.finish("<html><body>Failed to obtain local repository branches. Repository: '{}'.</body></html>".format(urllib.unquote(arg2)))
+                self.finish("<html><body>Failed to obtain local repository branches. Repository: '{}'.</body></html>".format(urllib.unquote(arg)))
 
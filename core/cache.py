@@ -0,0 +1,288 @@
+'''
+    Cache
+
+    Query results from translation platforms are cached as files in CACHE_DIR.
+
+        CACHE_DIR/<platform>/projects/projects.cache                                entry type: 'projects'
+        CACHE_DIR/<platform>/projects/<pslug>/project.cache                         entry type: 'project'
+        CACHE_DIR/<platform>/projects/<pslug>/<rslug>/resource.cache                entry type: 'resource'
+
+    Translation strings (entry type: 'strings') and source string details (entry type:
+    'source') are stored in string store (see stringstore.py). Cache files for them written
+    before (strings.<lang>.cache and source/<string id>.cache in the resource directory) are
+    removed when strings of the resource are stored (see remove_legacy_string_files()).
+
+    A cache file is used only within time-to-live of its entry type (CACHE_TTL_SECONDS).
+    When total size of cache files exceeds CACHE_MAX_BYTES, least recently used files are
+    evicted. Files are written atomically (written to a temporary file, then renamed).
+
+    Cache files are written by several processes (e.g. server and uploader workers). On each
+    write, total size is recomputed from CACHE_DIR with CACHE_DIR/.lock locked (flock), and
+    last access of a cache file is recorded as its atime, so that the budget and the order of
+    eviction are shared by all processes.
+
+'''
+import os
+import sys
+import time
+import codecs
+import fcntl
+import shutil
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+import settings
+import core.stringstore as stringstore
+
+CACHE_FILE_EXTENSION = '.cache'
+
+_lock = threading.Lock()
+_entries = None # path -> [size, last access time]. Loaded from CACHE_DIR on first use.
+_total_bytes = 0
+_counters = {'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0, 'invalidations': 0}
+
+def _get_resource_dir(platform, pslug, rslug):
+    return os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, rslug)
+
+def get_path(platform, entry_type, pslug=None, rslug=None):
+    """ Return path to cache file for an entry, or None for unknown entry type.
+        Directory for the file is created.
+
+        entry type              arguments
+        ----------------------------------------------------------------------
+        projects                -
+        project                 pslug
+        resource                pslug, rslug
+    """
+    if entry_type == 'projects':
+        path = os.path.join(settings.CACHE_DIR, platform, 'projects', 'projects.cache')
+    elif entry_type == 'project':
+        path = os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, 'project.cache')
+    elif entry_type == 'resource':
+        path = os.path.join(_get_resource_dir(platform, pslug, rslug), 'resource.cache')
+    else:
+        logger.error("Unknown cache entry type: '{}'.".format(entry_type))
+        return None
+
+    d = os.path.dirname(path)
+    if not os.path.isdir(d):
+        try:
+            os.makedirs(d)
+        except OSError as e:
+            if not os.path.isdir(d):
+                logger.error("Failed to create directory: '{}'. Reason: {}".format(d, e))
+    return path
+
+def _scan():
+    """ Return tuple of (index of cache files in CACHE_DIR, total size). """
+    entries = {}
+    total = 0
+    for root, dirs, files in os.walk(settings.CACHE_DIR):
+        for f in files:
+            if not f.endswith(CACHE_FILE_EXTENSION):
+                continue
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries[path] = [st.st_size, max(st.st_atime, st.st_mtime)]
+            total += st.st_size
+    return entries, total
+
+def _load_entries():
+    """ Build index of cache files. Call this with _lock held. """
+    global _entries, _total_bytes
+    if _entries != None:
+        return
+    _entries, _total_bytes = _scan()
+
+def _remove_entry(path):
+    """ Remove a cache file. Call this with _lock held. """
+    global _total_bytes
+    x = _entries.pop(path, None)
+    if x:
+        _total_bytes -= x[0]
+    try:
+        os.remove(path)
+    except OSError as e:
+        if os.path.isfile(path):
+            logger.error("Failed to remove cache file: '{}'. Reason: '{}'.".format(path, e))
+
+def _evict():
+    """ Evict least recently used files while total size exceeds the budget. Call this with _lock held.
+        Index of cache files is rebuilt from CACHE_DIR, since other processes write cache files.
+    """
+    global _entries, _total_bytes
+    try:
+        fo = open(os.path.join(settings.CACHE_DIR, '.lock'), 'a')
+    except (IOError, OSError) as e:
+        logger.error("Failed to open cache lock file. Reason: '{}'.".format(e))
+        return
+    try:
+        fcntl.flock(fo, fcntl.LOCK_EX)
+        entries, total = _scan()
+        for path, x in entries.items():
+            if path in _entries:
+                x[1] = max(x[1], _entries[path][1])
+        _entries, _total_bytes = entries, total
+        if _total_bytes <= settings.CACHE_MAX_BYTES:
+            return
+        for path, x in sorted(_entries.items(), key=lambda kv: kv[1][1]):
+            if _total_bytes <= settings.CACHE_MAX_BYTES:
+                break
+            _remove_entry(path)
+            _counters['evictions'] += 1
+    finally:
+        fo.close() # releases the lock.
+
+def is_fresh(path, entry_type):
+    """ Return True when the cache file exists and is within time-to-live of the entry type.
+        Expired file is removed.
+    """
+    ttl = settings.CACHE_TTL_SECONDS.get(entry_type, 0)
+    with _lock:
+        _load_entries()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            _counters['misses'] += 1
+            return False
+        if time.time() - mtime > ttl:
+            _remove_entry(path)
+            _counters['misses'] += 1
+            _counters['expirations'] += 1
+            return False
+        now = time.time()
+        x = _entries.get(path)
+        if x:
+            x[1] = now
+        else:
+            _entries[path] = [os.path.getsize(path), now]
+        try:
+            # access time is seen by other processes which evict files (mtime is kept for time-to-live).
+            os.utime(path, (now, mtime))
+        except OSError:
+            pass
+        _counters['hits'] += 1
+        return True
+
+def write(path, text):
+    """ Write text to a cache file atomically. Return True on success, False otherwise. """
+    global _total_bytes
+    tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.current_thread().ident)
+    try:
+        if sys.version_info[0:1] == (2,):
+            with codecs.open(tmp_path, 'w', encoding='utf-8') as fo:
+                fo.write(text)
+        else:
+            with open(tmp_path, 'w') as fo:
+                fo.write(text)
+        os.rename(tmp_path, path)
+        size = os.path.getsize(path)
+    except (IOError, OSError) as e:
+        logger.error("Failed to write cache file: '{}', Reason: '{}'.".format(path, e))
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+    with _lock:
+        _load_entries()
+        x = _entries.get(path)
+        if x:
+            _total_bytes -= x[0]
+        _entries[path] = [size, time.time()]
+        _total_bytes += size
+        _evict()
+    return True
+
+def is_valid_name(name):
+    """ Return True if name (platform, project slug or resource slug) can be used as a directory name in CACHE_DIR. """
+    if not name:
+        return False
+    if '/' in name or os.sep in name or '..' in name or '\0' in name:
+        return False
+    return name != '.'
+
+def _is_in_cache_dir(path):
+    return os.path.realpath(path).startswith(os.path.realpath(settings.CACHE_DIR) + os.sep)
+
+def invalidate(platform, pslug, rslug=None):
+    """ Remove cache files for a project (including all of its resources), or a resource.
+        Strings in string store are also deleted.
+        Return number of files removed, or None when platform or slugs are not valid (see is_valid_name()).
+    """
+    if not (is_valid_name(platform) and is_valid_name(pslug) and (rslug == None or is_valid_name(rslug))):
+        logger.error("Invalid cache entry. platform: '{}', pslug: '{}', rslug: '{}'.".format(platform, pslug, rslug))
+        return None
+    if rslug:
+        d = _get_resource_dir(platform, pslug, rslug)
+    else:
+        d = os.path.join(settings.CACHE_DIR, platform, 'projects', pslug)
+    if not _is_in_cache_dir(d):
+        logger.error("Cache directory is not in CACHE_DIR: '{}'.".format(d))
+        return None
+    n = 0
+    with _lock:
+        _load_entries()
+        prefix = d + os.sep
+        for path in [k for k in _entries.keys() if k.startswith(prefix)]:
+            _remove_entry(path)
+            n += 1
+        if os.path.isdir(d):
+            shutil.rmtree(d, ignore_errors=True)
+        if not rslug:
+            # project listing includes the project.
+            path = get_path(platform, 'projects')
+            if path in _entries or os.path.isfile(path):
+                _remove_entry(path)
+                n += 1
+        _counters['invalidations'] += n
+    stringstore.delete(platform, pslug, rslug)
+    logger.info("Invalidated cache: '{}' ({} files).".format(d, n))
+    return n
+
+def remove_legacy_string_files(platform, pslug, rslug):
+    """ Remove cache files for translation strings and source string details of a resource,
+        which were written before they are stored in string store.
+        Return number of files removed.
+    """
+    d = _get_resource_dir(platform, pslug, rslug)
+    source_dir = os.path.join(d, 'source')
+    n = 0
+    with _lock:
+        _load_entries()
+        for path in list(_entries.keys()):
+            name = os.path.basename(path)
+            if (os.path.dirname(path) == d and name.startswith('strings.')) or os.path.dirname(path) == source_dir:
+                _remove_entry(path)
+                n += 1
+        if os.path.isdir(source_dir):
+            shutil.rmtree(source_dir, ignore_errors=True)
+    if n:
+        logger.info("Removed legacy string cache files: '{}' ({} files).".format(d, n))
+    return n
+
+def get_stats():
+    """ Return cache stats as a dictionary.
+
+        keys                    values
+        ----------------------------------------------------------------------
+        hits                    Number of cache files used.
+        misses                  Number of cache files not found or expired.
+        expirations             Number of cache files removed since they are expired.
+        evictions               Number of cache files removed to keep total size within the budget.
+        invalidations           Number of cache files removed by invalidate().
+        entries                 Number of cache files.
+        total_bytes             Total size of cache files.
+        max_bytes               Budget of total size (CACHE_MAX_BYTES).
+    """
+    with _lock:
+        _load_entries()
+        d = dict(_counters)
+        d['entries'] = len(_entries)
+        d['total_bytes'] = _total_bytes
+    d['max_bytes'] = settings.CACHE_MAX_BYTES
+    return d
@@ -0,0 +1,106 @@
+""" Job execution history.
+
+    A row is recorded in a SQLite database under settings.LOG_DIR for each job
+    execution so that execution status can be queried without walking the log
+    directory tree.
+"""
+import os
+import sqlite3
+from collections import namedtuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+import settings
+
+# Execution history entry.
+#
+# keys                          values
+# ----------------------------------------------------------------------
+# job_id                        Job ID string.
+# date                          Name of log directory for the execution. e.g. '2016-06-06_14-17-30'
+# start_time                    Execution start time in ISO format, or None (e.g. backfilled entries).
+# end_time                      Execution end time in ISO format, or None.
+# exit_code                     Exit code of uploader, or None when it is unknown.
+# status                        Concluded execution status. e.g. 'SUCCESS - S:1 F:0 U:0'
+# message                       Short display string to express results of execution.
+# log_path                      Path to log file for the execution, or None.
+# err_path                      Path to error file for the execution, or None.
+HistoryEntry = namedtuple('HistoryEntry', 'job_id, date, start_time, end_time, exit_code, status, message, log_path, err_path')
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS executions (
+        job_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        start_time TEXT,
+        end_time TEXT,
+        exit_code INTEGER,
+        status TEXT,
+        message TEXT,
+        log_path TEXT,
+        err_path TEXT,
+        PRIMARY KEY (job_id, date))''',
+    '''CREATE INDEX IF NOT EXISTS executions_date ON executions (date)'''
+    ]
+
+_COLUMNS = 'job_id, date, start_time, end_time, exit_code, status, message, log_path, err_path'
+
+def get_history_file():
+    return os.path.join(settings.LOG_DIR, settings.HISTORY_FILENAME)
+
+def exists():
+    """ Return True when the history database has been created. """
+    return os.path.isfile(get_history_file())
+
+def _connect():
+    conn = sqlite3.connect(get_history_file(), timeout=30)
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+def record(entries):
+    """
+    Record list of HistoryEntry tuples. An entry replaces existing one for the same
+    job id and date.
+    Return True on success, False otherwise.
+    """
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO executions ({}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'.format(_COLUMNS), entries)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error("Failed to record execution history. File: '{}', Reason: '{}'.".format(get_history_file(), e))
+        return False
+    else:
+        return True
+
+def _query(statement, params):
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(statement, params).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error("Failed to query execution history. File: '{}', Reason: '{}'.".format(get_history_file(), e))
+        return None
+    else:
+        return [HistoryEntry(*row) for row in rows]
+
+def query(job_id, limit=1):
+    """
+    Return list of HistoryEntry for a job, the most recent first.
+    Return None on any errors.
+    """
+    return _query('SELECT {} FROM executions WHERE job_id = ? ORDER BY date DESC LIMIT ?'.format(_COLUMNS), (job_id, limit))
+
+def query_latest():
+    """
+    Return list of the most recent HistoryEntry for each job.
+    Return None on any errors.
+    """
+    return _query('''SELECT {} FROM executions AS e
+                     WHERE e.date = (SELECT MAX(date) FROM executions WHERE job_id = e.job_id)'''.format(_COLUMNS), ())
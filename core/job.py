@@ -3,7 +3,8 @@ import json
 from collections import namedtuple
 import abc
 import datetime
-from subprocess import call
+import threading
+from subprocess import Popen
 
 import logging
 logger = logging.getLogger(__name__)
@@ -11,6 +12,12 @@ logger = logging.getLogger(__name__)
 import settings
 import resource
 import translation
+import history
+import worker
+import repolock
+import runs
+import snapshot
+import core.plugins.execstats as execstats
 
 def to_dict(o):
     if type(o) == JobConfiguration:
@@ -70,38 +77,133 @@ def _JobConfiguration_to_dict(o):
         'minute': o.minute
         }
 
-def _get_job_configuration(job_status_to_read='all'):
-    """ Return list of JobConfiguration tuples by reading defalut job file.
-        Return empty list if there is no jobs or on any errors.
+def _create_JobConfiguration(job):
+    return JobConfiguration(
+                job['status'],
+                job['class'], 
+                job['id'],               
+                job['name'],                        
+                job['description'], 
+                job['resource_config_file'], 
+                job['translation_config_file'],
+                job['month'], 
+                job['day'],
+                job['day_of_week'],
+                job['hour'],
+                job['minute']
+                )
+
+class _JobRegistry:
+    """ Process-wide registry of job configurations.
+
+        The job file is parsed only when its mtime, size or inode changes. Parsed
+        JobConfiguration tuples are indexed by id, by class, by status and by
+        (resource configuration, translation configuration) pair.
     """
-    if not os.path.isfile(settings.JOB_FILE):
-        logger.error("Job file not found: '{}'.".format(settings.JOB_FILE))
-        return []
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._clear()
+
+    def _clear(self):
+        self._jobs = []
+        self._by_id = {}
+        self._by_class = {}
+        self._by_status = {}
+        self._by_config_pair = {}
+
+    def _load(self, path):
+        with open(path) as fi:
+            try:
+                data = json.load(fi)
+                jobs = [_create_JobConfiguration(job) for job in data['jobs']]
+            except ValueError as e:
+                logger.error("Failed to process job file: '{}', Reason: {}".format(path, e))
+                return False
+            except KeyError as e:
+                logger.error("Failed to read job file: '{}', Reason: {}".format(path, e))
+                return False
 
-    results = []
-    with open(settings.JOB_FILE) as fi:
+        self._clear()
+        for c in jobs:
+            self._jobs.append(c)
+            if c.id in self._by_id:
+                # the first one is used for lookup by id, as job file is searched in order.
+                logger.error("Duplicate job id in job file: '{}'. Job: '{}'.".format(c.id, c.name))
+            else:
+                self._by_id[c.id] = c
+            self._by_class.setdefault(c.class_name, []).append(c)
+            self._by_status.setdefault(c.status, []).append(c)
+            self._by_config_pair.setdefault((c.resource_config_filename, c.translation_config_filename), []).append(c)
+        return True
+
+    def _refresh(self):
+        """ Re-read the job file if it has been changed since last read.
+            Return False when the job file is not available.
+        """
+        path = settings.JOB_FILE
         try:
-            data = json.load(fi)
-            for job in data['jobs']:
-                if job_status_to_read == 'all' or job_status_to_read == job['status']:
-                    results.append(JobConfiguration(
-                        job['status'],
-                        job['class'], 
-                        job['id'],               
-                        job['name'],                        
-                        job['description'], 
-                        job['resource_config_file'], 
-                        job['translation_config_file'],
-                        job['month'], 
-                        job['day'],
-                        job['day_of_week'],
-                        job['hour'],
-                        job['minute']
-                        ))
-        except ValueError as e:
-            logger.error("Failed to process job file: '{}', Reason: {}".format(settings.JOB_FILE, e))
+            st = os.stat(path)
+        except OSError:
+            logger.error("Job file not found: '{}'.".format(path))
+            with self._lock:
+                self._stamp = None
+                self._clear()
+            return False
+
+        stamp = (path, st.st_mtime, st.st_size, st.st_ino)
+        with self._lock:
+            if stamp != self._stamp:
+                if not self._load(path):
+                    self._clear()
+                # a broken job file is not parsed again until it is modified.
+                self._stamp = stamp
+        return True
+
+    def select(self, status=None, job_class=None):
+        """ Return list of JobConfiguration tuples in job file order. """
+        if not self._refresh():
             return []
-    return results
+        with self._lock:
+            if job_class != None:
+                candidates = self._by_class.get(job_class, [])
+                if status != None:
+                    return [c for c in candidates if c.status == status]
+                return list(candidates)
+            elif status != None:
+                return list(self._by_status.get(status, []))
+            else:
+                return list(self._jobs)
+
+    def find(self, job_id):
+        """ Return JobConfiguration tuple for the job id, or None. """
+        if not self._refresh():
+            return None
+        with self._lock:
+            return self._by_id.get(job_id)
+
+    def find_paired(self, c, job_class):
+        """ Return the first job of job_class which uses the same resource and translation
+            configuration files as given JobConfiguration, or None.
+        """
+        if not self._refresh():
+            return None
+        with self._lock:
+            for x in self._by_config_pair.get((c.resource_config_filename, c.translation_config_filename), []):
+                if x.class_name == job_class:
+                    return x
+            return None
+
+_registry = _JobRegistry()
+
+def _get_job_configuration(job_status_to_read='all'):
+    """ Return list of JobConfiguration tuples by reading defalut job file.
+        Return empty list if there is no jobs or on any errors.
+    """
+    if job_status_to_read == 'all':
+        return _registry.select()
+    else:
+        return _registry.select(status=job_status_to_read)
 
 def get_configuration(**kwargs):
     """
@@ -129,112 +231,23 @@ def _get_configuration(**kwargs):
         'status': Specify job status to get. 'active' or 'suspended'.
         'job_class': Specify job class to get. 'ResourceUploaderJob', 'TranslationUploaderJob' or 'AuxlirayJob'.
     """
-    if not os.path.isfile(settings.JOB_FILE):
-        logger.error("Job file not found: '{}'.".format(settings.JOB_FILE))
-        return []
-
-    results = []
-    with open(settings.JOB_FILE) as fi:
-        try:
-            data = json.load(fi)
-        except ValueError as e:
-            logger.error("Failed to process job file: '{}', Reason: {}".format(settings.JOB_FILE, e))
-            return []
-        else:
-            for job in data['jobs']:
-                if 'status' in kwargs:
-                    if job['status'] != kwargs['status']:
-                        continue
-                if 'job_class' in kwargs:
-                    if job['class'] != kwargs['job_class']:
-                        continue
-                    
-                results.append(JobConfiguration(
-                                job['status'],
-                                job['class'], 
-                                job['id'],               
-                                job['name'],                        
-                                job['description'], 
-                                job['resource_config_file'], 
-                                job['translation_config_file'],
-                                job['month'], 
-                                job['day'],
-                                job['day_of_week'],
-                                job['hour'],
-                                job['minute']
-                                ))
-            return results
+    return _registry.select(status=kwargs.get('status'), job_class=kwargs.get('job_class'))
 
 def _get_translation_uploader_job_configuration(job_status_to_read='all'):
-    if not os.path.isfile(settings.JOB_FILE):
-        logger.error("Job file not found: '{}'.".format(settings.JOB_FILE))
-        return []
-
-    results = []
-    with open(settings.JOB_FILE) as fi:
-        try:
-            data = json.load(fi)
-            for job in data['jobs']:
-                if job_status_to_read == 'all' or job_status_to_read == job['status']:
-                    if not job['class'] == 'TranslationUploaderJob':
-                        continue
-                    
-                    results.append(JobConfiguration(
-                        job['status'],
-                        job['class'], 
-                        job['id'],               
-                        job['name'],                        
-                        job['description'], 
-                        job['resource_config_file'], 
-                        job['translation_config_file'],
-                        job['month'], 
-                        job['day'],
-                        job['day_of_week'],
-                        job['hour'],
-                        job['minute']
-                        ))
-        except ValueError as e:
-            logger.error("Failed to process job file: '{}', Reason: {}".format(settings.JOB_FILE, e))
-            return []
-    return results
+    if job_status_to_read == 'all':
+        return _registry.select(job_class='TranslationUploaderJob')
+    else:
+        return _registry.select(status=job_status_to_read, job_class='TranslationUploaderJob')
 
 def _find_configuration(job_id):
     """ 
     Return job configuration (JobConfiguration tuple) which matches given job id.
     Return None, otherwise.
     """
-    if not os.path.isfile(settings.JOB_FILE):
-        logger.error("Job file not found: '{}'.".format(settings.JOB_FILE))
-        return None
-
-    with open(settings.JOB_FILE) as fi:
-        try:
-            data = json.load(fi)
-        except ValueError as e:
-            logger.error("Failed to process job file: '{}', Reason: {}".format(settings.JOB_FILE, e))
-            return None
-        else:
-            for job in data['jobs']:
-                if job['id'] != job_id:
-                    continue
-                    
-                return JobConfiguration(
-                        job['status'],
-                        job['class'], 
-                        job['id'],               
-                        job['name'],                        
-                        job['description'], 
-                        job['resource_config_file'], 
-                        job['translation_config_file'],
-                        job['month'], 
-                        job['day'],
-                        job['day_of_week'],
-                        job['hour'],
-                        job['minute']
-                        )
-            else:
-                logger.error("Failed to find job configuration for job id: '{}'.".format(job_id))
-                return None
+    c = _registry.find(job_id)
+    if not c:
+        logger.error("Failed to find job configuration for job id: '{}'.".format(job_id))
+    return c
 
 def find_paired_translation_uploader_job(resource_job_id):
     """
@@ -247,10 +260,9 @@ def find_paired_translation_uploader_job(resource_job_id):
     
     # Resource uploader and Translation Uploader are paired if they use identical resource and translation
     # configuration files.
-    configurations = _get_configuration(job_class='TranslationUploaderJob')
-    for c in configurations:
-        if c.resource_config_filename == r.resource_config_filename and c.translation_config_filename == r.translation_config_filename:
-            return c.id
+    c = _registry.find_paired(r, 'TranslationUploaderJob')
+    if c:
+        return c.id
     else:
         logger.error("Failed to find paired translation job configuration for resource job id: '{}'.".format(resource_job_id))
         return None
@@ -434,8 +446,141 @@ def get_sync_status(**kwargs):
         logger.error("Unknown combinatin of kwargs")
         return None
 
-def execute(job_configuration):
-    """ Execute a job. """
+def get_details_of_jobs(job_ids):
+    """
+    Return list of details (JobDetails tuple) for jobs, in the order of job ids.
+    Unknown jobs are not included.
+    """
+    results = []
+    for job_id in job_ids:
+        j = get_details(job_id)
+        if j:
+            results.append(j)
+    return results
+
+def get_sync_status_of_jobs(job_ids):
+    """
+    Return list of sync status (JobSyncStatus tuple) for resource uploader jobs and translation
+    uploader jobs, in the order of job ids. Jobs which sync status is not obtained are not included.
+
+    Resource/translation details and sync status are obtained once for jobs which share them
+    (e.g. a resource uploader job and a translation uploader job in a project).
+    """
+    resource_details = {} # resource configuration filename -> ResourceDetails
+    translation_details = {} # translation configuration filename -> TranslationDetails
+    sync_status = {} # arguments of get_sync_status() -> JobSyncStatus
+    results = []
+    for j in get_details_of_jobs(job_ids):
+        if not j.class_name in ('ResourceUploaderJob', 'TranslationUploaderJob'):
+            logger.info("Sync status is not applicable to this job: '{} ({})'.".format(j.id, j.class_name))
+            continue
+
+        if not j.resource_config_filename in resource_details:
+            resource_details[j.resource_config_filename] = resource.get_details(j.resource_config_filename)
+        r = resource_details[j.resource_config_filename]
+        if not r:
+            continue
+
+        if j.class_name == 'ResourceUploaderJob':
+            if not j.translation_config_filename in translation_details:
+                translation_details[j.translation_config_filename] = translation.get_details(j.translation_config_filename)
+            t = translation_details[j.translation_config_filename]
+            if not t:
+                continue
+            key = (j.class_name, t.platform, t.project_name, r.name, tuple(x.path for x in r.resources))
+            if not key in sync_status:
+                sync_status[key] = get_sync_status(job_id=j.id, job_class=j.class_name, translation_platform=t.platform, translation_project_name=t.project_name, resource_repository_name=r.name, resources=list(key[4]))
+        else:
+            key = (j.class_name, r.platform, r.owner, r.name)
+            if not key in sync_status:
+                sync_status[key] = get_sync_status(job_id=j.id, job_class=j.class_name, resource_platform=r.platform, repository_owner=r.owner, repository_name=r.name)
+
+        x = sync_status[key]
+        if x:
+            results.append(x._replace(job_id=j.id))
+    return results
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+def _get_worker_pool():
+    """ Return worker pool, or None when worker pool is disabled. """
+    global _worker_pool
+    if settings.WORKER_POOL_SIZE <= 0:
+        return None
+    with _worker_pool_lock:
+        if _worker_pool == None:
+            _worker_pool = worker.WorkerPool(settings.SCHEDULER_WORKER, settings.WORKER_POOL_SIZE, settings.WORKER_MAX_JOBS, settings.WORKER_MAX_RSS_KB)
+        return _worker_pool
+
+def start_workers():
+    """ Start workers so that first job executions do not wait for workers to start. """
+    pool = _get_worker_pool()
+    if pool:
+        pool.start()
+
+def get_scheduler_stats():
+    """ Return stats of repository locks (see repolock.get_stats()). """
+    return repolock.get_stats()
+
+def stop_workers():
+    """ Stop idle workers. """
+    if _worker_pool:
+        _worker_pool.shutdown()
+
+def _run_uploader(argv, log_path, err_path, run_id):
+    """ Run uploader in a worker, or in a new process when no worker is available.
+        Return exit code.
+    """
+    pool = _get_worker_pool()
+    if pool:
+        # canceller is cleared before the worker executes other jobs.
+        exit_code = pool.run(argv, log_path, err_path, execution_id=run_id,
+                on_start=lambda w: runs.set_canceller(run_id, lambda: w.interrupt(run_id)),
+                on_finish=lambda w: runs.set_canceller(run_id, None))
+        if exit_code != None:
+            return exit_code
+        logger.error("No worker available. Running uploader in a new process.")
+
+    with open(log_path, 'w') as log, open(err_path, 'w') as err:
+        p = Popen(['python', settings.SCHEDULER_UPLOADER] + argv, stdout=log, stderr=err)
+        runs.set_canceller(run_id, lambda: p.kill() if p.returncode == None else None)
+        return p.wait()
+
+def execute(job_configuration, run_id=None):
+    """ Execute a job as a run (see core/runs.py). A new run is created when run id is not given.
+        Snapshots of projects which have the job are refreshed when the job was executed.
+        Return exit code of uploader, or None when the job was not executed.
+    """
+    if run_id == None:
+        run_id = runs.create(job_configuration.id)
+    exit_code = None
+    try:
+        exit_code = _execute(job_configuration, run_id)
+    finally:
+        runs.finish(run_id, exit_code)
+    if exit_code != None:
+        snapshot.request_refresh_for_job(job_configuration.id)
+    return exit_code
+
+def submit(scheduler, job_configuration):
+    """ Queue a job to be executed by scheduler's executor as soon as possible.
+        Return run id.
+    """
+    run_id = runs.create(job_configuration.id)
+    scheduler.add_job(execute, args=[job_configuration], kwargs={'run_id': run_id}, id=run_id, name=job_configuration.name, misfire_grace_time=None)
+    logger.info("Queued job. id: '{}', run id: '{}'.".format(job_configuration.id, run_id))
+    return run_id
+
+def get_run(run_id):
+    """ Return JobRun for a run id, or None when the run is unknown. """
+    return runs.get(run_id)
+
+def cancel_run(run_id):
+    """ Cancel a queued or running run. Return JobRun, or None when the run is unknown. """
+    return runs.cancel(run_id)
+
+def _execute(job_configuration, run_id):
     if job_configuration.class_name == 'ResourceUploaderJob':
         destination = 'translation_repository'
     elif job_configuration.class_name == 'TranslationUploaderJob':
@@ -444,26 +589,53 @@ def execute(job_configuration):
         destination = None
     else:
         destination = None
-    
-    logger.info("Executing job. id: '{}' ('{}')".format(job_configuration.id, job_configuration.class_name))
-    log_dir = create_log_dir(job_configuration.id)
-    if log_dir:
-        logger.info("Log dir: '{}'".format(log_dir))
-    else: 
-        logger.error("Aborted. Failed to create log dir: '{}".format(log_dir)) 
-        return
-    log_path = os.path.join(log_dir, 'tpa.log')
-    err_path = os.path.join(log_dir, 'tpa.err')
-    uploader_path = settings.SCHEDULER_UPLOADER
-    resource_config_path = os.path.join(settings.CONFIG_RESOURCE_DIR, job_configuration.resource_config_filename)
-    translation_config_path = os.path.join(settings.CONFIG_TRANSLATION_DIR, job_configuration.translation_config_filename)
-    options = ''
 
-    with open(log_path, 'w') as log, open(err_path, 'w') as err:
-        if call(['python', uploader_path, destination, resource_config_path, translation_config_path, log_dir, options], stdout=log, stderr=err) == 0:
+    # Jobs for the same repository (or the same branch when each branch has its own worktree)
+    # are serialized since they share a local checkout.
+    # Waiting for the lock is bounded, so that jobs for a slow repository do not use up
+    # scheduler threads while jobs for other repositories are waiting for threads.
+    resource_config = resource.get_configuration(filename=job_configuration.resource_config_filename)
+    if not resource_config:
+        logger.error("Aborted. Failed to read resource configuration: '{}'.".format(job_configuration.resource_config_filename))
+        return None
+    if settings.GIT_WORKTREE_PER_BRANCH:
+        lock = repolock.RepositoryLock(resource_config.repository_name, resource_config.repository_branch)
+    else:
+        lock = repolock.RepositoryLock(resource_config.repository_name)
+    if not lock.acquire(settings.REPOSITORY_LOCK_TIMEOUT_SECONDS, settings.REPOSITORY_LOCK_MAX_WAITING):
+        logger.error("Aborted. Failed to lock repository: '{}'.".format(lock.name))
+        return None
+
+    try:
+        if not runs.start(run_id):
+            logger.info("Cancelled job. id: '{}', run id: '{}'.".format(job_configuration.id, run_id))
+            return None
+
+        logger.info("Executing job. id: '{}' ('{}'), run id: '{}'.".format(job_configuration.id, job_configuration.class_name, run_id))
+        log_dir = create_log_dir(job_configuration.id)
+        if log_dir:
+            logger.info("Log dir: '{}'".format(log_dir))
+        else: 
+            logger.error("Aborted. Failed to create log dir: '{}".format(log_dir)) 
+            return None
+        log_path = os.path.join(log_dir, 'tpa.log')
+        err_path = os.path.join(log_dir, 'tpa.err')
+        resource_config_path = os.path.join(settings.CONFIG_RESOURCE_DIR, job_configuration.resource_config_filename)
+        translation_config_path = os.path.join(settings.CONFIG_TRANSLATION_DIR, job_configuration.translation_config_filename)
+        options = ''
+
+        start_time = datetime.datetime.now()
+        exit_code = _run_uploader([destination, resource_config_path, translation_config_path, log_dir, options], log_path, err_path, run_id)
+        if exit_code == 0:
             logger.info("Job command succeeded. id: '{}' ('{}')\n".format(job_configuration.id, job_configuration.class_name))
         else:
             logger.error("Job command failed. id: '{}' ('{}')\n".format(job_configuration.id, job_configuration.class_name))
+        end_time = datetime.datetime.now()
+
+        _record_execution(job_configuration.id, log_dir, start_time, end_time, exit_code)
+        return exit_code
+    finally:
+        lock.release()
 
 '''
     About Log
@@ -543,152 +715,153 @@ def _JobExecStatus_to_dict(o):
     return {'job_id': o.job_id, 'date': o.date, 'status': o.status, 'message': o.message, 'log_path': o.log_path, 'err_path': o.err_path}
 
 def _collect_execstats(log_path):
+    """ Collect ExecStats records from a log of legacy execution which has no exec.json. """
     results = []
     if os.path.isfile(log_path):
         with open(log_path) as fi:
-            lines = fi.readlines()
-            for l in lines:
-                if l.startswith('ExecStats='):
-                    results.append(l[len("'ExecStats='") - 1:len(l) - 2])
+            for l in fi:
+                i = l.find("ExecStats='")
+                if i == -1:
+                    continue
+                x = l[i + len("ExecStats='"):].rstrip().rstrip('.').rstrip("'")
+                try:
+                    results.append(json.loads(x))
+                except ValueError as e:
+                    logger.error("Failed to load exec stats as json. Reason: '{}', execstats: '{}'.".format(e, x))
     return results
 
-def _conclude_exec_stats(execstats):
-    """ Conclude if the job execution is success or not. """
-    succeeded = 0
-    failed = 0
-    unknown = 0
-    for x in execstats:
-        try:
-            d = json.loads(x)
-        except ValueError as e:
-            logger.error("Failed to load exec stats as json. Reason: '{}', execstats: '{}'.".format(e, x))
-            continue
-        else:
-            if d['operation'] == 'ResourceUpload':
-                if d['results'] ==  'SUCCESS':
-                    succeeded += 1
-                elif d['results'] ==  'FAILURE':
-                    failed += 1
-                else:
-                    unknown += 1
-            elif d['operation'] == 'TranslationUpload':
-                if d['results'] ==  'SUCCESS':
-                    succeeded += 1
-                elif d['results'] ==  'FAILURE':
-                    failed += 1 
-                else:
-                    unknown += 1
-            else:
-                logger.error("Unknown operation: '{}'. execstats: '{}'.".format(d['operation'], x))
-                unknown += 1
-
-    if failed >= 1:
-        return "FAILURE - S:{} F:{} U:{}".format(succeeded, failed, unknown)
-    else:
-        if succeeded >= 1:
-            if unknown == 0:
-                return "SUCCESS - S:{} F:{} U:{}".format(succeeded, failed, unknown)
-            else:
-                return "CHECK LOG - S:{} F:{} U:{}".format(succeeded, failed, unknown)
-        else:
-            return "CHECK LOG - S:{} F:{} U:{}".format(succeeded, failed, unknown)
-
-def _withdraw_exec_message(execstats):
-    """ Constracut meaningful message out of exec stats. """
-    job_type = None
-    succeeded = 0
-    failed = 0
-    unknown = 0
-    tu_message = None
-    for x in execstats:
-        try:
-            d = json.loads(x)
-        except ValueError as e:
-            logger.error("Failed to load exec stats as json. Reason: '{}', execstats: '{}'.".format(e, x))
-            continue
-        else:
-            if d['operation'] == 'ResourceUpload':
-                job_type = 'RU'
-                if d['results'] ==  'SUCCESS':
-                    succeeded += 1
-                    #if d['new_strings'] == '0' and d['del_strings'] == '0' and d['mod_strings'] == '0':
-                elif d['results'] ==  'FAILURE':
-                    failed += 1
-                else:
-                    unknown += 1
-            elif d['operation'] == 'TranslationUpload':
-                job_type = 'TU'
-                if d['results'] ==  'SUCCESS':
-                    succeeded += 1
-                    url = d['pullrequest_url']
-                    if url:
-                        tu_message =  "<a href='{}'>Pull Request</a>".format(url)
-                    else:
-                        tu_message = d['reason']
-                elif d['results'] ==  'FAILURE':
-                    failed += 1
-                    tu_message = d['reason']
-                else:
-                    unknown += 1
-            else:
-                logger.error("Unknown operation: '{}'. execstats: '{}'.".format(d['operation'], x))
-                unknown += 1
-   
-    if job_type == 'RU':
-        if succeeded == 0:
-            return "No uplodads - S:{} F:{} U:{}".format(succeeded, failed, unknown)
-        else:
-            return "Uplodaded resource(s) - S:{} F:{} U:{}".format(succeeded, failed, unknown)
-    elif job_type == 'TU':
-        if not tu_message:
-            return "CHECK LOG for exec stats."
-        else:
-            return tu_message
-    else:
-        return "CHECK LOG - Failed to analyze job and operation."
-
-def _analyze_logs(log_path, err_path):
-    """ Conclude execution status by analyzing two logs. """
-    if log_path: 
-        execstats = _collect_execstats(log_path)
-        return {'status': _conclude_exec_stats(execstats), 'message': _withdraw_exec_message(execstats)}
-    else:
-        if err_path:
+def _analyze_logs(log_dir, log_path, err_path):
+    """ Conclude execution status by reading summary in exec.json, or by analyzing
+        two logs for legacy executions.
+    """
+    d = execstats.read_summary(log_dir)
+    if d:
+        return {'status': d['status'], 'message': d['message']}
+
+    records = execstats.read(log_dir) # no summary when execution was interrupted.
+    if records == None:
+        if log_path: 
+            records = _collect_execstats(log_path)
+        elif err_path:
             return {'status': 'FAILURE', 'message': "Only err.log exists."}
         else:
             return {'status': 'UNKNOWN', 'message': "No logs found."}
+    return {'status': execstats.conclude(records), 'message': execstats.withdraw_message(records)}
             
-def get_execution_status(job_id, limit=1):
+def _find_logs(log_dir):
+    """ Return paths to non-empty log and error files in a log directory. """
+    log_path = None
+    err_path = None
+    for f in os.listdir(log_dir):
+        if f == 'tpa.log':
+            path = os.path.join(log_dir, f)
+            if os.path.getsize(path) >= 1:
+                log_path = path
+        elif f == 'tpa.err':
+            path = os.path.join(log_dir, f)
+            if os.path.getsize(path) >= 1:
+                err_path = path
+        else:
+            pass # ignore other files.
+    return log_path, err_path
+
+def _create_history_entry(job_id, log_dir, start_time, end_time, exit_code):
+    log_path, err_path = _find_logs(log_dir)
+    d = _analyze_logs(log_dir, log_path, err_path)
+    return history.HistoryEntry(
+                job_id,
+                os.path.basename(os.path.dirname(log_dir)), # log dir is named after datetime. e.g. '2016-06-06_14-17-30'
+                start_time.isoformat() if start_time else None,
+                end_time.isoformat() if end_time else None,
+                exit_code,
+                d['status'],
+                d['message'],
+                log_path,
+                err_path)
+
+def _record_execution(job_id, log_dir, start_time, end_time, exit_code):
+    if not history.record([_create_history_entry(job_id, log_dir, start_time, end_time, exit_code)]):
+        logger.error("Failed to record execution history. id: '{}', log dir: '{}'.".format(job_id, log_dir))
+
+def _to_JobExecStatus(entry):
+    return JobExecStatus(entry.job_id, entry.date, entry.status, entry.message, entry.log_path, entry.err_path)
+
+def _scan_execution_status(job_id, limit=1):
     """ Collect log exection status for a job by going through all logs for the job. """
     results = []
     count = 0
     for x in sorted(os.listdir(settings.LOG_DIR), reverse=True): # directory x should be named after datetime. e.g. '2016-06-06_14-17-30'
         if count >= limit:
             break
+        if not os.path.isdir(os.path.join(settings.LOG_DIR, x)):
+            continue
         for y in sorted(os.listdir(os.path.join(settings.LOG_DIR, x))): # directory y is named after job id.
             if y and (y == job_id):
-                log_path = None
-                err_path = None
-                current_dir = os.path.join(settings.LOG_DIR, x, y)
-                for f in os.listdir(current_dir):
-                    if f == 'tpa.log':
-                        path = os.path.join(current_dir, f)
-                        if os.path.getsize(path) >= 1:
-                            log_path = path
-                    elif f == 'tpa.err':
-                        path = os.path.join(current_dir, f)
-                        if os.path.getsize(path) >= 1:
-                            err_path = path
-                else:
-                    pass # ignore other files.
+                log_dir = os.path.join(settings.LOG_DIR, x, y)
+                log_path, err_path = _find_logs(log_dir)
                 if count < limit:
-                    d = _analyze_logs(log_path, err_path)
+                    d = _analyze_logs(log_dir, log_path, err_path)
                     results.append(JobExecStatus(job_id, x, d['status'], d['message'], log_path, err_path))
                     count += 1
                 else:
                     break 
     return results
 
+def get_execution_status(job_id, limit=1):
+    """
+    Return list of execution status (JobExecStatus tuple) for a job, the most recent first.
+
+    Execution status is read from execution history. Logs are scanned only when the
+    history has not been created yet (see backfill_execution_history()).
+    """
+    if not history.exists():
+        logger.info("No execution history. Scanning logs for job: '{}'.".format(job_id))
+        return _scan_execution_status(job_id, limit)
+
+    entries = history.query(job_id, limit)
+    if entries == None:
+        return []
+    return [_to_JobExecStatus(x) for x in entries]
+
+def get_latest_execution_status():
+    """
+    Return list of the most recent execution status (JobExecStatus tuple) for each job
+    in job configuration file. Jobs which have never been executed are not listed.
+    """
+    if not history.exists():
+        results = []
+        for c in get_configuration():
+            results.extend(_scan_execution_status(c.id, 1))
+        return results
+
+    entries = history.query_latest()
+    if entries == None:
+        return []
+    latest = {}
+    for x in entries:
+        latest[x.job_id] = x
+    return [_to_JobExecStatus(latest[c.id]) for c in get_configuration() if c.id in latest]
+
+def backfill_execution_history():
+    """
+    Build execution history out of existing log directories.
+    Return number of recorded executions, or None on any errors.
+    """
+    entries = []
+    for x in sorted(os.listdir(settings.LOG_DIR)): # directory x should be named after datetime. e.g. '2016-06-06_14-17-30'
+        base_dir = os.path.join(settings.LOG_DIR, x)
+        if not os.path.isdir(base_dir):
+            continue
+        for y in sorted(os.listdir(base_dir)): # directory y is named after job id.
+            log_dir = os.path.join(base_dir, y)
+            if os.path.isdir(log_dir):
+                entries.append(_create_history_entry(y, log_dir, None, None, None))
+
+    if history.record(entries):
+        return len(entries)
+    else:
+        return None
+
 def get_resource_slugs(translation_platform, translation_project_name, resource_repository_name, resources):
     """ Return list of {<resource path>: <resource slug>} dictionary. The resource slug is generated
         by the given parameters.
@@ -1,7 +1,5 @@
-import requests
-from requests.exceptions import RequestException, HTTPError
-
-from core.plugins.results import succeeded_rest_api_call_results, failed_rest_api_call_results
+import core.plugins.httpclient as httpclient
+from core.plugins.results import failed_rest_api_call_results
 
 def get_pullrequests(creds, **kwargs):
     """
@@ -24,23 +22,12 @@ def get_pullrequests(creds, **kwargs):
         else:
             url = 'https://bitbucket.org/api/2.0/repositories/' + kwargs['repository_owner'] + '/' + kwargs['repository_name'] + '/pullrequests' + kwargs['query_string']
         headers = {'Content-Type': 'application/json'}
-        r = requests.get(url, auth=(creds['username'], creds['userpasswd']), headers=headers)
-        r.raise_for_status()
+        return httpclient.get('bitbucket', url, creds['username'], auth=(creds['username'], creds['userpasswd']), headers=headers)
     except KeyError as e:
         return failed_rest_api_call_results(str(e))
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(str(e))
-    else:
-        return succeeded_rest_api_call_results(r) 
 
 def post_pullrequest(creds, repository_owner, repository_name, payload):
     headers = {'Content-Type': 'application/json'}
     url = 'https://bitbucket.org/api/2.0/repositories/' + repository_owner + '/' + repository_name + '/pullrequests'
-    try:
-        r = requests.post(url, auth=(creds['username'], creds['userpasswd']), headers=headers, data=payload)
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r) 
+    return httpclient.post('bitbucket', url, creds['username'], auth=(creds['username'], creds['userpasswd']), headers=headers, data=payload)
 
@@ -6,6 +6,7 @@ import logging
 logger = logging.getLogger('tpa')
 
 from core.plugins.results import PullRequestResults
+import core.plugins.execstats as execstats
 from core.plugins.repository_base import ResourceRepository, Resource, ResourceBundle
 from core.plugins.git.repository import GitRepository
 import utils
@@ -24,7 +25,11 @@ class BitbucketRepository(ResourceRepository):
         self._import_entries = []
 
     def _create_local_repository(self, config, creds):
-        repo = GitRepository(config.repository_url, config.repository_owner, config.repository_name, config.repository_branch, creds)
+        paths = []
+        for r in config.resources:
+            paths.append(r.path)
+            paths.extend([t.path for t in r.translations])
+        repo = GitRepository(config.repository_url, config.repository_owner, config.repository_name, config.repository_branch, creds, sparse_paths=paths)
         return repo
 
     def get_repository_name(self):
@@ -58,7 +63,7 @@ class BitbucketRepository(ResourceRepository):
                     self.config.resources[resource_index].translations
                     )
 
-    def get_resource_bundle(self):
+    def get_resource_bundle(self, ledger=None):
         resources = []
         n = len(self.config.resources)
         for i in range(0, n):
@@ -68,18 +73,14 @@ class BitbucketRepository(ResourceRepository):
         for x in resources:
             logger.info("{}".format(x))
 
-        return  ResourceBundle(self.local_repo, resources, self._log_dir)
+        return  ResourceBundle(self.local_repo, resources, self._log_dir, ledger)
 
     def _add_import_entry(self, translation_bundles):
-        options = self.config.options
-        if 'hold_pullrequest_until_all_languages_completes' in options:
-            if options['hold_pullrequest_until_all_languages_completes']:
-                logger.info("hold_pullrequest_until_all_languages_completes: true")
-                self._add_import_entry_with_all_languages(translation_bundles)
-            else:
-                logger.info("hold_pullrequest_until_all_languages_completes: false")
-                self._add_import_entry_with_any_languages(translation_bundles)
+        if self.hold_pullrequest_until_all_languages_completes():
+            logger.info("hold_pullrequest_until_all_languages_completes: true")
+            self._add_import_entry_with_all_languages(translation_bundles)
         else:
+            logger.info("hold_pullrequest_until_all_languages_completes: false")
             self._add_import_entry_with_any_languages(translation_bundles)
 
     def _add_import_entry_with_any_languages(self, translation_bundles):
@@ -173,7 +174,7 @@ class BitbucketRepository(ResourceRepository):
             "status_code": status_code,
             "pullrequest_url": pullrequest_url
         }
-        logger.info("ExecStats='{}'".format(json.dumps(d)))
+        execstats.write(self._log_dir, d)
 
     def _generate_pullrequest_description(self, file_paths):
         return 'Translation Process Automation generated string (DO NOT EDIT): [' + ','.join(file_paths) + ']' 
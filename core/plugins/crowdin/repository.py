@@ -9,13 +9,14 @@ import logging
 logger = logging.getLogger('tpa')
 
 import settings
-from core.plugins.repository_base import TranslationRepository, TranslationBundle, Translation
+import core.plugins.execstats as execstats
+from core.plugins.repository_base import TranslationRepository, TranslationBundle, Translation, get_download_executor
 import utils
 import creds
 
 class CrowdinRepository(TranslationRepository):
     def __init__(self, config, creds, log_dir):
-        super(CrowdinRepository, self).__init__(config, log_dir)
+        super(CrowdinRepository, self).__init__(config, log_dir, 'crowdin')
         #self._crowdin_resource_slug_prefix = creds.resource_slug_prefix 
         # FIXME --- until removing translation config files, config.project_name has to be resource repository name so
         #           that the following code can construct a correct project id.
@@ -35,11 +36,12 @@ class CrowdinRepository(TranslationRepository):
     def import_resource(self, resource):
         return self._upload(self._project_id, resource.repository_name, resource.repository_branch, resource.resource_path, resource.local_path)
 
-    def get_translation_bundle(self, repository_name, repository_branch, resource_path, resource_translations):
+    def get_translation_bundle(self, repository_name, repository_branch, resource_path, resource_translations, require_all_languages=False):
+        # Crowdin checks each language before downloading it (see download_translation()).
         translations = []
         for translation in resource_translations:
             translations.append(Translation(repository_name, repository_branch, resource_path, translation.path, translation.language_code.strip().rstrip()))
-        return TranslationBundle(self, translations, self._log_dir)
+        return TranslationBundle(self, translations, self._log_dir, get_download_executor('crowdin'))
 
     def _upload(self, project_slug, repository_name, repository_branch, resource_path, import_file_path):
         renamed_import_file_path = import_file_path + os.path.splitext(resource_path)[1]
@@ -59,22 +61,27 @@ class CrowdinRepository(TranslationRepository):
         if utils.update_file(self._crowdin_project_key, project_slug, repository_branch, crowdin_resource_path, renamed_import_file_path):
             os.rename(renamed_import_file_path, renamed_import_file_path + '_crowdin_imported')
             d['results'] = 'SUCCESS'
-            logger.info("ExecStats='{}'.".format(json.dumps(d)))
+            execstats.write(self._log_dir, d)
             return True
         else:
             os.rename(renamed_import_file_path, renamed_import_file_path + '_import_failed')
             d['results'] = 'FAILURE'
-            logger.info("ExecStats='{}'.".format(json.dumps(d)))
+            execstats.write(self._log_dir, d)
             return False
 
     def download_translation(self, repository_name, repository_branch, resource_path, language_code):
-        if utils.all_strings_approved(self._crowdin_project_key, self._project_id, repository_branch, resource_path, language_code):
-            dest = os.path.join(self._log_dir, os.path.basename(resource_path) + '_' + language_code)
-            if os.path.isfile(dest):
-                os.remove(dest)
-            return utils.export_file(self._crowdin_project_key, self._project_id, repository_branch, resource_path, language_code, dest)
-        else:  
+        stats = utils.get_file_language_stats(self._crowdin_project_key, self._project_id, repository_branch, resource_path, language_code)
+        if stats == None:
             return None
+        if not utils.all_strings_approved(self._crowdin_project_key, self._project_id, repository_branch, resource_path, language_code, stats):
+            return None
+
+        # translation is always exported, since language stats have only counts of strings, which do not
+        # change when a string is edited and approved again (no watermark for the file).
+        dest = os.path.join(self._log_dir, os.path.basename(resource_path) + '_' + language_code)
+        if os.path.isfile(dest):
+            os.remove(dest)
+        return utils.export_file(self._crowdin_project_key, self._project_id, repository_branch, resource_path, language_code, dest)
 
     def get_stats_project(self):
         # NIY
@@ -25,12 +25,14 @@ def _split_path(path):
     elif d != '' and f != '':
         return _split_path(d) + [f]
 
-def all_strings_approved(api_key, project_slug, branch_name, crowdin_resource_path, language_code):
+def get_file_language_stats(api_key, project_slug, branch_name, crowdin_resource_path, language_code):
     """
-    Return True when specified resource is translated into language and all strings are approved.
-    Return False when approval is not completed or on any errors.
+    Return language stats (dictionary) of specified resource, which has 'phrases', 'translated'
+    and 'approved' etc. Return None on any errors.
     """
     stats = get_language_stats(api_key, project_slug, language_code)
+    if not stats:
+        return None
 
     # crowdin has to be configured with branch.
     for x in stats['files']:  
@@ -41,7 +43,7 @@ def all_strings_approved(api_key, project_slug, branch_name, crowdin_resource_pa
             pass
     else:
         logger.error("Branch not found in language stats. Branch: '{}', Stats: '{}'.".format(branch_name, stats))
-        return False
+        return None
 
     splits = _split_path(crowdin_resource_path)
     for i in range(0, len(splits) - 1):
@@ -51,20 +53,33 @@ def all_strings_approved(api_key, project_slug, branch_name, crowdin_resource_pa
                 break
         else:
             logger.error("Directory not found in language stats. Directory: '{}', Stats: '{}'.".format(splits[i], x))
-            return False
+            return None
 
     for x in sub['files']:  
         if x['node_type'] == 'file' and x['name'] == splits[-1]:
-            if x['phrases'] == x['approved']:
-                logger.info("String review completed. Branch: '{}', File: '{}', Language: '{}'.".format(branch_name, crowdin_resource_path, language_code))
-                return True
-            else:
-                logger.info("String review not completed. Branch: '{}', File: '{}', Language: '{}'.".format(branch_name, crowdin_resource_path, language_code))
-                return False
+            return x
     else:
         logger.error("File not found in language stats. File: '{}', Stats: '{}'.".format(splits[-1], sub))
-        return False
+        return None
 
+def all_strings_approved(api_key, project_slug, branch_name, crowdin_resource_path, language_code, file_language_stats=None):
+    """
+    Return True when specified resource is translated into language and all strings are approved.
+    Return False when approval is not completed or on any errors.
+    File language stats (see get_file_language_stats()) is obtained unless it is specified.
+    """
+    x = file_language_stats
+    if x == None:
+        x = get_file_language_stats(api_key, project_slug, branch_name, crowdin_resource_path, language_code)
+        if x == None:
+            return False
+
+    if x['phrases'] == x['approved']:
+        logger.info("String review completed. Branch: '{}', File: '{}', Language: '{}'.".format(branch_name, crowdin_resource_path, language_code))
+        return True
+    else:
+        logger.info("String review not completed. Branch: '{}', File: '{}', Language: '{}'.".format(branch_name, crowdin_resource_path, language_code))
+        return False
 
 def get_language_stats(api_key, project_slug, language_code):
     params = {'language': language_code, 'json': True}
@@ -0,0 +1,219 @@
+import os
+import json
+import threading
+
+import logging
+logger = logging.getLogger('tpa')
+
+'''
+    Execution Stats
+
+    ExecStats records are written by repository plugins as they upload resources or
+    translations. Each record is logged (ExecStats='{...}') and also appended to exec.json
+    (JSON lines) in the log directory of the execution. At the end of an execution a
+    summary record is appended to exec.json so that the execution status can be obtained
+    by reading the last line of the file.
+
+'''
+EXECSTATS_FILENAME = 'exec.json'
+
+# Operation of the final summary record.
+#
+# keys                          values
+# ----------------------------------------------------------------------
+# operation                     'Summary'
+# status                        Concluded status string. e.g. 'SUCCESS - S:1 F:0 U:0'.
+# message                       Short display string to express results of execution.
+SUMMARY_OPERATION = 'Summary'
+
+_lock = threading.Lock()
+
+def get_execstats_path(log_dir):
+    return os.path.join(log_dir, EXECSTATS_FILENAME)
+
+def _append(log_dir, d):
+    if not log_dir:
+        return
+    try:
+        with _lock:
+            with open(get_execstats_path(log_dir), 'a') as fo:
+                fo.write(json.dumps(d) + '\n')
+    except (OSError, IOError) as e:
+        logger.error("Failed to write exec stats. Reason: '{}', log dir: '{}'.".format(e, log_dir))
+
+def write(log_dir, d):
+    """ Write an ExecStats record to log and to exec.json in the log directory. """
+    logger.info("ExecStats='{}'".format(json.dumps(d)))
+    _append(log_dir, d)
+
+def read(log_dir):
+    """ Return list of records (dictionary) in exec.json in the log directory.
+        Return None when exec.json does not exist.
+    """
+    path = get_execstats_path(log_dir)
+    if not os.path.isfile(path):
+        return None
+    results = []
+    with open(path) as fi:
+        for l in fi:
+            l = l.strip()
+            if not l:
+                continue
+            try:
+                results.append(json.loads(l))
+            except ValueError as e:
+                logger.error("Failed to load exec stats as json. Reason: '{}', execstats: '{}'.".format(e, l))
+    return results
+
+def _read_last_line(path, chunk_size=4096):
+    """ Return the last non-empty line of a file without reading the whole file. """
+    with open(path, 'rb') as fi:
+        fi.seek(0, os.SEEK_END)
+        end = fi.tell()
+        pos = end
+        data = b''
+        while pos > 0:
+            pos = max(0, pos - chunk_size)
+            fi.seek(pos)
+            data = fi.read(end - pos)
+            lines = [x for x in data.splitlines() if x.strip()]
+            if len(lines) >= 2 or (pos == 0 and lines):
+                return lines[-1].decode('utf-8')
+            chunk_size *= 2
+        return None
+
+def read_summary(log_dir):
+    """ Return summary record (dictionary) in exec.json in the log directory.
+        Return None when exec.json does not exist or it has no summary record (e.g. the
+        execution was interrupted).
+    """
+    path = get_execstats_path(log_dir)
+    if not os.path.isfile(path):
+        return None
+    l = _read_last_line(path)
+    if not l:
+        return None
+    try:
+        d = json.loads(l)
+    except ValueError as e:
+        logger.error("Failed to load exec stats as json. Reason: '{}', execstats: '{}'.".format(e, l))
+        return None
+    if d.get('operation') == SUMMARY_OPERATION:
+        return d
+    else:
+        return None
+
+def write_summary(log_dir):
+    """ Conclude exec stats written so far and append a summary record to exec.json.
+        Return the summary record.
+    """
+    records = read(log_dir) or []
+    d = {
+        'operation': SUMMARY_OPERATION,
+        'status': conclude(records),
+        'message': withdraw_message(records)
+        }
+    write(log_dir, d)
+    return d
+
+def _format_counts(succeeded, failed, unknown, skipped):
+    s = "S:{} F:{} U:{}".format(succeeded, failed, unknown)
+    if skipped >= 1:
+        s += " SK:{}".format(skipped)
+    return s
+
+def conclude(records):
+    """ Conclude if the job execution is success or not.
+        Resources which are skipped since they are not changed are not considered as failure.
+    """
+    succeeded = 0
+    failed = 0
+    unknown = 0
+    skipped = 0
+    for d in records:
+        if d['operation'] == 'ResourceUpload':
+            if d['results'] ==  'SUCCESS':
+                succeeded += 1
+            elif d['results'] ==  'FAILURE':
+                failed += 1
+            elif d['results'] ==  'SKIPPED':
+                skipped += 1
+            else:
+                unknown += 1
+        elif d['operation'] == 'TranslationUpload':
+            if d['results'] ==  'SUCCESS':
+                succeeded += 1
+            elif d['results'] ==  'FAILURE':
+                failed += 1
+            else:
+                unknown += 1
+        elif d['operation'] == SUMMARY_OPERATION:
+            pass
+        else:
+            logger.error("Unknown operation: '{}'. execstats: '{}'.".format(d['operation'], d))
+            unknown += 1
+
+    counts = _format_counts(succeeded, failed, unknown, skipped)
+    if failed >= 1:
+        return "FAILURE - {}".format(counts)
+    else:
+        if succeeded >= 1 or skipped >= 1:
+            if unknown == 0:
+                return "SUCCESS - {}".format(counts)
+            else:
+                return "CHECK LOG - {}".format(counts)
+        else:
+            return "CHECK LOG - {}".format(counts)
+
+def withdraw_message(records):
+    """ Constracut meaningful message out of exec stats. """
+    job_type = None
+    succeeded = 0
+    failed = 0
+    unknown = 0
+    skipped = 0
+    tu_message = None
+    for d in records:
+        if d['operation'] == 'ResourceUpload':
+            job_type = 'RU'
+            if d['results'] ==  'SUCCESS':
+                succeeded += 1
+            elif d['results'] ==  'FAILURE':
+                failed += 1
+            elif d['results'] ==  'SKIPPED':
+                skipped += 1
+            else:
+                unknown += 1
+        elif d['operation'] == 'TranslationUpload':
+            job_type = 'TU'
+            if d['results'] ==  'SUCCESS':
+                succeeded += 1
+                url = d['pullrequest_url']
+                if url:
+                    tu_message =  "<a href='{}'>Pull Request</a>".format(url)
+                else:
+                    tu_message = d['reason']
+            elif d['results'] ==  'FAILURE':
+                failed += 1
+                tu_message = d['reason']
+            else:
+                unknown += 1
+        elif d['operation'] == SUMMARY_OPERATION:
+            pass
+        else:
+            logger.error("Unknown operation: '{}'. execstats: '{}'.".format(d['operation'], d))
+            unknown += 1
+
+    counts = _format_counts(succeeded, failed, unknown, skipped)
+    if job_type == 'RU':
+        if succeeded == 0:
+            return "No uplodads - {}".format(counts)
+        else:
+            return "Uplodaded resource(s) - {}".format(counts)
+    elif job_type == 'TU':
+        if not tu_message:
+            return "CHECK LOG for exec stats."
+        else:
+            return tu_message
+    else:
+        return "CHECK LOG - Failed to analyze job and operation."
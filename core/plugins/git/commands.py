@@ -1,37 +1,108 @@
 import re
 from sh import git, ErrorReturnCode
 
+import settings
 from core.plugins.results import succeeded_util_call_results, failed_util_call_results
+import core.plugins.git.refs as refs
+
+def _use_refs_backend(git_dir):
+    """ Return True when read-only queries are answered by refs backend (see refs.py)
+        instead of running git for each query. Repositories which refs backend does not
+        support (reftable) fall back to running git.
+    """
+    return settings.GIT_BACKEND == 'refs' and refs.is_supported(git_dir)
+
+def get_version():
+    """ Return version of git as tuple of integers (e.g. (2, 39, 5)).
+    """
+    try:
+        output = git('--version', _tty_out=False)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        m = re.search(r'(\d+)\.(\d+)(?:\.(\d+))?', '{}'.format(output))
+        if not m:
+            return failed_util_call_results("Unknown git version: '{}'.".format(output))
+        return succeeded_util_call_results(tuple(int(x or 0) for x in m.groups()))
 
 def get_status_porcelain(git_dir):
     """ Return status in easy-to-parse format.
     """
     try:
-        output = git('-C', git_dir, 'status', '--porcelain')
+        output = git('-C', git_dir, 'status', '--porcelain', _tty_out=False)
     except ErrorReturnCode as e:
         return failed_util_call_results(e)
     else:
         return succeeded_util_call_results(output) 
 
+def get_status_entries(git_dir):
+    """ Return status of files which are not clean as dictionary (path -> two-letter status code
+        in porcelain format, e.g. ' M', 'M ', '??'). Untracked directory ends with '/'.
+    """
+    try:
+        output = git('-C', git_dir, 'status', '--porcelain', '-z', _tty_out=False)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        entries = {}
+        fields = '{}'.format(output).split('\0')
+        i = 0
+        while i < len(fields):
+            x = fields[i]
+            i += 1
+            if len(x) < 4:
+                continue
+            entries[x[3:]] = x[:2]
+            if x[0] in ('R', 'C'):
+                # original path of renamed/copied file follows.
+                i += 1
+        return succeeded_util_call_results(entries)
+
+def get_head_commit(git_dir):
+    """ Return sha1 of HEAD commit.
+    """
+    if _use_refs_backend(git_dir):
+        return refs.get_head_commit(git_dir)
+    try:
+        output = git('-C', git_dir, 'rev-parse', 'HEAD', _tty_out=False)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results('{}'.format(output).strip())
+
+def get_changed_files(git_dir, from_commit, to_commit):
+    """ Return list of file paths changed between two commits.
+    """
+    try:
+        output = git('-C', git_dir, 'diff', '--name-only', '{}..{}'.format(from_commit, to_commit), _tty_out=False)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results([x for x in '{}'.format(output).splitlines() if x.strip()])
+
 def get_branch_all(git_dir):
-    """ Return all branch names).
+    """ Return all branch names as list of lines of 'git branch --all'.
     """
+    if _use_refs_backend(git_dir):
+        return refs.get_branch_all(git_dir)
     try:
-        output = git('-C', git_dir, 'branch', '--all')
+        output = git('-C', git_dir, 'branch', '--all', _tty_out=False)
     except ErrorReturnCode as e:
         return failed_util_call_results(e)
     else:
-        return succeeded_util_call_results(output) 
+        return succeeded_util_call_results('{}'.format(output).splitlines())
 
 def get_current_branch_name(git_dir):
     """ Return current branch name (e.g. 'master').
     """
+    if _use_refs_backend(git_dir):
+        return refs.get_current_branch_name(git_dir)
     try:
-        output = git('-C', git_dir, 'rev-parse', '--abbrev-ref', 'HEAD')
+        output = git('-C', git_dir, 'rev-parse', '--abbrev-ref', 'HEAD', _tty_out=False)
     except ErrorReturnCode as e:
         return failed_util_call_results(e)
     else:
-        return succeeded_util_call_results(output.strip().rstrip()) 
+        return succeeded_util_call_results('{}'.format(output).strip())
 
 def checkout_branch(git_dir, branch_name):
     """ Checkout specified branch.
@@ -53,6 +124,42 @@ def pull(git_dir):
     else:
         return succeeded_util_call_results(None) 
 
+def reset_keep(git_dir, commit):
+    """ Reset current branch to a commit (e.g. 'origin/master'), keeping local changes.
+        Fails when local changes are in files which differ between HEAD and the commit.
+    """
+    try:
+        git('-C', git_dir, 'reset', '--keep', commit)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def list_remote_branches(git_dir):
+    """ Return names of branches in origin (e.g. ['feature/x', 'master']).
+    """
+    try:
+        output = git('-C', git_dir, 'ls-remote', '--heads', 'origin', _tty_out=False)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        l = []
+        for x in '{}'.format(output).splitlines():
+            x = x.split('\t', 1)
+            if len(x) == 2 and x[1].startswith('refs/heads/'):
+                l.append(x[1][len('refs/heads/'):])
+        return succeeded_util_call_results(l)
+
+def is_shallow(git_dir):
+    """ Return True if repository is a shallow clone.
+    """
+    try:
+        output = git('-C', git_dir, 'rev-parse', '--is-shallow-repository', _tty_out=False)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results('{}'.format(output).strip() == 'true')
+
 def clone_branch(repository_url, branch_name, username, userpasswd, repo_dir):
     """ Clone specific branch of repository.
     """
@@ -63,6 +170,112 @@ def clone_branch(repository_url, branch_name, username, userpasswd, repo_dir):
     else:
         return succeeded_util_call_results(None) 
 
+def clone_branch_no_checkout(repository_url, branch_name, repo_dir, depth=None, blob_filter=False):
+    """ Clone specific branch of repository without checking out files. History is truncated
+        to specified depth, if specified (only the branch is fetched then). Blobs are fetched
+        on demand (partial clone) when blob_filter is True.
+    """
+    args = ['clone', '--no-checkout']
+    if blob_filter:
+        args.append('--filter=blob:none')
+    if depth:
+        args.extend(['--depth', str(depth)])
+    try:
+        git(*(args + [repository_url, '-b', branch_name, repo_dir]))
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def add_remote_branch(git_dir, branch_name):
+    """ Add a branch to branches fetched from origin (for single-branch clone).
+    """
+    try:
+        git('-C', git_dir, 'remote', 'set-branches', '--add', 'origin', branch_name)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def fetch_branch(git_dir, branch_name, depth=None):
+    """ Fetch a branch of origin to its remote-tracking branch (e.g. 'origin/master').
+    """
+    refspec = '+refs/heads/{0}:refs/remotes/origin/{0}'.format(branch_name)
+    try:
+        if depth:
+            git('-C', git_dir, 'fetch', '--depth', str(depth), 'origin', refspec)
+        else:
+            git('-C', git_dir, 'fetch', 'origin', refspec)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def detach_head(git_dir):
+    """ Detach HEAD at current commit without updating index and work tree, so that the branch
+        can be checked out in other worktree.
+    """
+    try:
+        git('-C', git_dir, 'update-ref', '--no-deref', 'HEAD', 'HEAD')
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def add_worktree(git_dir, worktree_dir, branch_name, start_point):
+    """ Add a worktree without checking out files, with a branch (re)created at start point
+        (e.g. 'origin/master') which tracks the start point.
+    """
+    try:
+        git('-C', git_dir, 'worktree', 'add', '--no-checkout', '--track', '-B', branch_name, worktree_dir, start_point)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def remove_worktree(git_dir, worktree_dir):
+    """ Remove a worktree, discarding changes in it.
+    """
+    try:
+        git('-C', git_dir, 'worktree', 'remove', '--force', worktree_dir)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def prune_worktrees(git_dir):
+    """ Remove information of worktrees whose directories are removed.
+    """
+    try:
+        git('-C', git_dir, 'worktree', 'prune')
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def set_sparse_checkout(git_dir, patterns):
+    """ Enable sparse checkout with patterns (gitignore style, e.g. '/src/strings/en-US.json')
+        and update work tree.
+    """
+    try:
+        git('-C', git_dir, 'sparse-checkout', 'set', '--no-cone', '--stdin', _in='\n'.join(patterns) + '\n')
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
+def get_sparse_checkout_patterns(git_dir):
+    """ Return list of sparse checkout patterns, or None when sparse checkout is not enabled.
+    """
+    try:
+        output = git('-C', git_dir, 'sparse-checkout', 'list', _tty_out=False)
+    except ErrorReturnCode as e:
+        if 'not sparse' in '{}'.format(e.stderr):
+            return succeeded_util_call_results(None)
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results([x for x in '{}'.format(output).splitlines() if x.strip()])
+
 def checkout_branch(git_dir, branch_name):
     """ Checkout a branch.
     """
@@ -116,11 +329,17 @@ def set_config_useremail(git_dir, useremail):
     else:
         return succeeded_util_call_results(None) 
 
-def commit(git_dir, commit_message):
-    """ Issue commit with commit message.
+def commit(git_dir, commit_message, username=None, useremail=None):
+    """ Issue commit with commit message (by user name and email, if specified, without
+        writing them to git config which might be shared by worktrees).
     """
+    args = []
+    if username:
+        args.extend(['-c', 'user.name={}'.format(username)])
+    if useremail:
+        args.extend(['-c', 'user.email={}'.format(useremail)])
     try:
-        git('-C', git_dir, 'commit', '-m', commit_message)
+        git(*(args + ['-C', git_dir, 'commit', '-m', commit_message]))
     except ErrorReturnCode as e:
         return failed_util_call_results(e)
     else:
@@ -155,6 +374,16 @@ def add_file(git_dir, file_path):
     else:
         return succeeded_util_call_results(None) 
 
+def add_files(git_dir, file_paths):
+    """ Add files to index at once.
+    """
+    try:
+        git('-C', git_dir, 'add', '--', *file_paths)
+    except ErrorReturnCode as e:
+        return failed_util_call_results(e)
+    else:
+        return succeeded_util_call_results(None) 
+
 def set_remote_url(git_dir, url):
     try:
         git('-C', git_dir, 'remote', 'set-url', 'origin', url)
@@ -163,12 +392,17 @@ def set_remote_url(git_dir, url):
     else:
         return succeeded_util_call_results(None) 
 
-def push_branch_set_upstream(git_dir, branch_name):
-    """ Push new branch to remote.
+def push_branch_set_upstream(git_dir, branch_name, url=None):
+    """ Push new branch to remote. When url is specified, the branch is pushed to the url
+        instead of origin (without setting upstream), so that the url (e.g. with credentials)
+        is not written to git config.
     """
     try:
-        # this will ask username/password
-        git('-C', git_dir, 'push', '--set-upstream', 'origin', branch_name)
+        if url:
+            git('-C', git_dir, 'push', url, '{0}:refs/heads/{0}'.format(branch_name))
+        else:
+            # this will ask username/password
+            git('-C', git_dir, 'push', '--set-upstream', 'origin', branch_name)
     except ErrorReturnCode as e:
         return failed_util_call_results(e)
     else:
@@ -179,20 +413,11 @@ def get_commit(git_dir, file_path):
     """ Return commit sha1(s) which contains specified file.
     """
     try:
-        output = git('-C', git_dir, 'log', 'master..', '--pretty=format:%H', file_path)
+        output = git('-C', git_dir, 'log', 'master..', '--pretty=format:%H', '--', file_path, _tty_out=False)
     except ErrorReturnCode as e:
         return failed_util_call_results(e)
     else:
-        commits = []
-        for s in output:
-            # as output from sh contains VT100 escape sequences,
-            # extract only sha1 out of it.
-            c = '{}'.format(s).strip().rstrip()
-            regex = re.compile(r'[a-z0-9]{40}')
-            m = regex.search(c)
-            if m:
-                commits.append(m.group(0))
-        return succeeded_util_call_results(commits) 
+        return succeeded_util_call_results([x.strip() for x in '{}'.format(output).splitlines() if x.strip()])
 
 def revert_commit(git_dir, commit, file_path, revert_commit_message):
     """ Revert commit for specified file.
@@ -0,0 +1,173 @@
+'''
+    Refs Git Backend
+
+    Read-only git queries answered by reading files in the git directory, without spawning
+    a git process per query. It is not a persistent git process: queries which need objects,
+    the index or history walk (status, log, diff, file contents) still run git for each query
+    (see commands.py).
+
+        query                   how
+        ----------------------------------------------------------------------
+        current branch          HEAD file in the git directory.
+        head commit             HEAD file and the ref it points to (loose ref file or packed-refs).
+        branches                Loose ref files and packed-refs under refs/heads and refs/remotes.
+
+    Functions return UtilCallResults in the same way as commands.py. Only the files format
+    of refs is read; repositories which store refs in reftable (extensions.refStorage) are
+    not supported (see is_supported()).
+
+'''
+import os
+
+import logging
+logger = logging.getLogger('tpa')
+
+from core.plugins.results import succeeded_util_call_results, failed_util_call_results
+
+class GitRefsError(Exception):
+    pass
+
+def _read_text(path):
+    with open(path) as fi:
+        return fi.read().strip()
+
+def _get_git_dirs(git_dir):
+    """ Return tuple of (git directory, common git directory) of a working tree.
+        They differ for a linked working tree (git worktree), whose '.git' is a file.
+    """
+    dot_git = os.path.join(git_dir, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git, dot_git
+    if not os.path.isfile(dot_git):
+        raise GitRefsError("Not a git repository: '{}'.".format(git_dir))
+    s = _read_text(dot_git)
+    if not s.startswith('gitdir:'):
+        raise GitRefsError("Unknown .git file: '{}'.".format(dot_git))
+    d = s[len('gitdir:'):].strip()
+    if not os.path.isabs(d):
+        d = os.path.normpath(os.path.join(git_dir, d))
+    common = d
+    path = os.path.join(d, 'commondir')
+    if os.path.isfile(path):
+        common = _read_text(path)
+        if not os.path.isabs(common):
+            common = os.path.normpath(os.path.join(d, common))
+    return d, common
+
+def _read_packed_refs(common_dir):
+    """ Return dictionary of ref name -> sha1 in packed-refs. """
+    refs = {}
+    path = os.path.join(common_dir, 'packed-refs')
+    if not os.path.isfile(path):
+        return refs
+    with open(path) as fi:
+        for l in fi:
+            l = l.rstrip('\n')
+            if not l or l[0] in ('#', '^'):
+                continue
+            x = l.split(' ', 1)
+            if len(x) == 2:
+                refs[x[1]] = x[0]
+    return refs
+
+def _read_loose_ref(common_dir, ref):
+    path = os.path.join(common_dir, *ref.split('/'))
+    if os.path.isfile(path):
+        return _read_text(path)
+    return None
+
+def _resolve_ref(common_dir, ref, depth=0):
+    """ Return sha1 of a ref, following symbolic refs. Return None when the ref does not exist. """
+    if depth > 5:
+        raise GitRefsError("Too deep symbolic ref: '{}'.".format(ref))
+    s = _read_loose_ref(common_dir, ref)
+    if s == None:
+        s = _read_packed_refs(common_dir).get(ref)
+    if s == None:
+        return None
+    if s.startswith('ref:'):
+        return _resolve_ref(common_dir, s[len('ref:'):].strip(), depth + 1)
+    return s
+
+def _read_head(git_dir):
+    """ Return tuple of (ref name HEAD points to or None when detached, sha1 or None for unborn branch). """
+    d, common = _get_git_dirs(git_dir)
+    s = _read_text(os.path.join(d, 'HEAD'))
+    if s.startswith('ref:'):
+        ref = s[len('ref:'):].strip()
+        return ref, _resolve_ref(common, ref)
+    return None, s
+
+def _list_refs(common_dir, prefix):
+    """ Return dictionary of ref name -> sha1 or symbolic ref ('ref: ...') under a prefix (e.g. 'refs/heads/'). """
+    refs = dict((k, v) for k, v in _read_packed_refs(common_dir).items() if k.startswith(prefix))
+    top = os.path.join(common_dir, *prefix.rstrip('/').split('/'))
+    for root, dirs, files in os.walk(top):
+        for f in files:
+            if f.endswith('.lock'):
+                continue
+            path = os.path.join(root, f)
+            ref = '/'.join([prefix.rstrip('/')] + os.path.relpath(path, top).split(os.sep))
+            try:
+                refs[ref] = _read_text(path)
+            except (IOError, OSError):
+                continue
+    return refs
+
+def is_supported(git_dir):
+    """ Return True when refs of a repository can be read from files (i.e. not reftable).
+    """
+    try:
+        d, common = _get_git_dirs(git_dir)
+    except (IOError, OSError, GitRefsError):
+        return False
+    return not os.path.isdir(os.path.join(common, 'reftable'))
+
+def get_current_branch_name(git_dir):
+    """ Return current branch name (e.g. 'master'), or 'HEAD' when HEAD is detached.
+    """
+    try:
+        ref, sha1 = _read_head(git_dir)
+    except (IOError, OSError, GitRefsError) as e:
+        return failed_util_call_results(e)
+    if ref == None:
+        return succeeded_util_call_results('HEAD')
+    if ref.startswith('refs/heads/'):
+        ref = ref[len('refs/heads/'):]
+    return succeeded_util_call_results(ref)
+
+def get_head_commit(git_dir):
+    """ Return sha1 of HEAD commit.
+    """
+    try:
+        ref, sha1 = _read_head(git_dir)
+    except (IOError, OSError, GitRefsError) as e:
+        return failed_util_call_results(e)
+    if not sha1:
+        return failed_util_call_results("No commit in HEAD: '{}'.".format(ref))
+    return succeeded_util_call_results(sha1)
+
+def get_branch_all(git_dir):
+    """ Return all branch names as list of lines in the same format as 'git branch --all'.
+        e.g. ['* master', '  remotes/origin/HEAD -> origin/master', '  remotes/origin/master']
+    """
+    try:
+        ref, sha1 = _read_head(git_dir)
+        d, common = _get_git_dirs(git_dir)
+        heads = _list_refs(common, 'refs/heads/')
+        remotes = _list_refs(common, 'refs/remotes/')
+    except (IOError, OSError, GitRefsError) as e:
+        return failed_util_call_results(e)
+    lines = []
+    if ref == None:
+        lines.append('* (HEAD detached at {})'.format(sha1[:7]))
+    for k in sorted(heads):
+        lines.append('{} {}'.format('*' if k == ref else ' ', k[len('refs/heads/'):]))
+    for k in sorted(remotes):
+        name = k[len('refs/'):]
+        v = remotes[k]
+        if v.startswith('ref:'):
+            lines.append('  {} -> {}'.format(name, v[len('ref:'):].strip()[len('refs/remotes/'):]))
+        else:
+            lines.append('  {}'.format(name))
+    return succeeded_util_call_results(lines)
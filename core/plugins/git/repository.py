@@ -11,14 +11,59 @@ logger = logging.getLogger('tpa')
 
 import settings
 import commands as git
+import core.repolock as repolock
+
+# Worktrees of branches are created in LOCAL_REPO_DIR/WORKTREE_DIRNAME/<repository name>/<branch name>.
+WORKTREE_DIRNAME = '.worktrees'
+
+# git version required for sparse clone ('git sparse-checkout set --no-cone').
+SPARSE_CLONE_MIN_GIT_VERSION = (2, 35)
+
+_sparse_clone_supported = None
+
+def is_sparse_clone_supported():
+    """ Return True if version of git supports sparse clone. """
+    global _sparse_clone_supported
+    if _sparse_clone_supported == None:
+        ret = git.get_version()
+        if ret.succeeded:
+            _sparse_clone_supported = ret.output >= SPARSE_CLONE_MIN_GIT_VERSION
+            if not _sparse_clone_supported:
+                logger.info("Sparse clone is disabled. git version: {} (required: {}).".format(ret.output, SPARSE_CLONE_MIN_GIT_VERSION))
+        else:
+            logger.error("Failed to get git version. Reason: '{}'.".format(ret.message))
+            _sparse_clone_supported = False
+    return _sparse_clone_supported
+
+def get_worktree_dir(repository_name, branch_name):
+    """ Return path to worktree of a branch. '/' in branch name is escaped. """
+    name = branch_name.replace('%', '%25').replace('/', '%2F')
+    return os.path.join(settings.LOCAL_REPO_DIR, WORKTREE_DIRNAME, repository_name, name)
+
+def get_worktree_branch_name(dirname):
+    """ Return branch name of a worktree directory name (see get_worktree_dir()). """
+    return dirname.replace('%2F', '/').replace('%25', '%')
 
 class GitRepository():
-    def __init__(self, repository_url, repository_owner, repository_name, branch_name, creds=None):
+    def __init__(self, repository_url, repository_owner, repository_name, branch_name, creds=None, sparse_paths=None):
+        """ sparse_paths:   List of file paths in repository to check out (e.g. resource and translation paths).
+                            Repository is cloned as sparse clone (see settings.GIT_SPARSE_CLONE) when specified.
+        """
         self._repository_url = repository_url
         self._repository_owner = repository_owner
         self._repository_name = repository_name
         self._repository_branch_name = branch_name
-        self._local_repo_dir = os.path.join(settings.LOCAL_REPO_DIR, self._repository_name)
+        # clone of the repository. when GIT_WORKTREE_PER_BRANCH is set, it is shared by worktrees
+        # of branches and files are not checked out in it.
+        self._clone_dir = os.path.join(settings.LOCAL_REPO_DIR, self._repository_name)
+        if settings.GIT_WORKTREE_PER_BRANCH:
+            self._local_repo_dir = get_worktree_dir(self._repository_name, self._repository_branch_name)
+        else:
+            self._local_repo_dir = self._clone_dir
+        if sparse_paths and settings.GIT_SPARSE_CLONE and is_sparse_clone_supported():
+            self._sparse_patterns = sorted(set(['/' + x.lstrip('/') for x in sparse_paths]))
+        else:
+            self._sparse_patterns = None
 
         if creds:
             self._git_username = creds.username 
@@ -91,6 +136,18 @@ class GitRepository():
                 logger.error("Failed to pull: '{}'.".format(self._repository_name))
                 return False
 
+        if not self._update_sparse_checkout():
+            logger.error("Failed to pull: '{}'.".format(self._repository_name))
+            return False
+
+        ret = git.is_shallow(self._local_repo_dir)
+        if not ret.succeeded:
+            logger.error("Failed to check if repository is shallow. Reason: '{}'.".format(ret.message))
+            logger.error("Failed to pull: '{}'.".format(self._repository_name))
+            return False
+        if ret.output:
+            return self._pull_shallow()
+
         logger.info("Start pulling...")
         ret =  git.pull(self._local_repo_dir)
         if ret.succeeded:
@@ -100,12 +157,153 @@ class GitRepository():
             logger.error("Failed to pull: '{}' ('{}'). Reason: '{}'.".format(self._repository_name, work_branch, ret.message))
             return False
 
+    def _pull_shallow(self):
+        """ Fetch only tip of work branch (GIT_CLONE_DEPTH commits), and reset work branch to it.
+            History of the branch is not fetched, so the tip cannot be merged. Work branch has no
+            local commits (translation updates are committed in feature branches).
+        """
+        work_branch = self._repository_branch_name
+        logger.info("Start fetching...")
+        ret = git.fetch_branch(self._local_repo_dir, work_branch, settings.GIT_CLONE_DEPTH)
+        if not ret.succeeded:
+            logger.error("Failed to fetch: '{}' ('{}'). Reason: '{}'.".format(self._repository_name, work_branch, ret.message))
+            return False
+        ret = git.reset_keep(self._local_repo_dir, 'origin/' + work_branch)
+        if ret.succeeded:
+            logger.info("Pulled: '{}' ('{}').".format(self._repository_name, work_branch))
+            return True
+        else:
+            logger.error("Failed to reset to fetched branch: '{}' ('{}'). Reason: '{}'.".format(self._repository_name, work_branch, ret.message))
+            return False
+
+    def _update_sparse_checkout(self):
+        """ Update sparse checkout patterns of sparse clone when paths to check out are changed
+            (e.g. resource configuration is updated). Full clone is left as it is.
+        """
+        if not self._sparse_patterns:
+            return True
+        ret = git.get_sparse_checkout_patterns(self._local_repo_dir)
+        if not ret.succeeded:
+            logger.error("Failed to get sparse checkout patterns. Reason: '{}'.".format(ret.message))
+            return False
+        if ret.output == None or sorted(ret.output) == self._sparse_patterns:
+            return True
+        ret = git.set_sparse_checkout(self._local_repo_dir, self._sparse_patterns)
+        if ret.succeeded:
+            logger.info("Updated sparse checkout: {} paths.".format(len(self._sparse_patterns)))
+            return True
+        else:
+            logger.error("Failed to update sparse checkout. Reason: '{}'.".format(ret.message))
+            return False
+
+    def _checkout_files(self):
+        """ Check out files of work branch in local repository which is created without checking out files.
+        """
+        if self._sparse_patterns:
+            ret = git.set_sparse_checkout(self._local_repo_dir, self._sparse_patterns)
+            if not ret.succeeded:
+                logger.error("Failed to set sparse checkout: '{}'. Reason: '{}'.".format(self._repository_name, ret.message))
+                return False
+        ret = git.checkout_branch(self._local_repo_dir, self._repository_branch_name)
+        if not ret.succeeded:
+            logger.error("Failed to checkout branch: '{}'. Reason: '{}'.".format(self._repository_branch_name, ret.message))
+            return False
+        return True
+
+    def _clone_sparse(self, url):
+        ret = git.clone_branch_no_checkout(url, self._repository_branch_name, self._local_repo_dir, settings.GIT_CLONE_DEPTH, blob_filter=True)
+        if not ret.succeeded:
+            logger.error("Failed to clone: '{}' ('{}'). Reason: '{}'.".format(url, self._repository_branch_name, ret.message))
+            return False
+        if not self._checkout_files():
+            return False
+        logger.info("Cloned: '{}' ('{}'), {} paths.".format(url, self._repository_branch_name, len(self._sparse_patterns)))
+        return True
+
+    def _clone_shared(self, url):
+        """ Clone repository without checking out files, to be shared by worktrees of branches.
+        """
+        if self._sparse_patterns:
+            ret = git.clone_branch_no_checkout(url, self._repository_branch_name, self._clone_dir, settings.GIT_CLONE_DEPTH, blob_filter=True)
+        else:
+            ret = git.clone_branch_no_checkout(url, self._repository_branch_name, self._clone_dir)
+        if ret.succeeded:
+            logger.info("Cloned: '{}' ('{}').".format(url, self._repository_branch_name))
+            return True
+        else:
+            logger.error("Failed to clone: '{}' ('{}'). Reason: '{}'.".format(url, self._repository_branch_name, ret.message))
+            return False
+
+    def _add_worktree(self):
+        branch = self._repository_branch_name
+        ret = git.prune_worktrees(self._clone_dir)
+        if not ret.succeeded:
+            logger.error("Failed to prune worktrees: '{}'. Reason: '{}'.".format(self._repository_name, ret.message))
+            return False
+
+        # a branch can be checked out only in one worktree.
+        ret = git.get_current_branch_name(self._clone_dir)
+        if not ret.succeeded:
+            logger.error("Failed to get current branch name. Reason: '{}'.".format(ret.message))
+            return False
+        if ret.output == branch:
+            ret = git.detach_head(self._clone_dir)
+            if not ret.succeeded:
+                logger.error("Failed to detach HEAD: '{}'. Reason: '{}'.".format(self._repository_name, ret.message))
+                return False
+
+        ret = git.is_shallow(self._clone_dir)
+        if not ret.succeeded:
+            logger.error("Failed to check if repository is shallow. Reason: '{}'.".format(ret.message))
+            return False
+        depth = settings.GIT_CLONE_DEPTH if ret.output else None
+        ret = git.add_remote_branch(self._clone_dir, branch)
+        if not ret.succeeded:
+            logger.error("Failed to add remote branch: '{}' ('{}'). Reason: '{}'.".format(self._repository_name, branch, ret.message))
+            return False
+        ret = git.fetch_branch(self._clone_dir, branch, depth)
+        if not ret.succeeded:
+            logger.error("Failed to fetch branch: '{}' ('{}'). Reason: '{}'.".format(self._repository_name, branch, ret.message))
+            return False
+
+        ret = git.add_worktree(self._clone_dir, self._local_repo_dir, branch, 'origin/' + branch)
+        if not ret.succeeded:
+            logger.error("Failed to add worktree: '{}'. Reason: '{}'.".format(self._local_repo_dir, ret.message))
+            return False
+        if not self._checkout_files():
+            return False
+        logger.info("Added worktree: '{}' ('{}').".format(self._local_repo_dir, branch))
+        return True
+
+    def _clone_worktree(self, repository_url_with_creds_embedded):
+        """ Create worktree of work branch, or pull when it exists.
+            The clone shared by worktrees is locked while it is updated (cloning, fetching
+            and adding worktree), so that jobs for other branches can run concurrently.
+        """
+        lock = repolock.RepositoryLock(self._repository_name)
+        if not lock.acquire():
+            logger.error("Failed to lock repository: '{}'.".format(self._repository_name))
+            return False
+        try:
+            if os.path.isdir(self._local_repo_dir):
+                logger.info("Local worktree exists: {}.".format(self._local_repo_dir))
+                return self._pull()
+            if not os.path.isdir(self._clone_dir):
+                logger.info("Start cloning...")
+                if not self._clone_shared(repository_url_with_creds_embedded or self._repository_url):
+                    return False
+            return self._add_worktree()
+        finally:
+            lock.release()
+
     def _clone(self, repository_url_with_creds_embedded):
         logger.info("Start cloning...")
         if repository_url_with_creds_embedded:
             url = repository_url_with_creds_embedded
         else:
             url = self._repository_url
+        if self._sparse_patterns:
+            return self._clone_sparse(url)
         ret = git.clone_branch(url, self._repository_branch_name, self._git_username, self._git_userpasswd, self._local_repo_dir)
         if ret.succeeded:
             logger.info("Cloned: '{}' ('{}').".format(url, self._repository_branch_name))
@@ -123,12 +321,34 @@ class GitRepository():
     def clone(self, repository_url_with_creds_embedded=None):
         """ Clone if local repository exists. Pull, otherwise.
         """
+        if settings.GIT_WORKTREE_PER_BRANCH:
+            return self._clone_worktree(repository_url_with_creds_embedded)
         if os.path.isdir(self._local_repo_dir):
             logger.info("Local repository exists: {}.".format(self._local_repo_dir))
             return  self._pull()
         else:
             return self._clone(repository_url_with_creds_embedded)
 
+    def get_head_commit(self):
+        """ Return sha1 of HEAD commit in local repository, or None on any errors.
+        """
+        ret = git.get_head_commit(self._local_repo_dir)
+        if ret.succeeded:
+            return ret.output
+        else:
+            logger.error("Failed to get HEAD commit: '{}'. Reason: '{}'.".format(self._repository_name, ret.message))
+            return None
+
+    def get_changed_files(self, from_commit, to_commit):
+        """ Return list of file paths changed between two commits, or None on any errors.
+        """
+        ret = git.get_changed_files(self._local_repo_dir, from_commit, to_commit)
+        if ret.succeeded:
+            return ret.output
+        else:
+            logger.error("Failed to get changed files: '{}' ({}..{}). Reason: '{}'.".format(self._repository_name, from_commit, to_commit, ret.message))
+            return None
+
     def _update_translation(self, translation_import):
         orig_path = os.path.join(self._local_repo_dir, translation_import['translation_path'])
         if not os.path.isfile(orig_path):
@@ -154,21 +374,30 @@ class GitRepository():
             the given 'list_translation_import' makes any updates to the repository,
             or None othewise.
         """
-        staged = []
         feature_branch_name = self._checkout_feature_branch()
         if not feature_branch_name:
             return None
 
+        # status of work tree is obtained once for all files, before any files are updated.
+        status = self._get_status_entries()
+        if status == None:
+            logger.error("Skipped staging all files. Failed to get status of work tree.")
+            self._checkout_work_branch()
+            self._delete_local_branch(feature_branch_name)
+            return None
+
         # try staging translation as much as possible b/c good ones can be PRed.
+        updated = []
         for t in list_translation_import:
             logger.info("Importing '{}'...".format(t['local_path']))
-            if not self._is_file_clean(t):
+            if not self._is_file_clean(t, status):
                 logger.error("Skipped staging file. The file is dirty: '{}'.".format(t['translation_path'])) 
                 continue
             if not self._update_translation(t):
                 continue
-            self._add_file(t['translation_path'], staged)
+            updated.append(t['translation_path'])
 
+        staged = self._add_files(updated)
         if len(staged) == 0:
             self._checkout_work_branch()
             self._delete_local_branch(feature_branch_name)
@@ -196,7 +425,8 @@ class GitRepository():
             return False
 
     def _checkout_feature_branch(self):
-        new_branch_name = 'TPA_{}'.format(datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+        # work branch is in the name, so that worktrees of branches (sharing branch names) do not create the same branch.
+        new_branch_name = 'TPA_{}_{}'.format(datetime.datetime.now().strftime("%Y%m%d_%H%M%S"), re.sub(r'[^A-Za-z0-9._-]', '-', self._repository_branch_name))
         ret = git.checkout_new_branch(self._local_repo_dir, new_branch_name, self._repository_branch_name)
         if ret.succeeded:
             return new_branch_name
@@ -217,47 +447,53 @@ class GitRepository():
             logger.error("BUG: git username and userpasswd need to be set before calling GitRepository._commit().")
             return False
  
-        ret = git.set_config_username(self._local_repo_dir, self._git_userfullname)
-        if not ret.succeeded:
-            logger.error("Failed to set git config username: '{}'. Reason: '{}'".format(self._git_userfullname, ret.message))
-            return False
-
-        ret = git.set_config_useremail(self._local_repo_dir, self._git_useremail)
-        if not ret.succeeded:
-            logger.error("Failed to set git config useremail: '{}'. Reason: '{}'.".format(self._git_useremail, ret.message))
-            return False
-
-        ret = git.commit(self._local_repo_dir, "Translation updates.")
+        ret = git.commit(self._local_repo_dir, "Translation updates.", self._git_userfullname, self._git_useremail)
         if ret.succeeded:
             return True
         else:
             logger.error("Failed to commit. Reason: '{}'.".format(ret.message))
             return False
 
-    def _add_file(self, translation_path, list_staged_path):
-        ret = git.not_staged_for_commit(self._local_repo_dir, translation_path)
-        if not ret.succeeded:
-            logger.error("Failed to check staged or not: {}. Reason: '{}'.".format(translation_path, ret.message))
-            return
-        if not ret.output:
-            # this is a bug since the changes have been ensured before translation file was copied to local repository.
-            logger.error("Translation file is already staged: '{}'.".format(translation_path))
-            return
-
-        ret = git.add_file(self._local_repo_dir, translation_path)
+    def _add_files(self, translation_paths):
+        """ Stage files at once. When it fails, files are staged one by one so that good ones can be staged.
+            Return list of staged files.
+        """
+        if not translation_paths:
+            return []
+
+        ret = git.add_files(self._local_repo_dir, translation_paths)
         if ret.succeeded:
-            list_staged_path.append(translation_path)
-        else:
-            logger.error("Failed to add file: '{}'. Reason: '{}'.".format(translation_path, ret.message))
+            for path in translation_paths:
+                logger.info("Staged file: '{}'.".format(path))
+            return list(translation_paths)
 
-    def _is_file_clean(self, translation_import):
-        ret = git.get_status_porcelain(self._local_repo_dir)
-        if not ret.succeeded:
+        logger.error("Failed to add {} files at once. Reason: '{}'.".format(len(translation_paths), ret.message))
+        staged = []
+        for path in translation_paths:
+            ret = git.add_files(self._local_repo_dir, [path])
+            if ret.succeeded:
+                logger.info("Staged file: '{}'.".format(path))
+                staged.append(path)
+            else:
+                logger.error("Failed to add file: '{}'. Reason: '{}'.".format(path, ret.message))
+        return staged
+
+    def _get_status_entries(self):
+        """ Return status of files which are not clean in work tree (path -> status code), or None on any errors. """
+        ret = git.get_status_entries(self._local_repo_dir)
+        if ret.succeeded:
+            return ret.output
+        else:
             logger.error("Failed to get status: '{}'. Reason: '{}'.".format(self._repository_name, ret.message))
-            return False
+            return None
 
-        for line in ret.output:
-            if translation_import['translation_path'] in line.strip().rstrip():
+    def _is_file_clean(self, translation_import, status_entries):
+        path = translation_import['translation_path']
+        if path in status_entries:
+            return False
+        # a file in untracked directory.
+        for x in status_entries:
+            if x.endswith('/') and path.startswith(x):
                 return False
         return True
 
@@ -269,12 +505,14 @@ class GitRepository():
             logger.error("Failed to set remote url: '{}'. Reason: '{}'.".format(url, ret.message))
             return False
 
-    def push_branch(self, branch_name):
+    def push_branch(self, branch_name, url=None):
+        """ Push a branch to origin, or url (e.g. with credentials embedded) when specified.
+        """
         if not (self._git_username and self._git_userpasswd):
             logger.error("BUG: git username and userpasswd need to be set before calling GitRepository.push_branch().")
             return False
 
-        ret = git.push_branch_set_upstream(self._local_repo_dir, branch_name)
+        ret = git.push_branch_set_upstream(self._local_repo_dir, branch_name, url)
         if ret.succeeded:
             return True
         else:
@@ -10,6 +10,7 @@ logger = logging.getLogger('tpa')
 
 from core.plugins.results import PullRequestResults
 from core.plugins.git.repository import GitRepository
+import core.plugins.execstats as execstats
 from core.plugins.repository_base import ResourceRepository, Resource, ResourceBundle
 import utils
 
@@ -27,7 +28,11 @@ class GithubRepository(ResourceRepository):
         self._import_entries = []
 
     def _create_local_repository(self, config, creds):
-        repo = GitRepository(config.repository_url, config.repository_owner, config.repository_name, config.repository_branch, creds)
+        paths = []
+        for r in config.resources:
+            paths.append(r.path)
+            paths.extend([t.path for t in r.translations])
+        repo = GitRepository(config.repository_url, config.repository_owner, config.repository_name, config.repository_branch, creds, sparse_paths=paths)
         return repo
 
     def get_repository_name(self):
@@ -55,15 +60,17 @@ class GithubRepository(ResourceRepository):
         url = orig_url[0:8] + username + ':' + userpasswd + '@' + orig_url[8:]
         return self.local_repo.clone(repository_url_with_creds_embedded=url)
 
-    def _set_remote_url(self):
+    def _get_remote_url(self):
+        """ Return url to push to, with credentials embedded. It is not written to git config
+            (origin) which is shared by worktrees of branches.
+        """
         user_name = self.local_repo.get_user_name()
         user_passwd = self.local_repo.get_user_passwd()
         repository_owner = self.local_repo.get_repository_owner()
         repository_name = self.local_repo.get_repository_name()
-        url = "https://{}:{}@github.com/{}/{}.git".format(user_name, user_passwd, repository_owner, repository_name)
-        return self.local_repo.set_remote_url(url)
+        return "https://{}:{}@github.com/{}/{}.git".format(user_name, user_passwd, repository_owner, repository_name)
 
-    def get_resource_bundle(self):
+    def get_resource_bundle(self, ledger=None):
         resources = []
         n = len(self.config.resources)
         for i in range(0, n):
@@ -73,7 +80,7 @@ class GithubRepository(ResourceRepository):
         for x in resources:
             logger.info("{}".format(x))
 
-        return  ResourceBundle(self.local_repo, resources, self._log_dir)
+        return  ResourceBundle(self.local_repo, resources, self._log_dir, ledger)
 
     def _create_resource(self, repository_name, resource_index):
         r = Resource(
@@ -86,15 +93,11 @@ class GithubRepository(ResourceRepository):
         return r
 
     def _add_import_entry(self, translation_bundles):
-        options = self.config.options
-        if 'hold_pullrequest_until_all_languages_completes' in options:
-            if options['hold_pullrequest_until_all_languages_completes']:
-                logger.info("hold_pullrequest_until_all_languages_completes: true")
-                self._add_import_entry_with_all_languages(translation_bundles)
-            else:
-                logger.info("hold_pullrequest_until_all_languages_completes: false")
-                self._add_import_entry_with_any_languages(translation_bundles)
+        if self.hold_pullrequest_until_all_languages_completes():
+            logger.info("hold_pullrequest_until_all_languages_completes: true")
+            self._add_import_entry_with_all_languages(translation_bundles)
         else:
+            logger.info("hold_pullrequest_until_all_languages_completes: false")
             self._add_import_entry_with_any_languages(translation_bundles)
 
     def _add_import_entry_with_any_languages(self, translation_bundles):
@@ -190,7 +193,7 @@ class GithubRepository(ResourceRepository):
             "status_code": status_code,
             "pullrequest_url": pullrequest_url
         }
-        logger.info("ExecStats='{}'".format(json.dumps(d)))
+        execstats.write(self._log_dir, d)
 
     def _generate_pullrequest_description(self, file_paths):
         return 'Translation Process Automation generated string (DO NOT EDIT): [' + ','.join(file_paths) + ']' 
@@ -206,12 +209,7 @@ class GithubRepository(ResourceRepository):
         for ent in staged_files:
             logger.info("- '{}'".format(ent))
 
-        if not self._set_remote_url():
-            message = "Not submitted PR. Failed to set remote url."
-            self._write_execstats("FAILURE", message, None, None)
-            return PullRequestResults(1, False, message, None, None, None, None)
-
-        if not self.local_repo.push_branch(merge_branch_name):
+        if not self.local_repo.push_branch(merge_branch_name, self._get_remote_url()):
             message = "Not submitted PR. Failed to push branch: '{}'.".format(merge_branch_name)
             self._write_execstats("FAILURE", message, None, None)
             return PullRequestResults(1, False, message, None, None, None, None)
@@ -0,0 +1,127 @@
+'''
+    HTTP Client
+
+    Shared HTTP client for REST APIs of translation/resource platforms. Each platform and
+    credentials (e.g. user name) has its own requests.Session so that connections are kept
+    alive and reused across API calls.
+
+'''
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, HTTPError
+
+import settings
+from core.plugins.results import succeeded_rest_api_call_results, failed_rest_api_call_results, HttpCallStats
+
+_lock = threading.Lock()
+_sessions = {} # (platform, credentials key) -> requests.Session
+_totals = {} # platform -> {'calls', 'errors', 'elapsed', 'bytes_received', 'content_length'}
+
+def _create_session():
+    s = requests.Session()
+    s.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.HTTP_POOL_MAXSIZE)
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+def get_session(platform, creds_key=None):
+    """ Return requests.Session for a platform and credentials (e.g. user name). """
+    key = (platform, creds_key)
+    with _lock:
+        s = _sessions.get(key)
+        if s == None:
+            s = _create_session()
+            _sessions[key] = s
+        return s
+
+def _bytes_received(response):
+    try:
+        n = response.raw.tell() # bytes read from the wire before decoding.
+    except (AttributeError, ValueError):
+        n = None
+    if not n:
+        n = len(response.content)
+    return n
+
+def _create_stats(response, start_time):
+    elapsed = time.time() - start_time
+    if response == None:
+        return HttpCallStats(elapsed, None, 0, 0)
+    return HttpCallStats(elapsed, response.status_code, _bytes_received(response), len(response.content))
+
+def _add_totals(platform, succeeded, stats):
+    with _lock:
+        d = _totals.setdefault(platform, {'calls': 0, 'errors': 0, 'elapsed': 0.0, 'bytes_received': 0, 'content_length': 0})
+        d['calls'] += 1
+        if not succeeded:
+            d['errors'] += 1
+        d['elapsed'] += stats.elapsed
+        d['bytes_received'] += stats.bytes_received
+        d['content_length'] += stats.content_length
+
+def get_totals():
+    """ Return totals of API calls made in this process, per platform. """
+    with _lock:
+        return dict((k, dict(v)) for k, v in _totals.items())
+
+def request(platform, method, url, creds_key=None, **kwargs):
+    """ Call a REST API with session for the platform and credentials.
+        kwargs are passed to requests.Session.request(). Timeout is set unless specified.
+        Return RestApiResults.
+    """
+    kwargs.setdefault('timeout', (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT))
+    session = get_session(platform, creds_key)
+    start_time = time.time()
+    r = None
+    try:
+        r = session.request(method, url, **kwargs)
+        r.raise_for_status()
+    except (RequestException, HTTPError) as e:
+        stats = _create_stats(r, start_time)
+        _add_totals(platform, False, stats)
+        return failed_rest_api_call_results(e, stats)
+    else:
+        stats = _create_stats(r, start_time)
+        _add_totals(platform, True, stats)
+        return succeeded_rest_api_call_results(r, stats=stats)
+
+def stream(platform, method, url, creds_key=None, **kwargs):
+    """ Call a REST API and return RestApiResults without reading response body, so that the
+        body can be read in chunks (e.g. response.iter_content()). Caller has to close the
+        response (response.close()) to release the connection.
+        Stats have elapsed time until response headers are received, and Content-Length.
+    """
+    kwargs.setdefault('timeout', (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT))
+    kwargs['stream'] = True
+    session = get_session(platform, creds_key)
+    start_time = time.time()
+    r = None
+    try:
+        r = session.request(method, url, **kwargs)
+        r.raise_for_status()
+    except (RequestException, HTTPError) as e:
+        if r != None:
+            r.close()
+        stats = HttpCallStats(time.time() - start_time, r.status_code if r != None else None, 0, 0)
+        _add_totals(platform, False, stats)
+        return failed_rest_api_call_results(e, stats)
+    else:
+        try:
+            content_length = int(r.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = 0
+        stats = HttpCallStats(time.time() - start_time, r.status_code, content_length, content_length)
+        _add_totals(platform, True, stats)
+        return succeeded_rest_api_call_results(r, stats=stats)
+
+def get(platform, url, creds_key=None, **kwargs):
+    return request(platform, 'GET', url, creds_key, **kwargs)
+
+def post(platform, url, creds_key=None, **kwargs):
+    return request(platform, 'POST', url, creds_key, **kwargs)
+
+def put(platform, url, creds_key=None, **kwargs):
+    return request(platform, 'PUT', url, creds_key, **kwargs)
@@ -0,0 +1,90 @@
+'''
+    Upload Ledger
+
+    Upload ledger records resources uploaded to a translation platform by a resource uploader
+    job (a pair of resource and translation configuration files), so that next execution
+    of the job can skip resources which have not been changed since the last upload.
+
+    Ledger file (json)
+
+        keys                    values
+        ----------------------------------------------------------------------
+        resource_config         Resource configuration filename.
+        translation_config      Translation configuration filename.
+        commit                  HEAD commit of local repository at the last execution.
+        resources               {<resource path>: {'commit': <sha1>, 'sha1': <content hash>}}
+                                for resources successfully uploaded.
+
+'''
+import os
+import json
+from hashlib import sha1
+
+import logging
+logger = logging.getLogger('tpa')
+
+import settings
+
+def get_content_hash(path):
+    """ Return sha1 of file content, or None on any errors. """
+    h = sha1()
+    try:
+        with open(path, 'rb') as fi:
+            for chunk in iter(lambda: fi.read(65536), b''):
+                h.update(chunk)
+    except (IOError, OSError) as e:
+        logger.error("Failed to read file: '{}'. Reason: '{}'.".format(path, e))
+        return None
+    return h.hexdigest()
+
+class UploadLedger:
+    def __init__(self, resource_config_filename, translation_config_filename):
+        self.resource_config_filename = resource_config_filename
+        self.translation_config_filename = translation_config_filename
+        name = '{}__{}.json'.format(os.path.splitext(resource_config_filename)[0], os.path.splitext(translation_config_filename)[0])
+        self.path = os.path.join(settings.UPLOAD_LEDGER_DIR, name)
+        self.commit = None
+        self._resources = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path) as fi:
+                d = json.load(fi)
+            self.commit = d['commit']
+            self._resources = d['resources']
+        except (IOError, OSError, ValueError, KeyError) as e:
+            logger.error("Failed to read upload ledger: '{}'. Reason: '{}'.".format(self.path, e))
+            self.commit = None
+            self._resources = {}
+
+    def uploaded(self, resource_path, content_hash):
+        """ Return True when the resource with the content has been uploaded. """
+        x = self._resources.get(resource_path)
+        return x != None and content_hash != None and x['sha1'] == content_hash
+
+    def record(self, resource_path, commit, content_hash):
+        """ Record a resource uploaded successfully. """
+        self._resources[resource_path] = {'commit': commit, 'sha1': content_hash}
+
+    def save(self):
+        """ Write the ledger to file. Return True on success, False otherwise. """
+        d = {
+            'resource_config': self.resource_config_filename,
+            'translation_config': self.translation_config_filename,
+            'commit': self.commit,
+            'resources': self._resources
+            }
+        tmp_path = self.path + '.tmp'
+        try:
+            if not os.path.isdir(settings.UPLOAD_LEDGER_DIR):
+                os.makedirs(settings.UPLOAD_LEDGER_DIR)
+            with open(tmp_path, 'w') as fo:
+                json.dump(d, fo, indent=4, sort_keys=True)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            logger.error("Failed to write upload ledger: '{}'. Reason: '{}'.".format(self.path, e))
+            return False
+        return True
@@ -2,10 +2,15 @@ import os
 import abc
 from shutil import copyfile
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import logging
 logger = logging.getLogger('tpa')
 
+import settings
+from core.plugins.ledger import get_content_hash
+from core.plugins.watermark import WatermarkStore
 from core.resource import ResourceConfiguration
 from core.translation import TranslationConfiguration
 
@@ -53,6 +58,10 @@ class Resource:
         self.resource_translations = resource_translations
         # local
         self.local_path = str()
+        # False when the resource has not been changed since the last upload (see ResourceBundle).
+        self.changed = True
+        self.commit = None
+        self.content_hash = None
 
     def __str__(self):
         return ("Resource('repository_name': '{}', 'repository_branch': '{}', 'resource_path': '{}', 'resource_filetype': '{}', 'resource_language_code': '{}', 'resource_translation': '{}')".format(self.repository_name, self.repository_branch, self.resource_path, self.resource_filetype, self.resource_language_code, self.resource_translations))
@@ -61,12 +70,15 @@ class Resource:
         return self.local_path
 
 class ResourceBundle:
-    def __init__(self, platform_repository, resources, log_dir):
+    def __init__(self, platform_repository, resources, log_dir, ledger=None):
         self.platform_repo = platform_repository
         self._resources = resources
         self._log_dir = log_dir
+        self._ledger = ledger
         self._last_index = len(resources) - 1
         self._current_index = 0
+        self.head_commit = None
+        self._changed_files = None # None means all resources are considered as changed.
 
     def __iter__(self):
         return self
@@ -75,15 +87,42 @@ class ResourceBundle:
         if self._current_index == 0:
             if not self.platform_repo.clone():
                 raise StopIteration
+            if self._ledger:
+                self._find_changed_files()
 
         if self._current_index > self._last_index:
             raise StopIteration
         else:
             resource = self._resources[self._current_index]
             resource.local_path = self._prepare_local_resource(self._current_index)
+            if self._ledger and resource.local_path:
+                self._check_changed(resource)
             self._current_index += 1
             return resource
 
+    def _find_changed_files(self):
+        """ Find files changed since the last execution recorded in upload ledger with one git diff. """
+        self.head_commit = self.platform_repo.get_head_commit()
+        if not (self.head_commit and self._ledger.commit):
+            return
+        if self.head_commit == self._ledger.commit:
+            changed = []
+        else:
+            changed = self.platform_repo.get_changed_files(self._ledger.commit, self.head_commit)
+        if changed != None:
+            self._changed_files = set(os.path.normpath(x) for x in changed)
+            logger.info("Changed files since last execution: '{}' ({}..{}).".format(len(self._changed_files), self._ledger.commit, self.head_commit))
+
+    def _check_changed(self, resource):
+        resource.commit = self.head_commit
+        resource.content_hash = get_content_hash(resource.local_path)
+        if self._changed_files == None:
+            return
+        if os.path.normpath(resource.resource_path) in self._changed_files:
+            return
+        if self._ledger.uploaded(resource.resource_path, resource.content_hash):
+            resource.changed = False
+
     def __len__(self):
         return len(self._resources)
 
@@ -117,9 +156,20 @@ class ResourceRepository(object):
     def __init__(self):
         pass
 
+    def hold_pullrequest_until_all_languages_completes(self):
+        """ Return True when translations are imported only after all languages of a resource
+            are completed ('hold_pullrequest_until_all_languages_completes' option in resource
+            configuration).
+        """
+        for o in self.config.options:
+            if o.name == 'hold_pullrequest_until_all_languages_completes':
+                return bool(o.value)
+        return False
+
     @abc.abstractmethod
-    def get_resource_bundle(self):
+    def get_resource_bundle(self, ledger=None):
         """ Return ResourceBundle for this resource repository.
+            With upload ledger, resources not changed since the last upload are marked as unchanged.
         """
         logger.error("BUG: Abstract method ResourceRepository.get_resource_bundle() was called.")
         return None
@@ -162,24 +212,60 @@ class Translation:
 
     # TODO --- add download status (can be used to display Translation in TranslationBundle)
 
+_download_executors = {}
+_download_executors_lock = threading.Lock()
+
+def get_download_executor(platform):
+    """ Return executor shared by TranslationBundles to download translations from a platform
+        concurrently, or None when translations are downloaded one by one.
+        Number of workers is specified by settings.TRANSLATION_DOWNLOAD_WORKERS.
+    """
+    n = settings.TRANSLATION_DOWNLOAD_WORKERS.get(platform, 1)
+    if n <= 1:
+        return None
+    with _download_executors_lock:
+        if not platform in _download_executors:
+            _download_executors[platform] = ThreadPoolExecutor(max_workers=n)
+        return _download_executors[platform]
+
 class TranslationBundle:
-    def __init__(self, platform_repository, translations, log_dir):
+    def __init__(self, platform_repository, translations, log_dir, executor=None):
         self.platform_repo = platform_repository
         self._translations = translations
         self._log_dir = log_dir
         self._last_index = len(translations) - 1
         self._current_index = 0
+        # With executor, all translations start to be downloaded now, so that downloads for
+        # multiple languages and multiple bundles (resources) run concurrently. Translations
+        # are still returned in order.
+        if executor:
+            self._futures = [executor.submit(self._download, x) if x.translation_path else None for x in translations]
+        else:
+            self._futures = None
 
     def __iter__(self):
         return self
 
+    def _download(self, translation):
+        return self.platform_repo.download_translation(translation.repository_name, translation.repository_branch, translation.resource_path, translation.language_code)
+
+    def _wait_download(self, future, translation):
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error("Failed to download translation: '{}' ('{}'). Reason: '{}'.".format(translation.language_code, translation.resource_path, e))
+            return None
+
     def next(self): # Python 3: def __next__(self)
         if self._current_index > self._last_index:
             raise StopIteration
         else:
             translation = self._translations[self._current_index]
             if translation.translation_path:
-                translation.local_path = self.platform_repo.download_translation(translation.repository_name, translation.repository_branch, translation.resource_path, translation.language_code)
+                if self._futures:
+                    translation.local_path = self._wait_download(self._futures[self._current_index], translation)
+                else:
+                    translation.local_path = self._download(translation)
             else:
                 #logger.info("'{}': Not listed in resource config. Skipped.".format(translation.language_code))
                 pass
@@ -191,9 +277,45 @@ class TranslationBundle:
 
 class TranslationRepository(object):
     __metaclass__ = abc.ABCMeta
-    def __init__(self, config, log_dir):
+    def __init__(self, config, log_dir, platform=None):
         self.config = config
         self._log_dir = log_dir
+        # Watermarks of translations downloaded in this execution. They are recorded by
+        # commit_watermarks() only after translations are imported successfully.
+        self._watermark_store = WatermarkStore(platform) if platform else None
+        self._pending_watermarks = []
+        self._pending_watermarks_lock = threading.Lock()
+
+    def _get_unchanged_translation(self, project_slug, resource_slug, language_code, watermark, dest):
+        """ Copy translation file imported last time to dest and return the path, when the
+            watermark has not moved since then. Return None otherwise.
+        """
+        if not self._watermark_store:
+            return None
+        path = self._watermark_store.get(project_slug, resource_slug, language_code, watermark)
+        if not path:
+            return None
+        if os.path.isfile(dest):
+            os.remove(dest)
+        copyfile(path, dest)
+        logger.info("Translation not changed since last import: {}, pslug: '{}', rslug: '{}'".format(language_code, project_slug, resource_slug))
+        return os.path.abspath(dest)
+
+    def _add_pending_watermark(self, project_slug, resource_slug, language_code, watermark, translation_path):
+        if not (self._watermark_store and watermark != None and translation_path):
+            return
+        with self._pending_watermarks_lock:
+            self._pending_watermarks.append((project_slug, resource_slug, language_code, watermark, translation_path))
+
+    def commit_watermarks(self):
+        """ Record watermarks of translations downloaded so far. Call this after translations
+            are imported successfully.
+        """
+        with self._pending_watermarks_lock:
+            pending = self._pending_watermarks
+            self._pending_watermarks = []
+        for x in pending:
+            self._watermark_store.put(*x)
 
     def get_reviewers(self):
         return self.config.get_project_reviewers()
@@ -207,7 +329,11 @@ class TranslationRepository(object):
             return -1 
 
     @abc.abstractmethod
-    def get_translation_bundle(self, resource):
+    def get_translation_bundle(self, repository_name, repository_branch, resource_path, resource_translations, require_all_languages=False):
+        """ Return TranslationBundle for a resource.
+            When require_all_languages is True, translations need not to be downloaded unless
+            all of them are completed.
+        """
         logger.error("BUG: Abstract method TranslationRepository.get_translation_bundle() was called.")
         return None
 
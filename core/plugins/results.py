@@ -11,12 +11,22 @@ from collections import namedtuple
 #   .message:
 #       .succeeded=True: Usually None, but there might be extra message.
 #       .succeeded=False: Exception message.
-RestApiResults = namedtuple('RestApiResults', 'succeeded, response, message')
-def succeeded_rest_api_call_results(response, message=None):
-    return RestApiResults(True, response, message)
+#   .stats: HttpCallStats of the call, or None when the call was not made via httpclient.
+RestApiResults = namedtuple('RestApiResults', 'succeeded, response, message, stats')
+def succeeded_rest_api_call_results(response, message=None, stats=None):
+    return RestApiResults(True, response, message, stats)
 
-def failed_rest_api_call_results(exception):
-    return RestApiResults(False, None, "{}".format(str(exception)))
+def failed_rest_api_call_results(exception, stats=None):
+    return RestApiResults(False, None, "{}".format(str(exception)), stats)
+
+# HttpCallStats
+# Stats of a REST API call made by httpclient.
+#
+#   .elapsed: Seconds from sending the request to receiving the whole response.
+#   .status_code: Response status code, or None when no response was received.
+#   .bytes_received: Number of bytes of response body on the wire (compressed).
+#   .content_length: Number of bytes of response body after decompression.
+HttpCallStats = namedtuple('HttpCallStats', 'elapsed, status_code, bytes_received, content_length')
 
 
 # UtilCallResults
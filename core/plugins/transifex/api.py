@@ -1,68 +1,35 @@
-import requests
-from requests.exceptions import RequestException, HTTPError
 #from hashlib import md5
 
-from core.plugins.results import succeeded_rest_api_call_results, failed_rest_api_call_results 
+import core.plugins.httpclient as httpclient
  
 def get_projects(creds):
     url = 'http://www.transifex.com/api/2/projects/'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_project_details(project_slug, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '?details'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_resources(project_slug, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resources'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_resource_details(project_slug, resource_slug, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '?details'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_translation_strings(project_slug, resource_slug, language_code, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/translation/' + language_code + '/strings'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_translation_strings_details(project_slug, resource_slug, language_code, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/translation/' + language_code + '/strings?details'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
+
+def stream_translation_strings_details(project_slug, resource_slug, language_code, creds):
+    """ Same as get_translation_strings_details() but response body is not read (see httpclient.stream()). """
+    url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/translation/' + language_code + '/strings?details'
+    return httpclient.stream('transifex', 'GET', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 #def get_string_hash(source_string_key):
 #    return md5(':'.join([source_string_key, ""]).encode('utf-8')).hexdigest()
@@ -70,53 +37,22 @@ def get_translation_strings_details(project_slug, resource_slug, language_code,
 def get_source_string_details(project_slug, resource_slug, string_hash, creds):
 #    string_hash = get_string_hash(source_string_key)
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/source/' + string_hash 
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_language_stats(project_slug, resource_slug, language_code, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/stats/' + language_code + '/'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_resource_stats(project_slug, resource_slug, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/stats/'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def get_translation_reviewed(project_slug, resource_slug, language_code, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/translation/' + language_code + '/?mode=reviewed'
-    try:
-        r = requests.get(url, auth=(creds.username, creds.userpasswd))
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
+    return httpclient.get('transifex', url, creds.username, auth=(creds.username, creds.userpasswd))
 
 def put_resource(project_slug, resource_slug, import_file_path, repository_name, resource_path, creds):
     url = 'http://www.transifex.com/api/2/project/' + project_slug + '/resource/' + resource_slug + '/content/'
-    headers = {'Content-type': 'multipart/form-data'}
-    files = {'file': (import_file_path, open(import_file_path, 'rb'), 'multipart/form-data', {'Expires': '0'})}
-    try:
-        r = requests.put(url, auth=(creds.username, creds.userpasswd), files=files)
-        r.raise_for_status()
-    except (RequestException, HTTPError) as e:
-        return failed_rest_api_call_results(e)
-    else:
-        return succeeded_rest_api_call_results(r)
-
+    with open(import_file_path, 'rb') as fi:
+        files = {'file': (import_file_path, fi, 'multipart/form-data', {'Expires': '0'})}
+        return httpclient.put('transifex', url, creds.username, auth=(creds.username, creds.userpasswd), files=files)
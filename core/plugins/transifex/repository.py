@@ -11,7 +11,8 @@ from collections import namedtuple
 import logging
 logger = logging.getLogger('tpa')
 
-from core.plugins.repository_base import TranslationRepository, TranslationBundle, Translation
+import core.plugins.execstats as execstats
+from core.plugins.repository_base import TranslationRepository, TranslationBundle, Translation, get_download_executor
 
 from . import api as transifex
 from . import utils as utils 
@@ -26,11 +27,15 @@ TransifexApiCreds = namedtuple('TransifexApiCreds', 'username, userpasswd')
 
 class TransifexRepository(TranslationRepository):
     def __init__(self, config, creds, log_dir):
-        super(TransifexRepository, self).__init__(config, log_dir)
+        super(TransifexRepository, self).__init__(config, log_dir, 'transifex')
         self._transifex_project_slug_prefix = creds.project_slug_prefix
         self._transifex_resource_slug_prefix = creds.resource_slug_prefix
         self._api_creds = TransifexApiCreds(creds.username, creds.userpasswd)
         self._log_dir = log_dir
+        # (repository name, resource path) -> set of language codes ready to be downloaded.
+        self._ready_languages = {}
+        # (repository name, resource path) -> {language code: 'last_update' in resource stats}
+        self._language_watermarks = {}
 
     def generate_project_slug(self, project_name):
         return utils.generate_project_slug(self._transifex_project_slug_prefix, project_name)
@@ -61,7 +66,7 @@ class TransifexRepository(TranslationRepository):
         os.rename(resource.local_path, os.path.join(self._log_dir, rslug + '_import_failed'))
         return True
 
-    def get_translation_bundle(self, repository_name, resource_path, resource_translations):
+    def get_translation_bundle(self, repository_name, repository_branch, resource_path, resource_translations, require_all_languages=False):
         translations = []
         for lang_code in self.config.project_language_codes:
             for translation in resource_translations:
@@ -70,9 +75,75 @@ class TransifexRepository(TranslationRepository):
                     break
             else:
                 translation_path = None
-            translations.append(Translation(repository_name, resource_path, translation_path, lang_code.strip().rstrip()))
+            translations.append(Translation(repository_name, repository_branch, resource_path, translation_path, lang_code.strip().rstrip()))
 
-        return TranslationBundle(self, translations, self._log_dir)
+        self._check_translations(repository_name, resource_path, translations, require_all_languages)
+        if self._translations_unchanged(repository_name, resource_path):
+            logger.info("No translations changed since last import. Skipped: '{}'.".format(resource_path))
+            return None
+        return TranslationBundle(self, translations, self._log_dir, get_download_executor('transifex'))
+
+    def _check_translations(self, repository_name, resource_path, translations, require_all_languages):
+        """ Find languages ready to be downloaded for a resource with one resource stats call,
+            so that download_translation() neither queries stats for each language nor downloads
+            translations which are not imported.
+            When resource stats are not available, download_translation() checks each language.
+        """
+        key = (repository_name, resource_path)
+        self._ready_languages.pop(key, None)
+        self._language_watermarks.pop(key, None)
+        pslug = self.generate_project_slug(self.config.project_name)
+        rslug = self.generate_resource_slug([repository_name, resource_path])
+        if not (pslug and rslug):
+            return
+
+        stats = utils.get_all_translation_stats(self._api_creds, pslug, rslug)
+        if stats == None:
+            logger.info("Checking each language. Resource stats not available: pslug: '{}', rslug: '{}'".format(pslug, rslug))
+            return
+
+        d = {}
+        for x in stats:
+            d[x.language_code] = x
+        ready = set()
+        watermarks = {}
+        num_targets = 0
+        for translation in translations:
+            if not translation.translation_path:
+                continue
+            num_targets += 1
+            x = d.get(translation.language_code)
+            if x == None:
+                self._write_failure_language_stats(repository_name, resource_path, translation.language_code, "Language not found in resource stats.")
+                continue
+            self._write_resource_language_stats(repository_name, resource_path, x)
+            if x.percentage_reviewed_strings == '100%':
+                ready.add(translation.language_code)
+                watermarks[translation.language_code] = x.last_updated
+            else:
+                logger.info("Review not completed: {}, pslug: '{}', rslug: '{}'".format(translation.language_code, pslug, rslug))
+
+        if require_all_languages and len(ready) < num_targets:
+            logger.info("Not all languages completed ({}/{}). No translations to download: pslug: '{}', rslug: '{}'".format(len(ready), num_targets, pslug, rslug))
+            ready = set()
+        self._ready_languages[key] = ready
+        self._language_watermarks[key] = watermarks
+
+    def _translations_unchanged(self, repository_name, resource_path):
+        """ Return True when there are languages ready to be downloaded for a resource and none
+            of them has been changed since last import.
+        """
+        key = (repository_name, resource_path)
+        ready = self._ready_languages.get(key)
+        if not ready:
+            return False
+        pslug = self.generate_project_slug(self.config.project_name)
+        rslug = self.generate_resource_slug([repository_name, resource_path])
+        watermarks = self._language_watermarks[key]
+        for language_code in ready:
+            if not self._watermark_store.get(pslug, rslug, language_code, watermarks.get(language_code)):
+                return False
+        return True
 
     # TODO ---  part where it handles response_text can move to util
     def _display_upload_stats(self, status_code, response_text, project_slug, resource_slug, resource_full_path): 
@@ -105,7 +176,7 @@ class TransifexRepository(TranslationRepository):
             "mod_strings": num_mod,
             "del_strings": num_del
             }
-        logger.info("ExecStats='{}'".format(json.dumps(d)))
+        execstats.write(self._log_dir, d)
 
     def _write_failure_language_stats(self, repository_name, resource_path, language_code, message):
         d = {}
@@ -115,6 +186,13 @@ class TransifexRepository(TranslationRepository):
         d['message'] = message
         logger.info('LanguageStats=' + json.dumps(d))
 
+    def _write_resource_language_stats(self, repository_name, resource_path, stats):
+        d = dict(stats._asdict())
+        d['repository_name'] = repository_name
+        d['reosurce_path'] = resource_path
+        d['operation'] = 'GetResourceStats'
+        logger.info('LanguageStats=' + json.dumps(d))
+
     # TODO --- handing response_text part can move to util
     def _write_language_stats(self, repository_name, resource_path, language_code, pslug, rslug, response_text):
         try:
@@ -131,7 +209,7 @@ class TransifexRepository(TranslationRepository):
         d['operation'] = 'GetLanguageStats'
         logger.info('LanguageStats=' + json.dumps(d))
 
-    def download_translation(self, repository_name, resource_path, language_code):
+    def download_translation(self, repository_name, repository_branch, resource_path, language_code):
         pslug = self.generate_project_slug(self.config.project_name)
         if not pslug:
             self._write_failure_language_stats(repository_name, resource_path, language_code, "Failed to generate project slug.")
@@ -142,6 +220,15 @@ class TransifexRepository(TranslationRepository):
             self._write_failure_language_stats(repository_name, resource_path, language_code, "Failed to generate resource slug.")
             return None
 
+        ready = self._ready_languages.get((repository_name, resource_path))
+        if ready != None:
+            # already checked by resource stats.
+            if language_code in ready:
+                watermark = self._language_watermarks.get((repository_name, resource_path), {}).get(language_code)
+                return self._download_translation(pslug, rslug, language_code, watermark)
+            else:
+                return None
+
         ret = transifex.get_language_stats(pslug, rslug, language_code, self._api_creds)
         if not ret.succeeded:
             self._write_failure_language_stats(repository_name, resource_path, language_code, "Failed to obtain language stats.")
@@ -152,7 +239,7 @@ class TransifexRepository(TranslationRepository):
             logger.info("Review not completed: {}, pslug: '{}', rslug: '{}'".format(language_code, pslug, rslug))  
             return None
 
-        return self._download_translation(pslug, rslug, language_code)
+        return self._download_translation(pslug, rslug, language_code, utils.get_translation_last_update(ret.response.text))
 
     def _store_raw_download_file(self, raw_download_path, get_translation_response_text):
         if os.path.isfile(raw_download_path):
@@ -176,7 +263,12 @@ class TransifexRepository(TranslationRepository):
             with open(download_path, 'w') as fo:
                 fo.write(translation_content)
 
-    def _download_translation(self, project_slug, resource_slug, language_code):
+    def _download_translation(self, project_slug, resource_slug, language_code, watermark=None):
+        download_path = os.path.join(self._log_dir, resource_slug + '_' + language_code)
+        path = self._get_unchanged_translation(project_slug, resource_slug, language_code, watermark, download_path)
+        if path:
+            return path
+
         ret = transifex.get_translation_reviewed(project_slug, resource_slug, language_code, self._api_creds)
         if not ret.succeeded:
             logger.error("Failed to download translation.")
@@ -190,9 +282,9 @@ class TransifexRepository(TranslationRepository):
             logger.error("Failed read raw download.")
             return None
 
-        download_path = os.path.join(self._log_dir, resource_slug + '_' + language_code)
         self._store_translation(download_path, c)
         logger.info("Donloaded: {}".format(download_path))
+        self._add_pending_watermark(project_slug, resource_slug, language_code, watermark, os.path.abspath(download_path))
         return os.path.abspath(download_path)
 
     # TODO --- util/tpa_utils.py uses this to extract project/resource names and slugs
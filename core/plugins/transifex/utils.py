@@ -11,6 +11,8 @@ import logging
 logger = logging.getLogger('tpa')
 
 import api as transifex
+import core.cache as cache
+import core.stringstore as stringstore
 
 def translation_review_completed(language_stats_response_text):
     try:
@@ -25,6 +27,18 @@ def translation_review_completed(language_stats_response_text):
     else:
         return r == '100%'
 
+def get_translation_last_update(language_stats_response_text):
+    """ Return 'last_update' in language stats, or None on any errors. """
+    try:
+        j = json.loads(language_stats_response_text)
+        return j['last_update']
+    except ValueError as e:
+        logger.error("Failed to parse response text. Reason: '{}'. Context: '{}'".format(str(e), language_stats_response_text))
+        return None
+    except KeyError as e:
+        logger.error("Faild to read last update. Reason: '{}', Context: '{}'.".format(e, j))
+        return None
+
 def get_translation_content(get_translation_response_text):
     try:
         j = json.loads(get_translation_response_text)
@@ -82,20 +96,8 @@ def _setup_dir(path):
                 logger.error("Created directory does not exist: '{}'.".format(path))
 
 def _create_text_file(path, text):
-    if os.path.isfile(path):
-        os.remove(path)
-       
-    try:
-        if sys.version_info[0:1] == (2,):
-            with codecs.open(path, 'w', encoding='utf-8') as fo:
-                fo.write(text)
-        else:
-            with open(path, 'w') as fo:
-                fo.write(text)
-    except(IOError, OSError) as e:
-        logger.error("Failed to write text file: '{}', Reason: '{}',  Context: '{}'.".format(path, e, text)) 
-    else:
-        pass
+    # files are created in cache directory.
+    cache.write(path, text)
 
 # Transifex project (summary).
 #
@@ -270,49 +272,122 @@ def read_platform_project_resource_details(creds, dest):
 # last_updated          last updated date.
 TransifexTranslationStringDetails = namedtuple('TransifexTranslationStringDetails', 'key, source, translation, reviewed, last_updated')
 
-def get_platform_project_translation_strings(creds, dest, pslug, rslug, lang):
-    """ 
-    Return list of translation string (TransifexTranslationStringDetails tuple) for a specified language of project resource.
-    Return None on any errors.
-
-    Write query results as a text file which path is specified by dest param.
+def _iter_json_array(chunks):
     """
-    ret = transifex.get_translation_strings_details(pslug, rslug, lang, creds)
-    if ret.succeeded:
+    Yield elements of a JSON array from chunks (bytes) of its text, without loading the whole
+    text. Raise ValueError when the text is not a valid JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf = u''
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos < len(buf):
+            c = buf[pos]
+            if not started:
+                if c != '[':
+                    raise ValueError("JSON array expected. Context: '{}'.".format(buf[pos:pos + 100]))
+                started = True
+                pos += 1
+                continue
+            if c == ']':
+                return
+            if c == ',':
+                pos += 1
+                continue
+            try:
+                o, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # an element has to be followed by ',' or ']'.
+                if end < len(buf) or eof:
+                    yield o
+                    pos = end
+                    continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON array.")
+
+        # read next chunk.
         try:
-            j = json.loads(ret.response.text)
-            _create_text_file(dest, ret.response.text)
-            l = []
-            for x in j:
-                l.append(TransifexTranslationStringDetails(x['key'], x['source_string'], x['translation'], x['reviewed'], x['last_update']))
-        except ValueError as e:
-            logger.error("Failed to load translation strings as json. Reason: '{}', Context: '{}'.".format(e, ret.response.text))
-            return None
-        except KeyError as e:
-            logger.error("Failed to process Transifex translation strings json. Reason: '{}', Context: '{}'.".format(e, j))
+            chunk = next(chunks)
+        except StopIteration:
+            buf = buf[pos:] + text_decoder.decode(b'', True)
+            eof = True
         else:
-            return l
-    else:
+            buf = buf[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+def _iter_translation_strings(response):
+    try:
+        for x in _iter_json_array(response.iter_content(chunk_size=65536)):
+            try:
+                yield TransifexTranslationStringDetails(x['key'], x['source_string'], x['translation'], x['reviewed'], x['last_update'])
+            except (KeyError, TypeError) as e:
+                logger.error("Failed to process Transifex translation strings json. Reason: '{}', Context: '{}'.".format(e, x))
+                raise ValueError("Unexpected translation string: '{}'.".format(x))
+    except ValueError as e:
+        logger.error("Failed to load translation strings as json. Reason: '{}'.".format(e))
+        raise
+    finally:
+        response.close()
+
+def iter_platform_project_translation_strings(creds, pslug, rslug, lang):
+    """ 
+    Return iterator of translation string (TransifexTranslationStringDetails tuple) for a specified language of project resource.
+    Return None on any errors of the query.
+
+    Response is read and parsed while iterating, and strings are stored in string store in
+    batches, so that memory usage does not depend on number of strings. The iterator raises
+    ValueError when response is not valid (nothing is stored in the case).
+    """
+    ret = transifex.stream_translation_strings_details(pslug, rslug, lang, creds)
+    if not ret.succeeded:
         logger.error("Failed to get Transifex translation strings. Reason: '{}'.".format(ret.message))
         return None
+    cache.remove_legacy_string_files('transifex', pslug, rslug)
+    return stringstore.upsert_translations_iter('transifex', pslug, rslug, lang, _iter_translation_strings(ret.response), calc_string_hash)
 
-def read_platform_project_translation_strings(creds, dest):
-    if not (os.path.exists(dest) and os.path.getsize(dest) > 0):
+def get_platform_project_translation_strings(creds, pslug, rslug, lang):
+    """ 
+    Return list of translation string (TransifexTranslationStringDetails tuple) for a specified language of project resource.
+    Return None on any errors.
+
+    Query results are stored in string store.
+    """
+    it = iter_platform_project_translation_strings(creds, pslug, rslug, lang)
+    if it == None:
         return None
     try:
-        with open(dest, 'r') as fi:
-            j = json.load(fi)
-            l = []
-            for x in j:
-                l.append(TransifexTranslationStringDetails(x['key'], x['source_string'], x['translation'], x['reviewed'], x['last_update']))
-    except ValueError as e:
-        logger.error("Failed to load translation strings file as json. Reason: '{}', File: '{}'.".format(e, dest))
+        return list(it)
+    except ValueError:
         return None
-    except KeyError as e:
-        logger.error("Failed to process Transifex translation strings json. Reason: '{}', Context: '{}'.".format(e, j))
+
+def iter_stored_platform_project_translation_strings(creds, pslug, rslug, lang, max_age=None):
+    """
+    Return iterator of translation string (TransifexTranslationStringDetails tuple) in string store.
+    Return None when they are not stored or stored more than max_age seconds ago.
+    """
+    rows = stringstore.iter_translations('transifex', pslug, rslug, lang, max_age)
+    if rows == None:
         return None
-    else:
-        return l
+    return (TransifexTranslationStringDetails(x.key, x.source, x.translation, x.reviewed, x.last_updated) for x in rows)
+
+def read_platform_project_translation_strings(creds, pslug, rslug, lang, max_age=None):
+    """
+    Return list of translation string (TransifexTranslationStringDetails tuple) in string store.
+    Return None when they are not stored or stored more than max_age seconds ago.
+    """
+    rows = stringstore.select_translations('transifex', pslug, rslug, lang, max_age)
+    if rows == None:
+        return None
+    return [TransifexTranslationStringDetails(x.key, x.source, x.translation, x.reviewed, x.last_updated) for x in rows]
 
 def calc_string_hash(string_key):
     return md5(':'.join([string_key, ""]).encode('utf-8')).hexdigest()
@@ -323,18 +398,17 @@ def calc_string_hash(string_key):
 # tags                  List of tags attached to the source string.
 TransifexSourceStringDetails = namedtuple('TransifexSourceStringDetails', 'comment, tags')
 
-def get_platform_project_source_string_details(creds, dest, pslug, rslug, string_hash):
+def get_platform_project_source_string_details(creds, pslug, rslug, string_hash):
     """ 
     Return details of a source string (TransifexSourceStringDetails tuple).
     Return None on any errors.
 
-    Write query results as a text file which path is specified by dest param.
+    Query results are stored in string store.
     """
     ret = transifex.get_source_string_details(pslug, rslug, string_hash, creds)
     if ret.succeeded:
         try:
             j = json.loads(ret.response.text)
-            _create_text_file(dest, ret.response.text)
             d = TransifexSourceStringDetails(j['comment'], j['tags'])
         except ValueError as e:
             logger.error("Failed to load source string details as json. Reason: '{}', Context: '{}'.".format(e, ret.response.text))
@@ -342,26 +416,61 @@ def get_platform_project_source_string_details(creds, dest, pslug, rslug, string
         except KeyError as e:
             logger.error("Failed to process Transifex source string json. Reason: '{}', Context: '{}'.".format(e, j))
         else:
+            if stringstore.upsert_source_string_details('transifex', pslug, rslug, [stringstore.StoredSourceStringDetails(string_hash, d.comment, d.tags)]):
+                cache.remove_legacy_string_files('transifex', pslug, rslug)
             return d
     else:
         logger.error("Failed to get Transifex source string details. Reason: '{}'.".format(ret.message))
         return None
 
-def read_platform_project_source_string_details(creds, dest):
-    if not (os.path.exists(dest) and os.path.getsize(dest) > 0):
+def prefetch_platform_project_source_string_details(creds, pslug, rslug, source_language_code):
+    """
+    Obtain details (comment and tags) of all source strings of a resource with one strings
+    query for the source language, and store them in string store, so that details of each
+    source string can be read without querying it.
+    Return number of source strings, or None on any errors.
+    """
+    ret = transifex.get_translation_strings_details(pslug, rslug, source_language_code, creds)
+    if not ret.succeeded:
+        logger.error("Failed to get Transifex source strings. Reason: '{}'.".format(ret.message))
         return None
     try:
-        with open(dest, 'r') as fi:
-            j = json.load(fi)
-            r = TransifexSourceStringDetails(j['comment'], j['tags'])
+        j = json.loads(ret.response.text)
+        strings = []
+        details = []
+        for x in j:
+            strings.append(TransifexTranslationStringDetails(x['key'], x['source_string'], x['translation'], x['reviewed'], x['last_update']))
+            details.append(stringstore.StoredSourceStringDetails(calc_string_hash(x['key']), x['comment'], x['tags']))
     except ValueError as e:
-        logger.error("Failed to load source string file as json. Reason: '{}', File: '{}'.".format(e, dest))
+        logger.error("Failed to load source strings as json. Reason: '{}', Context: '{}'.".format(e, ret.response.text))
         return None
     except KeyError as e:
-        logger.error("Failed to process Transifex source string json. Reason: '{}', Context: '{}'.".format(e, j))
+        logger.error("Failed to process Transifex source strings json. Reason: '{}', Context: '{}'.".format(e, j))
         return None
-    else:
-        return r
+
+    if not stringstore.upsert_translations('transifex', pslug, rslug, source_language_code, strings, calc_string_hash):
+        return None
+    if not stringstore.upsert_source_string_details('transifex', pslug, rslug, details):
+        return None
+    cache.remove_legacy_string_files('transifex', pslug, rslug)
+    return len(details)
+
+def read_platform_project_source_string_details(creds, pslug, rslug, string_hash, max_age=None):
+    """
+    Return details of a source string (TransifexSourceStringDetails tuple) in string store.
+    Return None when it is not stored or stored more than max_age seconds ago.
+    """
+    x = stringstore.select_source_string_details('transifex', pslug, rslug, string_hash, max_age)
+    if x == None:
+        return None
+    return TransifexSourceStringDetails(x.comment, x.tags)
+
+def count_stored_platform_project_source_string_details(creds, pslug, rslug, max_age=None):
+    """
+    Return number of source strings of a resource whose details are in string store.
+    Return None when details of any source strings are not stored or stored more than max_age seconds ago.
+    """
+    return stringstore.count_source_string_details('transifex', pslug, rslug, max_age)
 
 # Transifex translation stats for a resource.
 #
@@ -393,20 +502,24 @@ def get_all_translation_stats(creds, project_slug, resource_slug):
         return None
     else:
         results = []
-        for lang_key, kv_value in data.iteritems():
-            results.append(TransifexTranslationStats(
-                            project_slug,
-                            resource_slug,
-                            "<rsource name>",
-                            lang_key,
-                            kv_value['last_update'],
-                            kv_value['last_commiter'],
-                            kv_value['reviewed'],
-                            kv_value['reviewed_percentage'],
-                            kv_value['translated_entities'],
-                            kv_value['untranslated_entities'],
-                            kv_value['completed'],
-                            kv_value['translated_words'],
-                            kv_value['untranslated_words']))
+        try:
+            for lang_key, kv_value in data.iteritems():
+                results.append(TransifexTranslationStats(
+                                project_slug,
+                                resource_slug,
+                                "<rsource name>",
+                                lang_key,
+                                kv_value['last_update'],
+                                kv_value['last_commiter'],
+                                kv_value['reviewed'],
+                                kv_value['reviewed_percentage'],
+                                kv_value['translated_entities'],
+                                kv_value['untranslated_entities'],
+                                kv_value['completed'],
+                                kv_value['translated_words'],
+                                kv_value['untranslated_words']))
+        except KeyError as e:
+            logger.error("Failed to read resource stats. Reason: '{}'.".format(e))
+            return None
         return results
 
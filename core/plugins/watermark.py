@@ -0,0 +1,95 @@
+'''
+    Translation Watermark
+
+    Watermark store records, per (project slug, resource slug, language), a value which
+    changes when translation is updated on a translation platform (e.g. 'last_update' in
+    Transifex resource stats) at the last successful import, together with a copy of the
+    imported translation file. When the watermark has not moved since then, the imported
+    file can be reused instead of downloading translation again. Crowdin translations are
+    always downloaded, since its stats have no such value (counts of strings do not change
+    when a string is edited and approved again).
+
+    Files in WATERMARK_DIR/<platform>/<sha1 of project slug and resource slug>/
+
+        filename                values
+        ----------------------------------------------------------------------
+        watermarks.json         {'project_slug': <slug>, 'resource_slug': <slug>,
+                                 'languages': {<language code>: <watermark>}}
+        <language code>         Translation file imported last time.
+
+'''
+import os
+import json
+import threading
+from hashlib import sha1
+from shutil import copyfile
+
+import logging
+logger = logging.getLogger('tpa')
+
+import settings
+
+WATERMARKS_FILENAME = 'watermarks.json'
+
+class WatermarkStore(object):
+    def __init__(self, platform):
+        self._dir = os.path.join(settings.WATERMARK_DIR, platform)
+        self._lock = threading.Lock()
+
+    def _get_resource_dir(self, project_slug, resource_slug):
+        h = sha1('{}/{}'.format(project_slug, resource_slug).encode('utf-8')).hexdigest()
+        return os.path.join(self._dir, h)
+
+    def _load(self, resource_dir):
+        path = os.path.join(resource_dir, WATERMARKS_FILENAME)
+        if not os.path.isfile(path):
+            return {}
+        try:
+            with open(path) as fi:
+                return json.load(fi)['languages']
+        except (IOError, OSError, ValueError, KeyError) as e:
+            logger.error("Failed to read watermarks: '{}'. Reason: '{}'.".format(path, e))
+            return {}
+
+    def get(self, project_slug, resource_slug, language_code, watermark):
+        """ Return path to translation file imported last time when the watermark has not moved
+            since then. Return None otherwise.
+        """
+        if watermark == None:
+            return None
+        resource_dir = self._get_resource_dir(project_slug, resource_slug)
+        with self._lock:
+            languages = self._load(resource_dir)
+        if languages.get(language_code) != watermark:
+            return None
+        path = os.path.join(resource_dir, language_code)
+        if os.path.isfile(path):
+            return path
+        else:
+            return None
+
+    def put(self, project_slug, resource_slug, language_code, watermark, translation_path):
+        """ Record watermark and a copy of translation file imported.
+            Return True on success, False otherwise.
+        """
+        if watermark == None:
+            return False
+        resource_dir = self._get_resource_dir(project_slug, resource_slug)
+        path = os.path.join(resource_dir, WATERMARKS_FILENAME)
+        with self._lock:
+            try:
+                if not os.path.isdir(resource_dir):
+                    os.makedirs(resource_dir)
+                dest = os.path.join(resource_dir, language_code)
+                copyfile(translation_path, dest + '.tmp')
+                os.rename(dest + '.tmp', dest)
+                languages = self._load(resource_dir)
+                languages[language_code] = watermark
+                d = {'project_slug': project_slug, 'resource_slug': resource_slug, 'languages': languages}
+                with open(path + '.tmp', 'w') as fo:
+                    json.dump(d, fo, indent=4, sort_keys=True)
+                os.rename(path + '.tmp', path)
+            except (IOError, OSError) as e:
+                logger.error("Failed to write watermark: '{}'. Reason: '{}'.".format(path, e))
+                return False
+        return True
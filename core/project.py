@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import time
 from collections import namedtuple
 
 import logging
@@ -223,13 +224,14 @@ def _LanguageStatus_to_dict(o):
 # platform              Translation platform name.
 # path                  Path of the resource
 # languages             List of language status (LanguageStatus tuple). 
-TranslatedResourceStatus = namedtuple('TranslatedResourceStatus', 'platform, path, languages')
+# error                 Error message when status is not obtained, None otherwise.
+TranslatedResourceStatus = namedtuple('TranslatedResourceStatus', 'platform, path, languages, error')
 
 def _TranslatedResourceStatus_to_dict(o):
     languages = []
     for l in o.languages:
         languages.append(_LanguageStatus_to_dict(l))
-    return {'platform': o.platform, 'path': o.path, 'languages': languages}
+    return {'platform': o.platform, 'path': o.path, 'languages': languages, 'error': o.error}
 
 def _is_translation_completed(translation_stats):
     return translation_stats.percentage_reviewed_strings == '100%'
@@ -237,6 +239,8 @@ def _is_translation_completed(translation_stats):
 def get_translation_status(project_id):
     """
     Return list of translation status summary (TranslatedResourceStatus tuple) for each resource file.
+    Status of resources are obtained concurrently. A resource whose status is not obtained
+    (e.g. within PROJECT_STATUS_TIMEOUT_SECONDS) has an error.
     """
     c = _find_project_configuration(project_id)
     if not c:
@@ -254,16 +258,21 @@ def get_translation_status(project_id):
             if not t:
                 return []
 
+            start = time.time()
+            l = translation.get_language_stats_of_resources(t.project_platform, t.project_name, r.repository_name, [x.path for x in r.resources], settings.PROJECT_STATUS_TIMEOUT_SECONDS)
+            if l == None:
+                return []
             results = []
-            for res in r.resources:
-                entries = translation.get_language_stats(t.project_platform, t.project_name, r.repository_name, res.path)
-                if entries:
+            for x in l:
+                if x.stats:
                     languages = []
-                    for entry in entries:
+                    for entry in x.stats:
                         languages.append(LanguageStatus(entry.language_code, _is_translation_completed(entry)))
-                    results.append(TranslatedResourceStatus(t.project_platform, res.path, languages))
+                    results.append(TranslatedResourceStatus(t.project_platform, x.resource_path, languages, None))
                 else:
-                    logger.error("No language stats. platform: '{}', project: '{}', repository: '{}', resource: '{}'.".format(t.project_platform, t.project_name, r.repository_name, res.path))
+                    logger.error("No language stats. platform: '{}', project: '{}', repository: '{}', resource: '{}', reason: '{}'.".format(t.project_platform, t.project_name, r.repository_name, x.resource_path, x.error))
+                    results.append(TranslatedResourceStatus(t.project_platform, x.resource_path, [], x.error))
+            logger.info("Obtained translation status of {} resources in {:.1f} seconds. project: '{}'.".format(len(results), time.time() - start, project_id))
             return results
         else:
             pass
@@ -0,0 +1,150 @@
+'''
+    Repository Lock
+
+    Jobs for the same resource repository share a local clone in LOCAL_REPO_DIR. A job holds
+    an advisory file lock (LOCAL_REPO_DIR/.locks/<repository name>.lock) while it runs, so
+    jobs for the same clone are executed one by one, also across processes, while jobs for
+    different repositories run in parallel.
+
+    When each branch has its own worktree (GIT_WORKTREE_PER_BRANCH), a job holds a lock of
+    the branch (LOCAL_REPO_DIR/.locks/<repository name>@<branch name>.lock) instead, and the
+    lock of the repository is held only while the shared clone is updated.
+
+'''
+import os
+import errno
+import fcntl
+import time
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+import settings
+
+LOCK_DIRNAME = '.locks'
+
+# Interval (seconds) to retry locking while other job holds the lock.
+LOCK_RETRY_INTERVAL_SECONDS = 1
+
+# Stats of repository locks in this process.
+_stats_lock = threading.Lock()
+_waiting = {}   # lock name -> number of jobs waiting for the lock.
+_holding = {}   # lock name -> number of jobs holding the lock (0 or 1).
+_wait_stats = {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'last_seconds': 0.0}
+
+def get_lock_name(repository_name, branch_name=None):
+    """ Return lock name, '<repository name>' or '<repository name>@<branch name>'. """
+    if branch_name:
+        return '{}@{}'.format(repository_name, branch_name)
+    else:
+        return repository_name
+
+def get_lock_path(repository_name, branch_name=None):
+    name = get_lock_name(repository_name, branch_name).replace('%', '%25').replace('/', '%2F')
+    return os.path.join(settings.LOCAL_REPO_DIR, LOCK_DIRNAME, '{}.lock'.format(name))
+
+def _increment(d, key, n):
+    d[key] = d.get(key, 0) + n
+    if d[key] == 0:
+        del d[key]
+
+class RepositoryLock(object):
+    def __init__(self, repository_name, branch_name=None):
+        self.repository_name = repository_name
+        self.name = get_lock_name(repository_name, branch_name)
+        self.path = get_lock_path(repository_name, branch_name)
+        self._fo = None
+
+    def acquire(self, timeout=None, max_waiting=None):
+        """ Acquire the lock. Wait while other job holds the lock, up to timeout seconds (no
+            limit when None, no wait when 0). Give up at once when max_waiting jobs are already
+            waiting for the lock in this process, so that waiting jobs do not use up threads.
+            Return True on success, False on timeout or any errors.
+        """
+        lock_dir = os.path.dirname(self.path)
+        try:
+            if not os.path.isdir(lock_dir):
+                os.makedirs(lock_dir)
+        except OSError as e:
+            if not os.path.isdir(lock_dir):
+                logger.error("Failed to create lock directory: '{}'. Reason: '{}'.".format(lock_dir, e))
+                return False
+
+        with _stats_lock:
+            if max_waiting != None and _waiting.get(self.name, 0) >= max_waiting:
+                logger.error("Too many jobs waiting for lock: '{}' ({}).".format(self.name, _waiting[self.name]))
+                return False
+            _increment(_waiting, self.name, 1)
+        start = time.time()
+        try:
+            self._fo = open(self.path, 'a')
+            while True:
+                try:
+                    fcntl.flock(self._fo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except (IOError, OSError) as e:
+                    if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EACCES):
+                        raise
+                remaining = None if timeout == None else timeout - (time.time() - start)
+                if remaining != None and remaining <= 0:
+                    raise IOError(errno.EWOULDBLOCK, "Timed out after {} seconds".format(timeout))
+                time.sleep(LOCK_RETRY_INTERVAL_SECONDS if remaining == None else min(LOCK_RETRY_INTERVAL_SECONDS, remaining))
+        except (IOError, OSError) as e:
+            logger.error("Failed to lock: '{}'. Reason: '{}'.".format(self.path, e))
+            if self._fo:
+                self._fo.close()
+                self._fo = None
+            with _stats_lock:
+                _increment(_waiting, self.name, -1)
+            return False
+        waited = time.time() - start
+
+        with _stats_lock:
+            _increment(_waiting, self.name, -1)
+            _increment(_holding, self.name, 1)
+            _wait_stats['count'] += 1
+            _wait_stats['total_seconds'] += waited
+            _wait_stats['last_seconds'] = waited
+            if waited > _wait_stats['max_seconds']:
+                _wait_stats['max_seconds'] = waited
+        if waited >= 1:
+            logger.info("Waited {:.1f} seconds for lock: '{}'.".format(waited, self.name))
+        return True
+
+    def release(self):
+        if not self._fo:
+            return
+        try:
+            fcntl.flock(self._fo.fileno(), fcntl.LOCK_UN)
+        except (IOError, OSError) as e:
+            logger.error("Failed to unlock: '{}'. Reason: '{}'.".format(self.path, e))
+        self._fo.close()
+        self._fo = None
+        with _stats_lock:
+            _increment(_holding, self.name, -1)
+
+def get_stats():
+    """ Return stats of repository locks in this process as a dictionary.
+
+        keys                    values
+        ----------------------------------------------------------------------
+        queued                  Number of jobs waiting for a lock.
+        running                 Number of jobs holding a lock.
+        repositories            {<lock name>: {'queued': n, 'running': n}} for repositories (or
+                                branches, see get_lock_name()) which have queued or running jobs.
+        lock_wait               Lock wait time. {'count', 'total_seconds', 'average_seconds',
+                                'max_seconds', 'last_seconds'}
+    """
+    with _stats_lock:
+        repositories = {}
+        for k in set(_waiting.keys()) | set(_holding.keys()):
+            repositories[k] = {'queued': _waiting.get(k, 0), 'running': _holding.get(k, 0)}
+        lock_wait = dict(_wait_stats)
+    lock_wait['average_seconds'] = lock_wait['total_seconds'] / lock_wait['count'] if lock_wait['count'] else 0.0
+    return {
+        'queued': sum(x['queued'] for x in repositories.values()),
+        'running': sum(x['running'] for x in repositories.values()),
+        'repositories': repositories,
+        'lock_wait': lock_wait
+        }
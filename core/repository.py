@@ -1,11 +1,11 @@
 import os
-import re
 
 import logging
 logger = logging.getLogger('tpa')
 
 import settings
 import creds
+import resource
 from resource import ResourceConfiguration
 from translation import TranslationConfiguration
 from plugins.bitbucket.repository import BitbucketRepository
@@ -13,33 +13,108 @@ from plugins.github.repository import GithubRepository
 from plugins.transifex.repository import TransifexRepository
 from plugins.crowdin.repository import CrowdinRepository
 import plugins.git.commands as git
+from plugins.git.repository import WORKTREE_DIRNAME, get_worktree_dir, get_worktree_branch_name
+import repolock
 
 def get_local_repository_branches(repo_name):
     """ Return list of branches of specified local repository.
         Ruturn None on any errors.
+
+        Branches are listed from origin, since a shallow clone has only its work branches. Local
+        branches are listed when origin cannot be queried.
     """
     rootdir = get_local_repository_directory()
     if rootdir == None:
         return None
+    ret = git.list_remote_branches(os.path.join(rootdir, repo_name))
+    if ret.succeeded:
+        return ret.output
+    logger.error("Failed to list branches in origin: '{}'. Reason: '{}'.".format(repo_name, ret.message))
+
+    ret = git.get_branch_all(os.path.join(rootdir, repo_name))
+    if ret.succeeded:
+        l = []
+        for x in ret.output:
+            x = x.strip()
+            if not x:
+                continue
+            if x[0] in ('*', '+'): # remove extra '*' from current branch name, '+' from branch checked out in other worktree.
+                x = x[1:].strip()
+            if x.startswith('(') or ' -> ' in x: # detached HEAD, or symbolic ref (e.g. 'remotes/origin/HEAD -> origin/master').
+                continue
+            if x.startswith('remotes/'):
+                x = x.split('/', 2)[-1] # remove 'remotes/<remote name>/' from remote branch name
+            if not x in l:
+                l.append(x)
+        return l
     else:
-        ret = git.get_branch_all(os.path.join(rootdir, repo_name))
-        if ret.succeeded:
-            regex = re.compile(r'\x1b[^m]*m')
-            l = []
-            for x in ret.output:
-                x = regex.sub('', x) # remove ANSI escape sequence
-                x = x.strip().rstrip()
-                if not x:
-                    continue
-                if x.startswith('*'): # remove extra '*' from current branch name
-                    x = x[1:].strip().rstrip()
-                    l.append(x)
-                else:
-                    x = x.split('/')[-1] # remove extra path from remote branch name
-                    l.append(x)
-            return l
+        return None
+
+def get_local_repository_work_directory(repo_name, branch_name=None):
+    """ Return directory where files of a local repository are checked out, or None on any errors.
+        When each branch has its own worktree (settings.GIT_WORKTREE_PER_BRANCH), it is the worktree
+        of the branch, or of the branch in resource configuration of the repository when branch is
+        not specified.
+    """
+    rootdir = get_local_repository_directory()
+    if rootdir == None:
+        return None
+    if not settings.GIT_WORKTREE_PER_BRANCH:
+        return os.path.join(rootdir, repo_name)
+    if not branch_name:
+        for c in resource.get_configuration() or []:
+            if c.repository_name == repo_name:
+                branch_name = c.repository_branch
+                break
         else:
+            logger.error("Resource configuration not found for repository: '{}'.".format(repo_name))
             return None
+    return get_worktree_dir(repo_name, branch_name)
+
+def remove_unused_worktrees():
+    """ Remove worktrees of branches which are not in any resource configuration (e.g. after branch
+        in resource configuration is changed). Worktree which is locked by a job is left as it is.
+        Return number of worktrees removed.
+    """
+    if not settings.GIT_WORKTREE_PER_BRANCH:
+        return 0
+    rootdir = get_local_repository_directory()
+    if rootdir == None:
+        return 0
+    top = os.path.join(rootdir, WORKTREE_DIRNAME)
+    if not os.path.isdir(top):
+        return 0
+    configs = resource.get_configuration()
+    if configs == None:
+        return 0
+    used = set([get_worktree_dir(c.repository_name, c.repository_branch) for c in configs])
+
+    n = 0
+    for repo_name in os.listdir(top):
+        for name in os.listdir(os.path.join(top, repo_name)):
+            d = os.path.join(top, repo_name, name)
+            if d in used:
+                continue
+            branch_lock = repolock.RepositoryLock(repo_name, get_worktree_branch_name(name))
+            if not branch_lock.acquire(timeout=0):
+                continue
+            try:
+                # worktree information is in the shared clone.
+                repo_lock = repolock.RepositoryLock(repo_name)
+                if not repo_lock.acquire(timeout=0):
+                    continue
+                try:
+                    ret = git.remove_worktree(os.path.join(rootdir, repo_name), d)
+                finally:
+                    repo_lock.release()
+            finally:
+                branch_lock.release()
+            if ret.succeeded:
+                logger.info("Removed unused worktree: '{}'.".format(d))
+                n += 1
+            else:
+                logger.error("Failed to remove worktree: '{}'. Reason: '{}'.".format(d, ret.message))
+    return n
 
 def get_local_repository_directory():
     """ Return settins.LOCAL_REPO_DIR.
@@ -0,0 +1,150 @@
+'''
+    Job Runs
+
+    A run is an execution of a job. Runs are kept in memory of the scheduler process so that
+    a client can poll state of a run it requested, or cancel it.
+
+    State of a run
+
+        queued  -->  running  -->  succeeded | failed
+           |            |
+           +------------+------->  cancelled
+
+'''
+import uuid
+import datetime
+import threading
+from collections import namedtuple, OrderedDict
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Number of finished runs to keep.
+MAX_FINISHED_RUNS = 1000
+
+# Job run
+#
+# keys                          values
+# ----------------------------------------------------------------------
+# run_id                        Run ID string.
+# job_id                        Job ID string.
+# state                         'queued', 'running', 'succeeded', 'failed' or 'cancelled'.
+# queued_time                   Time when the run was queued (ISO 8601).
+# start_time                    Time when the run started (ISO 8601), or None.
+# end_time                      Time when the run finished (ISO 8601), or None.
+# exit_code                     Exit code of uploader, or None.
+JobRun = namedtuple('JobRun', 'run_id, job_id, state, queued_time, start_time, end_time, exit_code')
+
+def to_dict(o):
+    return {'run_id': o.run_id, 'job_id': o.job_id, 'state': o.state, 'queued_time': o.queued_time, 'start_time': o.start_time, 'end_time': o.end_time, 'exit_code': o.exit_code}
+
+class _Run(object):
+    def __init__(self, job_id):
+        self.run_id = uuid.uuid4().hex
+        self.job_id = job_id
+        self.state = 'queued'
+        self.queued_time = datetime.datetime.now()
+        self.start_time = None
+        self.end_time = None
+        self.exit_code = None
+        self.cancel_requested = False
+        self.canceller = None
+
+    def finished(self):
+        return self.state in ('succeeded', 'failed', 'cancelled')
+
+    def to_JobRun(self):
+        return JobRun(self.run_id, self.job_id, self.state,
+                self.queued_time.isoformat(),
+                self.start_time.isoformat() if self.start_time else None,
+                self.end_time.isoformat() if self.end_time else None,
+                self.exit_code)
+
+_lock = threading.Lock()
+_runs = OrderedDict() # run id -> _Run, oldest first.
+
+def _discard_finished_runs():
+    finished = [k for k, v in _runs.items() if v.finished()]
+    for k in finished[:max(0, len(finished) - MAX_FINISHED_RUNS)]:
+        del _runs[k]
+
+def create(job_id):
+    """ Create a queued run for a job. Return run id. """
+    r = _Run(job_id)
+    with _lock:
+        _runs[r.run_id] = r
+        _discard_finished_runs()
+    return r.run_id
+
+def start(run_id):
+    """ Mark a run as running.
+        Return False when the run has been cancelled (or is unknown), True otherwise.
+    """
+    with _lock:
+        r = _runs.get(run_id)
+        if r == None or r.state != 'queued':
+            return False
+        r.state = 'running'
+        r.start_time = datetime.datetime.now()
+        return True
+
+def set_canceller(run_id, canceller):
+    """ Set a function to stop a running run (None to clear it). The function is called at
+        once when cancel has already been requested.
+    """
+    with _lock:
+        r = _runs.get(run_id)
+        if r == None:
+            return
+        r.canceller = canceller
+        cancel_requested = r.cancel_requested
+    if cancel_requested and canceller:
+        canceller()
+
+def finish(run_id, exit_code):
+    """ Mark a run as finished with exit code of uploader (None when the job was aborted). """
+    with _lock:
+        r = _runs.get(run_id)
+        if r == None or r.finished():
+            return
+        r.exit_code = exit_code
+        r.end_time = datetime.datetime.now()
+        r.canceller = None
+        if r.cancel_requested:
+            r.state = 'cancelled'
+        elif exit_code == 0:
+            r.state = 'succeeded'
+        else:
+            r.state = 'failed'
+
+def cancel(run_id):
+    """ Cancel a queued or running run.
+        Return JobRun of the run, or None when the run is unknown.
+    """
+    with _lock:
+        r = _runs.get(run_id)
+        if r == None:
+            return None
+        canceller = None
+        if r.state == 'queued':
+            r.state = 'cancelled'
+            r.end_time = datetime.datetime.now()
+        elif r.state == 'running':
+            r.cancel_requested = True
+            canceller = r.canceller
+        o = r.to_JobRun()
+    if canceller:
+        logger.info("Cancelling run: '{}' (job id: '{}').".format(run_id, o.job_id))
+        canceller()
+    return o
+
+def get(run_id):
+    """ Return JobRun for a run id, or None when the run is unknown. """
+    with _lock:
+        r = _runs.get(run_id)
+        return r.to_JobRun() if r else None
+
+def select(job_id=None):
+    """ Return list of JobRun, the most recent first. """
+    with _lock:
+        return [r.to_JobRun() for r in reversed(_runs.values()) if job_id == None or r.job_id == job_id]
@@ -0,0 +1,257 @@
+'''
+    Project Snapshot
+
+    Project snapshot is data to show a project (project details, resource repository and
+    translation status of the resources, sync status of the jobs) materialized in the
+    scheduler process, so that it can be served without querying translation/resource
+    platforms.
+
+    Snapshots are refreshed in background periodically (PROJECT_SNAPSHOT_INTERVAL_SECONDS)
+    and right after execution of a job in a project. Refreshes run one at a time in a thread,
+    and a project is queued only once. Each refresh creates a new version of the snapshot
+    which is kept in memory and written to SNAPSHOT_DIR/<project id>.json so that it is
+    available when the scheduler is restarted. A refresh which started collecting data before
+    the current snapshot did is discarded, so that older data never replaces newer one.
+
+'''
+import os
+import json
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+import settings
+import project
+import job
+import resource
+
+# Project Snapshot
+#
+# keys                          values
+# ----------------------------------------------------------------------
+# project_id                    Project ID string.
+# version                       Version of the snapshot. Incremented for each refresh.
+# created_time                  Time when the snapshot was created (ISO 8601).
+# created_epoch                 Time when the snapshot was created (seconds since the epoch).
+# data                          Snapshot data (dictionary).
+#                                   project_id, project_name, project_description, project_status
+#                                   resources       Resource repository and translation status of resources.
+#                                   job_syncs       List of sync status of jobs.
+ProjectSnapshot = namedtuple('ProjectSnapshot', 'project_id, version, created_time, created_epoch, data')
+
+def to_dict(o):
+    """ Return snapshot as a dictionary, with age of the snapshot in seconds. """
+    return {
+            'project_id': o.project_id,
+            'version': o.version,
+            'created_time': o.created_time,
+            'age_seconds': int(max(0, time.time() - o.created_epoch)),
+            'data': o.data
+            }
+
+_lock = threading.Lock()
+_snapshots = {} # project id -> ProjectSnapshot
+_pending = {} # project id -> future of refresh which is queued.
+_collected = {} # project id -> time when collecting data of the current snapshot started.
+_executor = None
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor == None:
+            _executor = ThreadPoolExecutor(max_workers=1)
+        return _executor
+
+def _get_path(project_id):
+    return os.path.join(settings.SNAPSHOT_DIR, '{}.json'.format(project_id))
+
+def _load(project_id):
+    """ Return snapshot stored in file, or None. """
+    path = _get_path(project_id)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path) as fi:
+            d = json.load(fi)
+        return ProjectSnapshot(d['project_id'], d['version'], d['created_time'], d['created_epoch'], d['data'])
+    except (IOError, OSError, ValueError, KeyError) as e:
+        logger.error("Failed to read project snapshot: '{}'. Reason: '{}'.".format(path, e))
+        return None
+
+def _save(o):
+    path = _get_path(o.project_id)
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as fo:
+            json.dump(o._asdict(), fo)
+        os.rename(tmp_path, path)
+    except (IOError, OSError, TypeError, ValueError) as e:
+        logger.error("Failed to write project snapshot: '{}'. Reason: '{}'.".format(path, e))
+        return False
+    return True
+
+def get(project_id):
+    """ Return the latest snapshot (ProjectSnapshot tuple) of a project, or None when no snapshot is available. """
+    with _lock:
+        o = _snapshots.get(project_id)
+        if o:
+            return o
+    o = _load(project_id)
+    if o:
+        with _lock:
+            if not project_id in _snapshots:
+                _snapshots[project_id] = o
+            return _snapshots[project_id]
+    return None
+
+def _collect_resource_data(project_id, p):
+    # values are 'N/A' (or empty) when details are not obtained, so that the project page can be rendered partially.
+    results = {
+        'resource_repository_url': 'N/A',
+        'resource_repository_platform': 'N/A',
+        'resource_repository_owner': 'N/A',
+        'resource_repository_name': 'N/A',
+        'resource_repository_branch': 'N/A',
+        'translation_platform': 'N/A',
+        'translation_project': 'N/A',
+        'resources': []
+        }
+    for job_id in p.jobs:
+        j = job.get_details(job_id)
+        if j and j.class_name == 'ResourceUploaderJob':
+            r = resource.get_details(j.resource_config_filename)
+            if not r:
+                break
+            results['resource_repository_url'] = r.url
+            results['resource_repository_platform'] = r.platform
+            results['resource_repository_owner'] = r.owner
+            results['resource_repository_name'] = r.name
+            results['resource_repository_branch'] = r.branch
+            for res in r.resources:
+                results['resources'].append({'path': res.path, 'languages': [t.language_code for t in res.translations],
+                    'completed_languages': [], 'in_progress_languages': []})
+            break
+    return results
+
+def _merge_translation_status_data(project_id, resources):
+    translations = project.get_translation_status(project_id)
+    if translations:
+        resources['translation_platform'] = translations[0].platform
+        resources['translation_project'] = 'NIY'
+        for r in resources['resources']:
+            done = []
+            wip = []
+            for t in translations:
+                if r['path'] == t.path:
+                    for l in t.languages:
+                        # FIXME --- assuming resource's language is en-US and
+                        #           removing it.
+                        if l.language_code == 'en_US':
+                            continue
+                        if l.completed:
+                            done.append(l.language_code)
+                        else:
+                            wip.append(l.language_code)
+            r['completed_languages'] = done
+            r['in_progress_languages'] = wip
+    return resources
+
+def _collect_job_sync_data(p):
+    results = []
+    jobs = job.get_details_of_jobs(p.jobs)
+    sync_status = dict((x.job_id, x) for x in job.get_sync_status_of_jobs([j.id for j in jobs]))
+    for j in jobs:
+        if j.class_name in ('ResourceUploaderJob', 'TranslationUploaderJob'):
+            x = sync_status.get(j.id)
+            if x:
+                d = {
+                    'job_id': j.id,
+                    'job_status': j.status,
+                    'job_cron_string': j.job_cron_string,
+                    'job_class_name': j.class_name,
+                    'sync_date': x.date
+                    }
+                if j.class_name == 'TranslationUploaderJob':
+                    d['sync_id'] = x.sync_id
+                    d['sync_url'] = x.sync_url
+                    d['sync_state'] = x.sync_state
+                results.append(d)
+        else:
+            logger.error("Unknown job. id: '{}', class: '{}'.".format(j.id, j.class_name))
+    return results
+
+def _collect_project_data(project_id):
+    """ Return snapshot data of a project, or None when the project is not found. """
+    p = project.get_details(id=project_id)
+    if not p:
+        return None
+    results = {
+        'project_id': project_id,
+        'project_name': p.name,
+        'project_description': p.description,
+        'project_status': p.status
+        }
+    results['resources'] = _merge_translation_status_data(project_id, _collect_resource_data(project_id, p))
+    results['job_syncs'] = _collect_job_sync_data(p)
+    return results
+
+def refresh(project_id):
+    """ Create a new version of snapshot of a project.
+        Return the snapshot (ProjectSnapshot tuple), or None on any errors.
+    """
+    with _lock:
+        _pending.pop(project_id, None)
+    start = time.time()
+    try:
+        data = _collect_project_data(project_id)
+    except Exception as e:
+        logger.error("Failed to collect project data for snapshot. project: '{}', reason: '{}'.".format(project_id, e))
+        return None
+    if data == None:
+        logger.error("Failed to collect project data for snapshot. project: '{}'.".format(project_id))
+        return None
+
+    prev = get(project_id) # loaded from file when it is not in memory.
+    now = time.time()
+    with _lock:
+        prev = _snapshots.get(project_id, prev)
+        if prev and _collected.get(project_id, prev.created_epoch) > start:
+            logger.info("Discarded project snapshot collected before the current one. project: '{}', version: {}.".format(project_id, prev.version))
+            return prev
+        version = (prev.version if prev else 0) + 1
+        o = ProjectSnapshot(project_id, version, datetime.datetime.fromtimestamp(now).isoformat(), now, data)
+        _snapshots[project_id] = o
+        _collected[project_id] = start
+        # written in the lock, so that files are written in order of versions.
+        _save(o)
+    logger.info("Refreshed project snapshot in {:.1f} seconds. project: '{}', version: {}.".format(time.time() - start, project_id, version))
+    return o
+
+def request_refresh(project_id):
+    """ Queue refresh of snapshot of a project. A project already queued is not queued again.
+        Return future (concurrent.futures.Future) of the refresh, which results in the snapshot
+        or None on any errors.
+    """
+    executor = _get_executor()
+    with _lock:
+        f = _pending.get(project_id)
+        if f == None:
+            f = executor.submit(refresh, project_id)
+            _pending[project_id] = f
+        return f
+
+def refresh_all():
+    """ Queue refresh of snapshots of all projects. """
+    for p in project.get_details():
+        request_refresh(p.id)
+
+def request_refresh_for_job(job_id):
+    """ Queue refresh of snapshots of projects which have the job. """
+    for p in project.get_details():
+        if job_id in p.jobs:
+            request_refresh(p.id)
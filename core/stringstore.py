@@ -0,0 +1,403 @@
+""" String store.
+
+    Strings queried from translation platforms are stored in a SQLite database under
+    settings.CACHE_DIR, instead of a cache file per language and per source string, so that
+    strings can be looked up with indexed queries.
+
+    Tables
+
+        resources               Languages of a resource whose translations are stored, and
+                                when they were stored.
+        source_strings          Source strings, keyed by string hash (string id in platform),
+                                with comment and tags in source string details.
+        translations            Translation strings, keyed by (key, language).
+        search_terms            Inverted index of terms in keys, source strings and translations.
+        search_index_state      Languages of a resource indexed, and when they were indexed.
+
+    Search index is updated before each search, only for languages of resources whose
+    strings have been stored since they were indexed.
+
+    Strings of a language not stored again within STRING_STORE_RETENTION_SECONDS are purged,
+    at most once per _PURGE_INTERVAL_SECONDS after strings are stored. Space of purged rows
+    is reused by SQLite, so the database file stays within size of strings stored recently.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+from collections import namedtuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+import settings
+
+# Translation string.
+#
+# keys                  values
+# -----------------------------------
+# key                   key for the string.
+# source                source string.
+# translation           translation for the source string.
+# reviewed              true when reviewed, false otherwise.
+# last_updated          last updated date.
+StoredTranslationString = namedtuple('StoredTranslationString', 'key, source, translation, reviewed, last_updated')
+
+# Source string details.
+#
+# keys                  values
+# -----------------------------------
+# string_hash           string id in translation platform.
+# comment               comment attached to the source string.
+# tags                  list of tags attached to the source string.
+StoredSourceStringDetails = namedtuple('StoredSourceStringDetails', 'string_hash, comment, tags')
+
+# Search hit.
+#
+# keys                  values
+# -----------------------------------
+# platform              translation platform name.
+# pslug                 project slug.
+# rslug                 resource slug.
+# lang                  language code.
+# key                   key for the string.
+# source                source string.
+# translation           translation for the source string.
+# score                 relevance. Higher is more relevant.
+SearchHit = namedtuple('SearchHit', 'platform, pslug, rslug, lang, key, source, translation, score')
+
+# Weight of a term for each field in search score.
+_FIELD_WEIGHTS = {'key': 3, 'source': 2, 'translation': 1}
+
+_PURGE_INTERVAL_SECONDS = 3600
+_last_purged_at = 0
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS resources (
+        platform TEXT NOT NULL,
+        pslug TEXT NOT NULL,
+        rslug TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (platform, pslug, rslug, lang))''',
+    '''CREATE TABLE IF NOT EXISTS source_strings (
+        platform TEXT NOT NULL,
+        pslug TEXT NOT NULL,
+        rslug TEXT NOT NULL,
+        string_hash TEXT NOT NULL,
+        key TEXT,
+        source TEXT,
+        comment TEXT,
+        tags TEXT,
+        details_fetched_at REAL,
+        PRIMARY KEY (platform, pslug, rslug, string_hash))''',
+    '''CREATE TABLE IF NOT EXISTS translations (
+        platform TEXT NOT NULL,
+        pslug TEXT NOT NULL,
+        rslug TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        key TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        source TEXT,
+        translation TEXT,
+        reviewed INTEGER,
+        last_updated TEXT,
+        PRIMARY KEY (platform, pslug, rslug, lang, key))''',
+    '''CREATE TABLE IF NOT EXISTS search_terms (
+        term TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        pslug TEXT NOT NULL,
+        rslug TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        key TEXT NOT NULL,
+        score INTEGER NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS search_index_state (
+        platform TEXT NOT NULL,
+        pslug TEXT NOT NULL,
+        rslug TEXT NOT NULL,
+        lang TEXT NOT NULL,
+        indexed_at REAL NOT NULL,
+        PRIMARY KEY (platform, pslug, rslug, lang))''',
+    '''CREATE INDEX IF NOT EXISTS source_strings_key ON source_strings (platform, pslug, rslug, key)''',
+    '''CREATE INDEX IF NOT EXISTS search_terms_term ON search_terms (platform, term)''',
+    '''CREATE INDEX IF NOT EXISTS search_terms_resource ON search_terms (platform, pslug, rslug, lang)'''
+    ]
+
+def get_store_file():
+    return os.path.join(settings.CACHE_DIR, settings.STRING_STORE_FILENAME)
+
+def _connect():
+    conn = sqlite3.connect(get_store_file(), timeout=30)
+    # readers are not blocked by a writer.
+    conn.execute('PRAGMA journal_mode=WAL')
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+def _execute(func):
+    """ Call func with a connection in a transaction. Return what func returns, or None on any errors. """
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                return func(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error("Failed to access string store. File: '{}', Reason: '{}'.".format(get_store_file(), e))
+        return None
+
+def _is_fresh(fetched_at, max_age):
+    return fetched_at != None and (max_age == None or time.time() - fetched_at <= max_age)
+
+def upsert_translations(platform, pslug, rslug, lang, strings, string_hash_func):
+    """ Store all translation strings for a language of a resource, replacing ones stored
+        before. strings is list of tuples of (key, source, translation, reviewed, last_updated).
+        string_hash_func returns string id in the platform for a key.
+        Return True on success, False otherwise.
+    """
+    def func(conn):
+        conn.execute('DELETE FROM translations WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ?', (platform, pslug, rslug, lang))
+        _insert_translations(conn, platform, pslug, rslug, lang, strings, string_hash_func, 0)
+        conn.execute('INSERT OR REPLACE INTO resources (platform, pslug, rslug, lang, fetched_at) VALUES (?, ?, ?, ?, ?)', (platform, pslug, rslug, lang, time.time()))
+        return True
+    if _execute(func) != True:
+        return False
+    _purge_if_due()
+    return True
+
+def upsert_translations_iter(platform, pslug, rslug, lang, strings, string_hash_func, batch_size=500):
+    """ Same as upsert_translations() but strings is an iterable, which is stored in batches
+        while each string is yielded, so that all strings need not to be in memory.
+        Strings are committed when the iterable is exhausted. Nothing is stored when the
+        iterable raises an exception or iteration is stopped.
+    """
+    conn = _connect()
+    committed = False
+    try:
+        conn.execute('DELETE FROM translations WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ?', (platform, pslug, rslug, lang))
+        batch = []
+        position = 0
+        for x in strings:
+            batch.append(x)
+            if len(batch) >= batch_size:
+                _insert_translations(conn, platform, pslug, rslug, lang, batch, string_hash_func, position)
+                position += len(batch)
+                batch = []
+            yield x
+        _insert_translations(conn, platform, pslug, rslug, lang, batch, string_hash_func, position)
+        conn.execute('INSERT OR REPLACE INTO resources (platform, pslug, rslug, lang, fetched_at) VALUES (?, ?, ?, ?, ?)', (platform, pslug, rslug, lang, time.time()))
+        conn.commit()
+        committed = True
+    except sqlite3.Error as e:
+        logger.error("Failed to store translation strings. File: '{}', Reason: '{}'.".format(get_store_file(), e))
+    finally:
+        if not committed:
+            conn.rollback()
+        conn.close()
+    if committed:
+        _purge_if_due()
+
+def _insert_translations(conn, platform, pslug, rslug, lang, strings, string_hash_func, position):
+    if not strings:
+        return
+    conn.executemany('''INSERT OR REPLACE INTO translations (platform, pslug, rslug, lang, key, position, source, translation, reviewed, last_updated)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            ((platform, pslug, rslug, lang, x[0], position + i, x[1], x[2], 1 if x[3] else 0, x[4]) for i, x in enumerate(strings)))
+    sources = [(platform, pslug, rslug, string_hash_func(x[0]), x[0], x[1]) for x in strings]
+    conn.executemany('INSERT OR IGNORE INTO source_strings (platform, pslug, rslug, string_hash, key, source) VALUES (?, ?, ?, ?, ?, ?)', sources)
+    conn.executemany('UPDATE source_strings SET key = ?, source = ? WHERE platform = ? AND pslug = ? AND rslug = ? AND string_hash = ?',
+            ((x[4], x[5], x[0], x[1], x[2], x[3]) for x in sources))
+
+def iter_translations(platform, pslug, rslug, lang, max_age=None):
+    """ Same as select_translations() but return an iterator of StoredTranslationString which
+        reads strings from database while iterating.
+    """
+    try:
+        conn = _connect()
+        row = conn.execute('SELECT fetched_at FROM resources WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ?', (platform, pslug, rslug, lang)).fetchone()
+    except sqlite3.Error as e:
+        logger.error("Failed to access string store. File: '{}', Reason: '{}'.".format(get_store_file(), e))
+        return None
+    if not (row and _is_fresh(row[0], max_age)):
+        conn.close()
+        return None
+    return _iter_translations(conn, platform, pslug, rslug, lang)
+
+def _iter_translations(conn, platform, pslug, rslug, lang):
+    try:
+        cursor = conn.execute('''SELECT key, source, translation, reviewed, last_updated FROM translations
+                                 WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ? ORDER BY position''', (platform, pslug, rslug, lang))
+        for x in cursor:
+            yield StoredTranslationString(x[0], x[1], x[2], bool(x[3]), x[4])
+    finally:
+        conn.close()
+
+def select_translations(platform, pslug, rslug, lang, max_age=None):
+    """ Return list of StoredTranslationString for a language of a resource, in order they were stored.
+        Return None when they are not stored, stored more than max_age seconds ago, or on any errors.
+    """
+    def func(conn):
+        row = conn.execute('SELECT fetched_at FROM resources WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ?', (platform, pslug, rslug, lang)).fetchone()
+        if not (row and _is_fresh(row[0], max_age)):
+            return None
+        rows = conn.execute('''SELECT key, source, translation, reviewed, last_updated FROM translations
+                               WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ? ORDER BY position''', (platform, pslug, rslug, lang)).fetchall()
+        return [StoredTranslationString(x[0], x[1], x[2], bool(x[3]), x[4]) for x in rows]
+    return _execute(func)
+
+def upsert_source_string_details(platform, pslug, rslug, details):
+    """ Store list of StoredSourceStringDetails for a resource.
+        Return True on success, False otherwise.
+    """
+    now = time.time()
+    def func(conn):
+        rows = [(platform, pslug, rslug, x.string_hash) for x in details]
+        conn.executemany('INSERT OR IGNORE INTO source_strings (platform, pslug, rslug, string_hash) VALUES (?, ?, ?, ?)', rows)
+        conn.executemany('''UPDATE source_strings SET comment = ?, tags = ?, details_fetched_at = ?
+                            WHERE platform = ? AND pslug = ? AND rslug = ? AND string_hash = ?''',
+                ((x.comment, json.dumps(x.tags), now, platform, pslug, rslug, x.string_hash) for x in details))
+        return True
+    if _execute(func) != True:
+        return False
+    _purge_if_due()
+    return True
+
+def select_source_string_details(platform, pslug, rslug, string_hash, max_age=None):
+    """ Return StoredSourceStringDetails for a source string.
+        Return None when it is not stored, stored more than max_age seconds ago, or on any errors.
+    """
+    def func(conn):
+        row = conn.execute('''SELECT comment, tags, details_fetched_at FROM source_strings
+                              WHERE platform = ? AND pslug = ? AND rslug = ? AND string_hash = ?''', (platform, pslug, rslug, string_hash)).fetchone()
+        if not (row and _is_fresh(row[2], max_age)):
+            return None
+        return StoredSourceStringDetails(string_hash, row[0], json.loads(row[1]) if row[1] else None)
+    return _execute(func)
+
+def count_source_string_details(platform, pslug, rslug, max_age=None):
+    """ Return number of source strings of a resource, when details of all of them are stored.
+        Return None when details of any of them are not stored, stored more than max_age seconds
+        ago, or on any errors.
+    """
+    def func(conn):
+        row = conn.execute('''SELECT COUNT(*), COUNT(details_fetched_at), MIN(details_fetched_at) FROM source_strings
+                              WHERE platform = ? AND pslug = ? AND rslug = ?''', (platform, pslug, rslug)).fetchone()
+        if not (row[0] and row[0] == row[1] and _is_fresh(row[2], max_age)):
+            return None
+        return row[0]
+    return _execute(func)
+
+def delete(platform, pslug, rslug=None):
+    """ Delete strings stored for a project, or a resource.
+        Return number of translation strings deleted, or None on any errors.
+    """
+    def func(conn):
+        if rslug:
+            where, params = 'platform = ? AND pslug = ? AND rslug = ?', (platform, pslug, rslug)
+        else:
+            where, params = 'platform = ? AND pslug = ?', (platform, pslug)
+        n = conn.execute('DELETE FROM translations WHERE ' + where, params).rowcount
+        conn.execute('DELETE FROM search_terms WHERE ' + where, params)
+        conn.execute('DELETE FROM search_index_state WHERE ' + where, params)
+        conn.execute('DELETE FROM source_strings WHERE ' + where, params)
+        conn.execute('DELETE FROM resources WHERE ' + where, params)
+        return n
+    if not os.path.isfile(get_store_file()):
+        return 0
+    return _execute(func)
+
+def purge(max_age):
+    """ Delete strings of languages stored more than max_age seconds ago, and source string
+        details of resources which no longer have any languages stored and whose details were
+        stored more than max_age seconds ago.
+        Return number of languages purged, or None on any errors.
+    """
+    cutoff = time.time() - max_age
+    def func(conn):
+        stale = conn.execute('SELECT platform, pslug, rslug, lang FROM resources WHERE fetched_at < ?', (cutoff,)).fetchall()
+        for params in stale:
+            where = 'platform = ? AND pslug = ? AND rslug = ? AND lang = ?'
+            conn.execute('DELETE FROM translations WHERE ' + where, params)
+            conn.execute('DELETE FROM search_terms WHERE ' + where, params)
+            conn.execute('DELETE FROM search_index_state WHERE ' + where, params)
+            conn.execute('DELETE FROM resources WHERE ' + where, params)
+        conn.execute('''DELETE FROM source_strings WHERE (details_fetched_at IS NULL OR details_fetched_at < ?)
+                        AND NOT EXISTS (SELECT 1 FROM resources AS r
+                                        WHERE r.platform = source_strings.platform AND r.pslug = source_strings.pslug AND r.rslug = source_strings.rslug)''', (cutoff,))
+        return len(stale)
+    if not os.path.isfile(get_store_file()):
+        return 0
+    n = _execute(func)
+    if n:
+        logger.info("Purged strings of {} resource language(s) from string store.".format(n))
+    return n
+
+def _purge_if_due():
+    global _last_purged_at
+    now = time.time()
+    if now - _last_purged_at < _PURGE_INTERVAL_SECONDS:
+        return
+    _last_purged_at = now
+    purge(settings.STRING_STORE_RETENTION_SECONDS)
+
+def _tokenize(text):
+    if not text:
+        return []
+    if not isinstance(text, type(u'')):
+        text = text.decode('utf-8', 'replace')
+    return re.findall(r'\w+', text.lower(), re.UNICODE)
+
+def _index_terms(key, source, translation):
+    """ Return {term: score} for a string. """
+    d = {}
+    for field, text in (('key', key), ('source', source), ('translation', translation)):
+        for term in _tokenize(text):
+            d[term] = d.get(term, 0) + _FIELD_WEIGHTS[field]
+    return d
+
+def _update_index(conn, platform):
+    """ Index languages of resources whose strings have been stored since they were indexed. """
+    stale = conn.execute('''SELECT r.pslug, r.rslug, r.lang, r.fetched_at FROM resources AS r
+                            LEFT JOIN search_index_state AS s
+                            ON s.platform = r.platform AND s.pslug = r.pslug AND s.rslug = r.rslug AND s.lang = r.lang
+                            WHERE r.platform = ? AND (s.indexed_at IS NULL OR s.indexed_at < r.fetched_at)''', (platform,)).fetchall()
+    for pslug, rslug, lang, fetched_at in stale:
+        conn.execute('DELETE FROM search_terms WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ?', (platform, pslug, rslug, lang))
+        rows = conn.execute('SELECT key, source, translation FROM translations WHERE platform = ? AND pslug = ? AND rslug = ? AND lang = ?', (platform, pslug, rslug, lang)).fetchall()
+        terms = []
+        for key, source, translation in rows:
+            for term, score in _index_terms(key, source, translation).items():
+                terms.append((term, platform, pslug, rslug, lang, key, score))
+        conn.executemany('INSERT INTO search_terms (term, platform, pslug, rslug, lang, key, score) VALUES (?, ?, ?, ?, ?, ?, ?)', terms)
+        conn.execute('INSERT OR REPLACE INTO search_index_state (platform, pslug, rslug, lang, indexed_at) VALUES (?, ?, ?, ?, ?)', (platform, pslug, rslug, lang, fetched_at))
+    if stale:
+        logger.info("Updated search index for {} resource language(s). Platform: '{}'.".format(len(stale), platform))
+
+def search(platform, q, lang=None, limit=50):
+    """ Return list of SearchHit for strings which contain all terms in q (in key, source
+        string or translation), the most relevant first. Hits are limited to a language when
+        lang is specified.
+        Return None on any errors.
+    """
+    terms = list(set(_tokenize(q)))
+    if not terms:
+        return []
+    def func(conn):
+        _update_index(conn, platform)
+        params = [platform] + terms
+        where = 'platform = ? AND term IN ({})'.format(', '.join(['?'] * len(terms)))
+        if lang:
+            where += ' AND lang = ?'
+            params.append(lang)
+        params += [len(terms), limit]
+        rows = conn.execute('''SELECT h.pslug, h.rslug, h.lang, h.key, t.source, t.translation, h.score FROM
+                                (SELECT pslug, rslug, lang, key, SUM(score) AS score FROM search_terms WHERE {}
+                                 GROUP BY pslug, rslug, lang, key HAVING COUNT(*) = ?
+                                 ORDER BY score DESC, pslug, rslug, lang, key LIMIT ?) AS h
+                                JOIN translations AS t
+                                ON t.platform = ? AND t.pslug = h.pslug AND t.rslug = h.rslug AND t.lang = h.lang AND t.key = h.key
+                                ORDER BY h.score DESC, h.pslug, h.rslug, h.lang, h.key'''.format(where), params + [platform]).fetchall()
+        return [SearchHit(platform, *x) for x in rows]
+    return _execute(func)
@@ -1,4 +1,6 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from collections import namedtuple
 import json
 
@@ -7,6 +9,8 @@ logger = logging.getLogger(__name__)
 
 import settings
 import core.creds as creds
+import core.cache as cache
+import core.stringstore as stringstore
 import core.plugins.transifex.utils as transifex_utils
 
 def to_dict(o):
@@ -26,6 +30,8 @@ def to_dict(o):
         return _TranslationPlatformTranslationStringDetails_to_dict(o)
     elif type(o) == TranslationPlatformSourceStringDetails:
         return _TranslationPlatformSourceStringDetails_to_dict(o)
+    elif type(o) == TranslationPlatformSearchHit:
+        return _TranslationPlatformSearchHit_to_dict(o)
     else:
         logger.error("Unknown type: '{}'.".format(type(o)))
         return {}
@@ -117,6 +123,26 @@ def _LanguageStats_to_dict(o):
             'num_untranslated_words': o.num_untranslated_words
             }
 
+def _get_transifex_language_stats(c, project_slug, resource_slug):
+    d = transifex_utils.get_all_translation_stats(c, project_slug, resource_slug)
+    if not d:
+        return None 
+
+    results = []
+    # convert TransifeixTranslationStats to LanguageStats
+    for stats in d:
+        results.append(LanguageStats(
+                            stats.language_code,
+                            stats.last_updated,
+                            stats.num_reviewed_strings,
+                            stats.percentage_reviewed_strings,
+                            stats.num_translated_strings,
+                            stats.num_untranslated_strings,
+                            stats.percentage_translated_strings,
+                            stats.num_translated_words,
+                            stats.num_untranslated_words))
+    return results
+
 def get_language_stats(translation_platform, translation_project_name, resource_repository_name, resource_path):
     """ Return language stats (LanguageStats tuple) for a specified resource of a langauge.
     """
@@ -128,26 +154,84 @@ def get_language_stats(translation_platform, translation_project_name, resource_
 
         project_slug = transifex_utils.generate_project_slug(c.project_slug_prefix, translation_project_name)
         resource_slug = transifex_utils.generate_resource_slug(c.resource_slug_prefix, [resource_repository_name, resource_path])
-        d = transifex_utils.get_all_translation_stats(c, project_slug, resource_slug)
-        if not d:
+        return _get_transifex_language_stats(c, project_slug, resource_slug)
+    elif translation_platform == 'crowdin':
+        logger.error("NIY: get_language_stats() for crowdin.")
+        return None 
+    else:
+        logger.error("Unknown translation platform: '{}'.\n".format(translation_platform))
+        return None 
+
+# Language stats of a resource.
+#
+# keys                  values
+# -----------------------------------
+# resource_path         Path of a resource in resource repository.
+# stats                 List of LanguageStats tuple, or None on errors.
+# error                 Error message, or None when stats are obtained.
+ResourceLanguageStats = namedtuple('ResourceLanguageStats', 'resource_path, stats, error')
+
+_stats_executor = None
+_stats_executor_lock = threading.Lock()
+
+def _get_stats_executor():
+    global _stats_executor
+    with _stats_executor_lock:
+        if _stats_executor == None:
+            _stats_executor = ThreadPoolExecutor(max_workers=settings.PROJECT_STATUS_WORKERS)
+        return _stats_executor
+
+def _wait_futures(futures, timeout, what):
+    """ Wait for futures for timeout seconds, and return set of futures not done. Not done
+        futures are cancelled, so that queries not started do not occupy the shared executor.
+        Queries already started cannot be cancelled, and number of them is logged.
+    """
+    done, not_done = wait(futures, timeout=timeout)
+    running = [f for f in not_done if not f.cancel()]
+    if not_done:
+        logger.warning("Timed out to get {} ({} seconds). Cancelled: {}, still running: {}.".format(what, timeout, len(not_done) - len(running), len(running)))
+    return not_done
+
+def get_language_stats_of_resources(translation_platform, translation_project_name, resource_repository_name, resource_paths, timeout=None):
+    """ Return list of language stats (ResourceLanguageStats tuple) for resources in a resource repository.
+        Stats are queried concurrently (up to PROJECT_STATUS_WORKERS queries at a time, shared
+        by all callers). Stats for a resource which failed, or not obtained within timeout
+        seconds, are reported with an error.
+        Return None on errors for all resources (e.g. unknown platform).
+    """
+    if translation_platform == 'transifex':
+        c = creds.get(translation_platform)
+        if not c:
+            logger.error("Failed to get creds for platform: '{}'.\n".format(translation_platform))
             return None 
 
+        project_slug = transifex_utils.generate_project_slug(c.project_slug_prefix, translation_project_name)
+        executor = _get_stats_executor()
+        futures = []
+        for path in resource_paths:
+            resource_slug = transifex_utils.generate_resource_slug(c.resource_slug_prefix, [resource_repository_name, path])
+            futures.append((path, resource_slug, executor.submit(_get_transifex_language_stats, c, project_slug, resource_slug)))
+
+        not_done = _wait_futures([x[2] for x in futures], timeout, 'language stats')
+
         results = []
-        # convert TransifeixTranslationStats to LanguageStats
-        for stats in d:
-            results.append(LanguageStats(
-                                stats.language_code,
-                                stats.last_updated,
-                                stats.num_reviewed_strings,
-                                stats.percentage_reviewed_strings,
-                                stats.num_translated_strings,
-                                stats.num_untranslated_strings,
-                                stats.percentage_translated_strings,
-                                stats.num_translated_words,
-                                stats.num_untranslated_words))
+        for path, resource_slug, f in futures:
+            if f in not_done:
+                results.append(ResourceLanguageStats(path, None, "Timed out to get language stats ({} seconds).".format(timeout)))
+                continue
+            try:
+                stats = f.result()
+            except Exception as e:
+                logger.error("Failed to get language stats. pslug: '{}', rslug: '{}', Reason: '{}'.".format(project_slug, resource_slug, e))
+                results.append(ResourceLanguageStats(path, None, "Failed to get language stats. Reason: '{}'.".format(e)))
+                continue
+            if stats:
+                results.append(ResourceLanguageStats(path, stats, None))
+            else:
+                results.append(ResourceLanguageStats(path, None, "Failed to get language stats. pslug: '{}', rslug: '{}'.".format(project_slug, resource_slug)))
         return results
     elif translation_platform == 'crowdin':
-        logger.error("NIY: get_language_stats() for crowdin.")
+        logger.error("NIY: get_language_stats_of_resources() for crowdin.")
         return None 
     else:
         logger.error("Unknown translation platform: '{}'.\n".format(translation_platform))
@@ -191,8 +275,7 @@ def get_master_language_stats(**kwargs):
         pslug = transifex_utils.generate_project_slug(c.project_slug_prefix, kwargs['project_name'])
         rslug = transifex_utils.generate_resource_slug(c.resource_slug_prefix, [kwargs['resource_repository_name'], kwargs['resource_path']])
 
-        _setup_dir(os.path.join(settings.CACHE_DIR, kwargs['platform'], 'projects', pslug, rslug))
-        out = os.path.join(settings.CACHE_DIR, kwargs['platform'], 'projects', pslug, rslug, 'resource.cache')
+        out = cache.get_path(kwargs['platform'], 'resource', pslug, rslug)
 
         d = transifex_utils.get_platform_project_resource_details(c, out, pslug, rslug)
         if d != None:
@@ -336,8 +419,7 @@ def get_translation_resource_slugs(translation_platform, translation_project_nam
             return None 
         pslug = transifex_utils.generate_project_slug(c.project_slug_prefix, translation_project_name)
         
-        _setup_dir(os.path.join(settings.CACHE_DIR, translation_platform, 'projects', pslug))
-        out = os.path.join(settings.CACHE_DIR, translation_platform, 'projects', pslug, 'project.cache')
+        out = cache.get_path(translation_platform, 'project', pslug)
         
         d = transifex_utils.get_platform_project_details(c, out, pslug)
         if d != None:
@@ -352,16 +434,6 @@ def get_translation_resource_slugs(translation_platform, translation_project_nam
         logger.error("NIY: get_resource_slugs() for '{}'".format(translation_platform))
         return []
 
-def _setup_dir(path):
-    if not os.path.isdir(path):
-        try:
-            os.makedirs(path)
-        except OSError as e:
-            logger.error("Failed to create directory: '{}'. Reason: {}".format(path, e))
-        else:
-            if not os.path.isdir(path):
-                logger.error("Created directory does not exist: '{}'.".format(path))
-
 '''
     Translation Platform Project Summary
 
@@ -390,11 +462,7 @@ def get_platform_projects(platform):
         logger.error("Failed to get creds for platform: '{}'.\n".format(platform))
         return None 
         
-    # Cache directory (e.g. cache/transifex/projects) should be created before
-    # any other platform query is made.
-    _setup_dir(os.path.join(settings.CACHE_DIR, platform))
-    _setup_dir(os.path.join(settings.CACHE_DIR, platform, 'projects'))
-    out = os.path.join(settings.CACHE_DIR, platform, 'projects', 'projects.cache')
+    out = cache.get_path(platform, 'projects')
 
     if platform == 'transifex':
         d = transifex_utils.get_platform_projects(c, out)
@@ -446,18 +514,17 @@ def get_platform_project_details(platform, pslug, use_cache=True):
     Return project details (TranslationPlatformProjectDetails tuple) for a translation project.
     Return None on any errors.
 
-    When use_cache=True and the cache file exists, read project details from the file.
+    When use_cache=True and the cache file is not expired, read project details from the file.
     """
     c = creds.get(platform)
     if not c:
         logger.error("Failed to get creds for platform: '{}'.\n".format(platform))
         return None 
         
-    _setup_dir(os.path.join(settings.CACHE_DIR, platform, 'projects', pslug))
-    out = os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, 'project.cache')
+    out = cache.get_path(platform, 'project', pslug)
 
     if platform == 'transifex':
-        if use_cache and os.path.isfile(out):
+        if use_cache and cache.is_fresh(out, 'project'):
             d = transifex_utils.read_platform_project_details(c, out)
         else:
             d = transifex_utils.get_platform_project_details(c, out, pslug)
@@ -492,18 +559,17 @@ def get_platform_project_resource_details(platform, pslug, rslug, use_cache=True
     Return details (TranslationPlatformProjectResource tuple) for a specified resource.
     Return None on any errors.
 
-    When use_cache=True and the cache file exists, read resource details from the file.
+    When use_cache=True and the cache file is not expired, read resource details from the file.
     """
     c = creds.get(platform)
     if not c:
         logger.error("Failed to get creds for platform: '{}'.\n".format(platform))
         return None 
         
-    _setup_dir(os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, rslug))
-    out = os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, rslug, 'resource.cache')
+    out = cache.get_path(platform, 'resource', pslug, rslug)
 
     if platform == 'transifex':
-        if use_cache and os.path.isfile(out):
+        if use_cache and cache.is_fresh(out, 'resource'):
             d = transifex_utils.read_platform_project_resource_details(c, out)
         else:
             d = transifex_utils.get_platform_project_resource_details(c, out, pslug, rslug)
@@ -515,6 +581,42 @@ def get_platform_project_resource_details(platform, pslug, rslug, use_cache=True
         logger.error("Unknown platform: '{}'.\n".format(platform))
         return None
 
+def get_platform_project_resources_details(platform, pslug, rslugs=None, use_cache=True, timeout=None):
+    """
+    Return list of details (TranslationPlatformProjectResourceDetails tuple) for resources in a
+    project, in the order of resource slugs. All resources in the project when resource slugs
+    are not specified. Resources whose details are not obtained (including ones not obtained
+    within timeout seconds, PROJECT_STATUS_TIMEOUT_SECONDS by default) are not included.
+    Return None on any errors for the project.
+
+    Details are queried concurrently (up to PROJECT_STATUS_WORKERS queries at a time, shared
+    with project status queries).
+    """
+    if timeout == None:
+        timeout = settings.PROJECT_STATUS_TIMEOUT_SECONDS
+    if rslugs == None:
+        p = get_platform_project_details(platform, pslug, use_cache)
+        if p == None:
+            return None
+        rslugs = [x.slug for x in p.resources]
+
+    executor = _get_stats_executor()
+    futures = [executor.submit(get_platform_project_resource_details, platform, pslug, rslug, use_cache) for rslug in rslugs]
+    not_done = _wait_futures(futures, timeout, 'resource details')
+    results = []
+    for rslug, f in zip(rslugs, futures):
+        if f in not_done:
+            logger.error("Timed out to get resource details ({} seconds). Platform: '{}', Pslug: '{}', Rslug: '{}'.".format(timeout, platform, pslug, rslug))
+            continue
+        try:
+            d = f.result()
+        except Exception as e:
+            logger.error("Failed to get resource details. Platform: '{}', Pslug: '{}', Rslug: '{}', Reason: '{}'.".format(platform, pslug, rslug, e))
+            continue
+        if d != None:
+            results.append(d)
+    return results
+
 # Details of translation strings.
 #
 # key                   key for the string.
@@ -527,37 +629,50 @@ TranslationPlatformTranslationStringDetails = namedtuple('TranslationPlatformTra
 def _TranslationPlatformTranslationStringDetails_to_dict(o):
     return {'key': o.key, 'source': o.source, 'translation': o.translation, 'reviewed': o.reviewed, 'last_updated': o.last_updated}
 
-def get_platform_project_translation_strings(platform, pslug, rslug, lang, use_cache=True):
+def iter_platform_project_translation_strings(platform, pslug, rslug, lang, use_cache=True):
     """
-    Return list of translated string (TranslationPlatformTranslationString tuple) for a specified language of resource.
-    Return None on any errors.
+    Return iterator of translated string (TranslationPlatformTranslationString tuple) for a specified language of resource.
+    Return None on any errors before iteration. The iterator raises ValueError on errors
+    while reading strings.
 
-    When use_cache=True and the cache file exists, read strings from the file.
+    Strings are read from string store or translation platform while iterating, so that
+    all strings need not to be in memory.
+    When use_cache=True and strings stored in string store are not expired, read strings from the store.
     """
     c = creds.get(platform)
     if not c:
         logger.error("Failed to get creds for platform: '{}'.\n".format(platform))
         return None 
         
-    _setup_dir(os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, rslug))
-    out = os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, rslug, 'strings.' + lang + '.cache')
-
     if platform == 'transifex':
-        if use_cache and os.path.isfile(out):
-            d = transifex_utils.read_platform_project_translation_strings(c, out)
-        else:
-            d = transifex_utils.get_platform_project_translation_strings(c, out, pslug, rslug, lang)
+        d = None
+        if use_cache:
+            d = transifex_utils.iter_stored_platform_project_translation_strings(c, pslug, rslug, lang, settings.CACHE_TTL_SECONDS['strings'])
+        if d == None:
+            d = transifex_utils.iter_platform_project_translation_strings(c, pslug, rslug, lang)
         if d != None:
-            l = []
-            for x in d:
-                l.append(TranslationPlatformTranslationStringDetails(x.key, x.source, x.translation, x.reviewed, x.last_updated))
-            return l
+            return (TranslationPlatformTranslationStringDetails(x.key, x.source, x.translation, x.reviewed, x.last_updated) for x in d)
         else:
            return None
     else:
         logger.error("Unknown platform: '{}'.\n".format(platform))
         return None
 
+def get_platform_project_translation_strings(platform, pslug, rslug, lang, use_cache=True):
+    """
+    Return list of translated string (TranslationPlatformTranslationString tuple) for a specified language of resource.
+    Return None on any errors.
+
+    When use_cache=True and strings stored in string store are not expired, read strings from the store.
+    """
+    it = iter_platform_project_translation_strings(platform, pslug, rslug, lang, use_cache)
+    if it == None:
+        return None
+    try:
+        return list(it)
+    except ValueError:
+        return None
+
 def get_platform_string_id(platform, **kwargs):
     if platform == 'transifex':
         if 'string_key' in kwargs:
@@ -587,22 +702,19 @@ def get_platform_project_source_string_details(platform, pslug, rslug, string_id
     Return details of a source sting.
     Return None on any errors.
 
-    When use_cache=True and the cache file exists, read string details from the file.
+    When use_cache=True and string details stored in string store are not expired, read string details from the store.
     """
     c = creds.get(platform)
     if not c:
         logger.error("Failed to get creds for platform: '{}'.\n".format(platform))
         return None 
 
-    destdir = os.path.join(settings.CACHE_DIR, platform, 'projects', pslug, rslug, 'source')
-    _setup_dir(destdir)
-    out = os.path.join(destdir, string_id + '.cache')
-
     if platform == 'transifex':
-        if use_cache and os.path.isfile(out):
-            d = transifex_utils.read_platform_project_source_string_details(c, out)
-        else:
-            d = transifex_utils.get_platform_project_source_string_details(c, out, pslug, rslug, string_id)
+        d = None
+        if use_cache:
+            d = transifex_utils.read_platform_project_source_string_details(c, pslug, rslug, string_id, settings.CACHE_TTL_SECONDS['source'])
+        if d == None:
+            d = transifex_utils.get_platform_project_source_string_details(c, pslug, rslug, string_id)
         if d != None:
             return TranslationPlatformSourceStringDetails(d.comment, d.tags)
         else:
@@ -611,3 +723,58 @@ def get_platform_project_source_string_details(platform, pslug, rslug, string_id
         logger.error("Unknown platform: '{}'.\n".format(platform))
         return None
 
+def prefetch_platform_project_source_string_details(platform, pslug, rslug, use_cache=True):
+    """
+    Obtain details of all source strings of a resource in bulk and store them, so that
+    get_platform_project_source_string_details() reads them from string store.
+    Return number of source strings, or None on any errors.
+
+    When use_cache=True and details of all source strings stored in string store are not expired, nothing is obtained.
+    """
+    c = creds.get(platform)
+    if not c:
+        logger.error("Failed to get creds for platform: '{}'.\n".format(platform))
+        return None 
+
+    if platform == 'transifex':
+        if use_cache:
+            n = transifex_utils.count_stored_platform_project_source_string_details(c, pslug, rslug, settings.CACHE_TTL_SECONDS['source'])
+            if n != None:
+                return n
+        r = get_platform_project_resource_details(platform, pslug, rslug)
+        if r == None:
+            logger.error("Failed to get source language of resource. pslug: '{}', rslug: '{}'.".format(pslug, rslug))
+            return None
+        return transifex_utils.prefetch_platform_project_source_string_details(c, pslug, rslug, r.language_code)
+    else:
+        logger.error("Unknown platform: '{}'.\n".format(platform))
+        return None
+
+# Search hit of strings in translation platform.
+#
+# keys                  values
+# -----------------------------------
+# project_slug          project slug.
+# resource_slug         resource slug.
+# language_code         language code.
+# key                   key for the string.
+# source                source string.
+# translation           translation for the source string.
+# score                 relevance. Higher is more relevant.
+TranslationPlatformSearchHit = namedtuple('TranslationPlatformSearchHit', 'project_slug, resource_slug, language_code, key, source, translation, score')
+
+def _TranslationPlatformSearchHit_to_dict(o):
+    return {'project_slug': o.project_slug, 'resource_slug': o.resource_slug, 'language_code': o.language_code, 'key': o.key, 'source': o.source, 'translation': o.translation, 'score': o.score}
+
+def search_platform_strings(platform, q, lang=None, limit=50):
+    """
+    Return list of strings (TranslationPlatformSearchHit tuple), which contain all words in q
+    in key, source string or translation, across all projects. The most relevant first.
+    Only strings stored by querying translation strings (see get_platform_project_translation_strings())
+    are searched.
+    Return None on any errors.
+    """
+    l = stringstore.search(platform, q, lang, limit)
+    if l == None:
+        return None
+    return [TranslationPlatformSearchHit(x.pslug, x.rslug, x.lang, x.key, x.source, x.translation, x.score) for x in l]
@@ -0,0 +1,196 @@
+'''
+    Worker Pool
+
+    Worker pool keeps warm worker processes (worker_cmd.py) which have already imported
+    core package and plugins. A job execution is sent to an idle worker as a json line on
+    the worker's stdin, and the worker replies the results as a json line on its stdout.
+
+    Request (parent -> worker)
+
+        keys                    values
+        ----------------------------------------------------------------------
+        argv                    Arguments for uploader_cmd.py.
+        log_path                Path to log file (tpa.log) for the execution.
+        err_path                Path to error file (tpa.err) for the execution.
+
+    Reply (worker -> parent)
+
+        keys                    values
+        ----------------------------------------------------------------------
+        exit_code               Exit code of the execution. 0 on success.
+        jobs                    Number of jobs executed by the worker so far.
+        max_rss_kb              Peak resident set size of the worker in KB.
+
+    A worker which died while executing a job is discarded and the job is concluded as
+    failure. A worker is recycled after WORKER_MAX_JOBS jobs or when its peak memory usage
+    exceeds WORKER_MAX_RSS_KB.
+'''
+import os
+import json
+import signal
+import threading
+from subprocess import Popen, PIPE
+
+import logging
+logger = logging.getLogger(__name__)
+
+class _Worker(object):
+    def __init__(self, worker_path):
+        self._proc = Popen(['python', worker_path], stdin=PIPE, stdout=PIPE, close_fds=True)
+        self.jobs = 0
+        self.max_rss_kb = 0
+        self._lock = threading.Lock()
+        self._execution_id = None # id of the execution running in the worker.
+
+    @property
+    def pid(self):
+        return self._proc.pid
+
+    def alive(self):
+        return self._proc.poll() == None
+
+    def run(self, argv, log_path, err_path, execution_id=None):
+        """ Execute uploader in the worker. execution_id identifies the execution for interrupt().
+            Return exit code of the execution, or None when the worker died.
+        """
+        with self._lock:
+            self._execution_id = execution_id
+        try:
+            return self._run(argv, log_path, err_path)
+        finally:
+            with self._lock:
+                self._execution_id = None
+
+    def _run(self, argv, log_path, err_path):
+        try:
+            self._proc.stdin.write(json.dumps({'argv': argv, 'log_path': log_path, 'err_path': err_path}) + '\n')
+            self._proc.stdin.flush()
+            line = self._proc.stdout.readline()
+        except (IOError, OSError) as e:
+            logger.error("Failed to communicate with worker (pid: {}). Reason: '{}'.".format(self.pid, e))
+            return None
+
+        if not line:
+            return None
+        try:
+            d = json.loads(line)
+        except ValueError as e:
+            logger.error("Failed to load worker reply as json. Reason: '{}', reply: '{}'.".format(e, line))
+            return None
+        self.jobs = d['jobs']
+        self.max_rss_kb = d['max_rss_kb']
+        return d['exit_code']
+
+    def wait(self):
+        """ Return exit code of the worker process. """
+        return self._proc.wait()
+
+    def kill(self):
+        """ Kill the worker unless it has already exited. Return exit code of the worker process. """
+        if self.alive():
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+        return self._proc.wait()
+
+    def interrupt(self, execution_id=None):
+        """ Kill the worker without waiting for it, to cancel the execution it is executing.
+            Nothing is done unless the worker is executing the execution, since the worker
+            executes other executions once it has finished.
+        """
+        with self._lock:
+            if self._execution_id == None or self._execution_id != execution_id:
+                return
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def stop(self):
+        """ Let the worker exit by closing its stdin. """
+        try:
+            self._proc.stdin.close()
+        except (IOError, OSError):
+            pass
+        return self._proc.wait()
+
+class WorkerPool(object):
+    def __init__(self, worker_path, size, max_jobs, max_rss_kb):
+        self._worker_path = worker_path
+        self._size = size
+        self._max_jobs = max_jobs
+        self._max_rss_kb = max_rss_kb
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _spawn(self):
+        try:
+            w = _Worker(self._worker_path)
+        except OSError as e:
+            logger.error("Failed to start worker: '{}'. Reason: '{}'.".format(self._worker_path, e))
+            return None
+        else:
+            logger.info("Started worker (pid: {}).".format(w.pid))
+            return w
+
+    def start(self):
+        """ Start workers up to the pool size. """
+        with self._lock:
+            while len(self._idle) < self._size:
+                w = self._spawn()
+                if w == None:
+                    break
+                self._idle.append(w)
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                w = self._idle.pop()
+                if w.alive():
+                    return w
+                logger.error("Discarded dead worker (pid: {}, exit code: {}).".format(w.pid, w.wait()))
+        return self._spawn()
+
+    def _checkin(self, w):
+        if w.jobs >= self._max_jobs or w.max_rss_kb >= self._max_rss_kb:
+            logger.info("Recycling worker (pid: {}, jobs: {}, max rss: {} KB).".format(w.pid, w.jobs, w.max_rss_kb))
+            w.stop()
+            w = self._spawn()
+            if w == None:
+                return
+        with self._lock:
+            self._idle.append(w)
+
+    def run(self, argv, log_path, err_path, execution_id=None, on_start=None, on_finish=None):
+        """ Execute uploader with given arguments in a worker. Block while all workers are busy.
+            on_start is called with the worker before the execution, and on_finish after the
+            execution, before the worker is returned to the pool.
+            Return exit code of the execution, or None when no worker is available.
+        """
+        with self._slots:
+            w = self._checkout()
+            if w == None:
+                return None
+            if on_start:
+                on_start(w)
+            try:
+                exit_code = w.run(argv, log_path, err_path, execution_id)
+            finally:
+                if on_finish:
+                    on_finish(w)
+            if exit_code == None:
+                exit_code = w.kill()
+                logger.error("Worker died while executing a job (pid: {}, exit code: {}).".format(w.pid, exit_code))
+                return exit_code if exit_code != 0 else 1
+            self._checkin(w)
+            return exit_code
+
+    def shutdown(self):
+        """ Stop all idle workers. """
+        with self._lock:
+            workers = self._idle
+            self._idle = []
+        for w in workers:
+            w.stop()
@@ -0,0 +1,40 @@
+import sys
+
+import logging
+logger = None
+
+import settings
+import core.job as job
+
+def backfill():
+    logger.info("Building execution history from logs in: '{}'...".format(settings.LOG_DIR))
+    n = job.backfill_execution_history()
+    if n == None:
+        logger.error("Failed to build execution history.")
+        return False
+    else:
+        logger.info("Recorded '{}' executions.".format(n))
+        return True
+
+def _setup_logger():
+    global logger
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s  %(asctime)s  %(module)s:%(funcName)s:%(lineno)d] %(message)s')
+    logger = logging.getLogger('tpa')
+
+def main(argv):
+    """ Usage: python history_cmd.py backfill """
+    _setup_logger()
+    if len(argv) != 1 or argv[0] != 'backfill':
+        logger.error("Usage: python history_cmd.py backfill")
+        logging.shutdown()
+        sys.exit(1)
+
+    if backfill():
+        logging.shutdown()
+        sys.exit(0)
+    else:
+        logging.shutdown()
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
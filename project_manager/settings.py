@@ -11,5 +11,11 @@ TPA_API_PROJECT = urlparse.urljoin(TPA_SERVER, 'api/v0/project')
 TPA_API_PROJECTS = urlparse.urljoin(TPA_SERVER, 'api/v0/projects')
 TPA_API_REPOSITORY = urlparse.urljoin(TPA_SERVER, 'api/v0/local/repository')
 
+# Timeout in seconds for each TPA API call.
+TPA_API_TIMEOUT_SECONDS = 60
+
+# Max number of TPA API calls in flight at the same time (connections of the HTTP client).
+TPA_API_MAX_CLIENTS = 20
+
 # Port for this developers console runs on.
 HTTP_PORT='8082'
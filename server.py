@@ -24,6 +24,8 @@ from apscheduler.executors.pool import ProcessPoolExecutor
 import settings
 import apih
 import core.job as job
+import core.snapshot as snapshot
+import core.repository as repository
 
 class SchedulerJob():
     def __init__(self, job_configuration):
@@ -40,6 +42,21 @@ class IndexPageHandler(tornado.web.RequestHandler):
 class ScheduleServer():
     def __init__(self):
         tornado.options.parse_command_line()
+        executors = {
+            'default': {'type': 'threadpool', 'max_workers': settings.SCHEDULER_THREADPOOL_SIZE},
+            'processpool': ProcessPoolExecutor(max_workers=settings.SCHEDULER_PROCESSPOOL_SIZE)
+        }
+
+        logger.info("Initializing scheduler (pid: {}, port: '{}')...".format(os.getpid(), settings.HTTP_PORT))
+        self.scheduler = TornadoScheduler()
+        self.scheduler.configure(executors = executors)
+        job.start_workers()
+        self._restore_jobs()
+        self.scheduler.add_job(snapshot.refresh_all, 'interval', seconds=settings.PROJECT_SNAPSHOT_INTERVAL_SECONDS, next_run_time=datetime.datetime.now(), name='Refresh project snapshots', id='_refresh_project_snapshots', misfire_grace_time=None)
+        self.scheduler.add_job(repository.remove_unused_worktrees, name='Remove unused worktrees', id='_remove_unused_worktrees', misfire_grace_time=None)
+        self.scheduler.start()
+        logger.info(self.scheduler.print_jobs())
+
         application = tornado.web.Application(
                 [
                     (r'/', IndexPageHandler),
@@ -53,14 +70,26 @@ class ScheduleServer():
                     (r'/api/v0/project/([^/]+)/resource/details', apih.ProjectResourceDetailsHandler),
                     # List of language status. Args: project id 
                     (r'/api/v0/project/([^/]+)/translation/status', apih.ProjectTranslationStatusHandler),
+                    # Snapshot of project details, resources, translation status and job sync status, with its age. Args: project id
+                    (r'/api/v0/project/([^/]+)/overview', apih.ProjectOverviewHandler),
 
                     # --- JOB --- #
                     # List of jobs.
                     (r'/api/v0/jobs', apih.ListJobSummaryHandler),
+                    # The most recent job execution status for each job.
+                    (r'/api/v0/jobs/exec/status', apih.ListJobExecStatusHandler),
+                    # Scheduler stats (queued/running jobs per repository and lock wait time).
+                    (r'/api/v0/jobs/scheduler/stats', apih.SchedulerStatsHandler),
+                    # Details of jobs. Query: ids (comma separated job ids)
+                    (r'/api/v0/jobs/details', apih.ListJobDetailsHandler),
+                    # Sync status of jobs. Query: ids (comma separated job ids)
+                    (r'/api/v0/jobs/sync/status', apih.ListJobSyncStatusHandler),
                     # Summary of a job. Args: job id
                     (r'/api/v0/job/([^/]+)', apih.JobSummaryHandler),
                     # Execute a job. Args: job id
                     (r'/api/v0/job/([^/]+)/exec', apih.JobExecutionHandler),
+                    # Runs of a job. Args: job id
+                    (r'/api/v0/job/([^/]+)/runs', apih.JobRunsHandler),
                     # Details of a job. Args: job id
                     (r'/api/v0/job/([^/]+)/details', apih.JobDetailsHandler),
                     # List of resource file path and slug. Args: job id 
@@ -72,6 +101,12 @@ class ScheduleServer():
                     # Job execution status. Args: job id
                     (r'/api/v0/job/([^/]+)/exec/status', apih.JobExecStatusHandler),
 
+                    # --- RUN (JOB EXECUTION IN SCHEDULER) --- #
+                    # State of a run. Args: run id
+                    (r'/api/v0/run/([^/]+)', apih.RunStatusHandler),
+                    # Cancel a queued or running run. Args: run id
+                    (r'/api/v0/run/([^/]+)/cancel', apih.RunCancelHandler),
+
                     # maybe /job/(^/]+)/log/context/3  (limit = 3) might be useful
 
                     # --- CONFIGURATION --- #
@@ -105,8 +140,12 @@ class ScheduleServer():
                     #--- TRANSLATION REPOSITORY --- #
                     # List of projects. Args: platform name
                     (r'/api/v0/translation/([^/]+)/projects', apih.ListTranslationProjectsHandler),
+                    # Search strings across projects. Args: platform name. Query: q, lang (optional), limit (optional)
+                    (r'/api/v0/translation/([^/]+)/search', apih.TranslationSearchHandler),
                     # Project details. Args: platform name, project id
                     (r'/api/v0/translation/([^/]+)/project/([^/]+)/details', apih.TranslationProjectDetailsHandler),
+                    # Details of resources in a project. Args: platform name, project id. Query: slugs (comma separated resource ids, optional)
+                    (r'/api/v0/translation/([^/]+)/project/([^/]+)/resources/details', apih.TranslationResourcesDetailsHandler),
                     # Resource details. Args: platform name, project id, resource id
                     (r'/api/v0/translation/([^/]+)/project/([^/]+)/resource/([^/]+)/details', apih.TranslationResourceDetailsHandler),
                     # All strings for a language. Args: platform name, project id, resource id, language code
@@ -114,25 +153,24 @@ class ScheduleServer():
                     # Details for a translation string. Args: platform name, project id, resource id, source string id
                     # (r'/api/v0/translation/([^/]+)/project/([^/]+)/resource/([^/]+)/translation/([^/]+)/details', apih.TranslationTranslationStringDetailsHandler),
                     # Details for a source string. Args: platform name, project id, resource id, source string id (key)
-                    (r'/api/v0/translation/([^/]+)/project/([^/]+)/resource/([^/]+)/source/([^/]+)/details', apih.TranslationSourceStringDetailsHandler)
+                    (r'/api/v0/translation/([^/]+)/project/([^/]+)/resource/([^/]+)/source/([^/]+)/details', apih.TranslationSourceStringDetailsHandler),
+                    # Obtain details for all source strings in bulk (POST). Args: platform name, project id, resource id
+                    (r'/api/v0/translation/([^/]+)/project/([^/]+)/resource/([^/]+)/source/prefetch', apih.TranslationSourceStringsPrefetchHandler),
+
+                    # --- CACHE (TRANSLATION PLATFORM QUERIES) --- #
+                    # Cache stats.
+                    (r'/api/v0/cache/stats', apih.CacheStatsHandler),
+                    # Invalidate cache for a project. Args: platform name, project id
+                    (r'/api/v0/cache/([^/]+)/project/([^/]+)/invalidate', apih.CacheInvalidationHandler),
+                    # Invalidate cache for a resource. Args: platform name, project id, resource id
+                    (r'/api/v0/cache/([^/]+)/project/([^/]+)/resource/([^/]+)/invalidate', apih.CacheInvalidationHandler)
                 ],
                 template_path = os.path.join(os.path.dirname(__file__), 'templates'),
-                static_path = os.path.join(os.path.dirname(__file__), 'static')
+                static_path = os.path.join(os.path.dirname(__file__), 'static'),
+                scheduler = self.scheduler
         )
         self.http_server = tornado.httpserver.HTTPServer(application)
 
-        executors = {
-            'default': {'type': 'threadpool', 'max_workers': 20},
-            'processpool': ProcessPoolExecutor(max_workers=5)
-        }
-
-        logger.info("Initializing scheduler (pid: {}, port: '{}')...".format(os.getpid(), settings.HTTP_PORT))
-        self.scheduler = TornadoScheduler()
-        self.scheduler.configure(executors = executors)
-        self._restore_jobs()
-        self.scheduler.start()
-        logger.info(self.scheduler.print_jobs())
-
     def _restore_jobs(self):
         global job
         configs = job.get_configuration(status='active')
@@ -160,6 +198,7 @@ class ScheduleServer():
     def terminate(self):
         logger.info('Stopping scheduler...')
         self.scheduler.shutdown()
+        job.stop_workers()
         tornado.ioloop.IOLoop.current().stop()
         sys.exit(0)
 
@@ -208,6 +247,8 @@ def _check_settings():
         results = False
     if not _ensure_system_file(settings.SCHEDULER_UPLOADER):
         results = False
+    if settings.WORKER_POOL_SIZE >= 1 and not _ensure_system_file(settings.SCHEDULER_WORKER):
+        results = False
     return results
 
 def _initialize():
@@ -217,6 +258,12 @@ def _initialize():
         return False 
     if not _setup_dir(settings.CACHE_DIR):
        return False
+    if not _setup_dir(settings.UPLOAD_LEDGER_DIR):
+       return False
+    if not _setup_dir(settings.WATERMARK_DIR):
+       return False
+    if not _setup_dir(settings.SNAPSHOT_DIR):
+       return False
     return True
 
 def main():
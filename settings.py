@@ -21,18 +21,123 @@ JOB_FILE = os.path.join(TPA_ROOT_DIR, 'jobs.json')
 # Uploader for  scheduler.
 SCHEDULER_UPLOADER = os.path.join(TPA_ROOT_DIR, 'translation-process-automation/uploader_cmd.py')
 
+# Max number of jobs executed at the same time by scheduler. Jobs for the same repository
+# are executed one by one regardless of these numbers.
+SCHEDULER_THREADPOOL_SIZE = 20
+SCHEDULER_PROCESSPOOL_SIZE = 5
+
+# Worker pool for scheduler. Workers run uploader without starting a new process per job.
+# Set WORKER_POOL_SIZE to 0 to run uploader in a new process for each job.
+SCHEDULER_WORKER = os.path.join(TPA_ROOT_DIR, 'translation-process-automation/worker_cmd.py')
+WORKER_POOL_SIZE = 5
+# A worker is restarted after executing this number of jobs.
+WORKER_MAX_JOBS = 50
+# A worker is restarted when its peak memory usage exceeds this size (KB).
+WORKER_MAX_RSS_KB = 512 * 1024
+
+# Jobs for the same local repository are executed one by one. A job waits for the repository up to
+# REPOSITORY_LOCK_TIMEOUT_SECONDS, and is aborted at once when REPOSITORY_LOCK_MAX_WAITING jobs are
+# already waiting for it, so that scheduler threads are left for jobs for other repositories.
+REPOSITORY_LOCK_TIMEOUT_SECONDS = 1800
+REPOSITORY_LOCK_MAX_WAITING = 2
+
 # Local repository directory. All repsitories are cloned in this directory.
 LOCAL_REPO_DIR = '/path/to/repo/dir'
 
+# Git backend for read-only queries (current branch, head commit, branches) on local repositories.
+#   'refs'          Read HEAD and refs from files in the git directory. It is not a persistent git process;
+#                   other queries (status, log, diff) run git for each query as with 'subprocess'.
+#                   Repositories whose refs are stored in reftable fall back to 'subprocess'.
+#   'subprocess'    Run git for each query.
+GIT_BACKEND = 'refs'
+
+# Sparse clone of resource repositories (on by default). Only resource and translation files in resource
+# configuration are checked out, file contents are fetched on demand (--filter=blob:none) and history is
+# truncated to GIT_CLONE_DEPTH commits (0 for full history). Only work branches are fetched, and each pull
+# fetches only the tip of the work branch.
+# Requires git 2.35 or later; repositories are cloned fully with older git regardless of this setting.
+# Repositories already cloned are not converted.
+GIT_SPARSE_CLONE = True
+GIT_CLONE_DEPTH = 1
+
+# Check out each branch of a repository in its own worktree (LOCAL_REPO_DIR/.worktrees/<repository name>/<branch>)
+# sharing the clone in LOCAL_REPO_DIR/<repository name>, so that jobs for different branches of the same repository
+# run concurrently. Off by default, so that files are checked out in LOCAL_REPO_DIR/<repository name> as before.
+# When on, worktrees of branches which are no longer in any resource configuration are removed at start up and
+# after resource configuration is updated. Existing clones are used as they are; each branch is checked out in a
+# new worktree on the next job run.
+GIT_WORKTREE_PER_BRANCH = False
+
 # Log directory for uploaders.
 LOG_DIR = '/path/to/log/dir'
 
+# Job execution history database. It is created in LOG_DIR.
+HISTORY_FILENAME = 'history.db'
+
+# HTTP client for translation/resource platform APIs.
+# Timeouts (seconds) to connect to a server and to wait for a response.
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 300
+# Max number of keep-alive connections per host for each platform and credentials.
+HTTP_POOL_MAXSIZE = 10
+
+# Max number of translations downloaded at the same time from each translation platform.
+# Translations are downloaded one by one when the number is 1.
+TRANSLATION_DOWNLOAD_WORKERS = {'transifex': 8, 'crowdin': 4}
+
+# Number of concurrent translation platform queries to obtain translation status of resources in projects.
+PROJECT_STATUS_WORKERS = 10
+
+# Latency target in seconds to obtain translation status of a project (e.g. 100 resources are queried by 10
+# workers within the target when each query takes up to 1.5 seconds). Resources whose status are not obtained
+# by then are reported with an error.
+PROJECT_STATUS_TIMEOUT_SECONDS = 15
+
+# Upload ledger directory. Resources uploaded by resource uploader jobs are recorded in this directory.
+UPLOAD_LEDGER_DIR = os.path.join(TPA_ROOT_DIR, 'ledger')
+
+# Watermark directory. Translations imported by translation uploader jobs are recorded in this directory
+# so that unchanged translations are not downloaded again.
+WATERMARK_DIR = os.path.join(TPA_ROOT_DIR, 'watermark')
+
+# Project snapshot directory. Snapshots of data to show projects are stored in this directory.
+SNAPSHOT_DIR = os.path.join(TPA_ROOT_DIR, 'snapshot')
+
+# Interval in seconds to refresh project snapshots in background. Snapshot of a project is also
+# refreshed right after execution of a job in the project.
+PROJECT_SNAPSHOT_INTERVAL_SECONDS = 900
+
 # Cache Directory.
 CACHE_DIR = '/path/to/cache/dir'
 
+# String store database (translation strings and source string details). It is created in CACHE_DIR.
+STRING_STORE_FILENAME = 'strings.db'
+
+# Strings of a resource language (and source string details) not stored again within this period are purged from
+# string store, so that the database does not grow with resources no longer queried. Strings are kept longer than
+# time-to-live (CACHE_TTL_SECONDS) since they are also used for search.
+STRING_STORE_RETENTION_SECONDS = 7 * 86400
+
+# Time-to-live of cache files in seconds, per entry type (see core/cache.py).
+CACHE_TTL_SECONDS = {'projects': 600, 'project': 3600, 'resource': 3600, 'strings': 1800, 'source': 86400}
+
+# Total size of cache files in bytes. Least recently used files are evicted when exceeded.
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
 #
 # Tornado server
 #
+# Thread pools for API handlers. Blocking work of API requests runs in the pools so that IOLoop shared
+# with the scheduler is not blocked. Local file I/O and git commands run in API_IO_WORKERS threads, and
+# queries to translation/resource platforms run in API_PLATFORM_WORKERS threads.
+API_IO_WORKERS = 8
+API_PLATFORM_WORKERS = 16
+
+# Max number of requests processed at the same time for each API endpoint. Other requests to the
+# endpoint wait for them to finish. Endpoints which query translation/resource platforms have a lower limit.
+API_ENDPOINT_CONCURRENCY = 8
+API_PLATFORM_ENDPOINT_CONCURRENCY = 4
+
 # tornado server port for scheduler.
 HTTP_PORT='8080'
 
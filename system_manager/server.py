@@ -2,17 +2,18 @@ import os
 import sys
 import signal
 import json
-import requests
-from requests.exceptions import RequestException, HTTPError
 import urllib
 
 import logging
 logger = logging.getLogger(__name__)
 
 import tornado.httpserver
+import tornado.httpclient
 import tornado.ioloop
 import tornado.web
 import tornado.options
+import tornado.gen
+import tornado.locks
 
 from apscheduler.schedulers.tornado import TornadoScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
@@ -22,91 +23,134 @@ import settings
 
 
 class IndexHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self):
         self.render("index.html")
 
-def _call_api(url):
+@tornado.gen.coroutine
+def _fetch(url, method='GET'):
+    """ Call TPA API with pooled non-blocking HTTP client. Return the response, or None on any errors
+        (including timeout, TPA_API_TIMEOUT_SECONDS).
+    """
     try:
-        r = requests.get(url)
-        r.raise_for_status()
-        j = json.loads(r.text)
-    except (RequestException, HTTPError) as e:
+        r = yield tornado.httpclient.AsyncHTTPClient().fetch(url, method=method, body='' if method == 'POST' else None, request_timeout=settings.TPA_API_TIMEOUT_SECONDS)
+    except (tornado.httpclient.HTTPError, IOError) as e:
         logger.error("Failed API call: '{}', Reason: '{}'.".format(url, e))
-        return None 
+        raise tornado.gen.Return(None)
+    else:
+        raise tornado.gen.Return(r)
+
+def _parse_response(r):
+    try:
+        j = json.loads(r.body)
     except ValueError as e:
-        logger.error("Failed to parse API response. Reason: '{}', Response:'{}'.".format(e, r.text))
+        logger.error("Failed to parse API response. Reason: '{}', Response:'{}'.".format(e, r.body))
         return None 
     else:
-        logger.info(r.text)
+        logger.info(r.body)
         return j 
 
+@tornado.gen.coroutine
+def _call_api(url):
+    r = yield _fetch(url)
+    if r == None:
+        raise tornado.gen.Return(None)
+    raise tornado.gen.Return(_parse_response(r))
+
+@tornado.gen.coroutine
+def _post_api(url):
+    r = yield _fetch(url, 'POST')
+    if r == None:
+        raise tornado.gen.Return(None)
+    raise tornado.gen.Return(_parse_response(r))
+
+@tornado.gen.coroutine
+def _call_apis(urls):
+    """ Call TPA APIs concurrently, up to TPA_API_MAX_FANOUT calls at a time.
+        Return list of results for the urls, where result of a failed call is None.
+    """
+    semaphore = tornado.locks.Semaphore(settings.TPA_API_MAX_FANOUT)
+
+    @tornado.gen.coroutine
+    def call(url):
+        with (yield semaphore.acquire()):
+            j = yield _call_api(url)
+        raise tornado.gen.Return(j)
+
+    results = yield [call(url) for url in urls]
+    raise tornado.gen.Return(results)
+
+@tornado.gen.coroutine
 def _call_api_and_render(handler, url, html_template, error_message):
-    j = _call_api(url)
+    j = yield _call_api(url)
     if j != None:
         handler.render(html_template, data=j)
     else:
         handler.render('fatal_error.html', summary=error_message, details="")
 
 class ProjectDetailsHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, param):
         project_id = urllib.unquote(param)
         url = '{}/{}/details'.format(settings.TPA_API_PROJECT, project_id)
-        _call_api_and_render(self, url, 'project.html', "Failed to obtain project details.")
+        yield _call_api_and_render(self, url, 'project.html', "Failed to obtain project details.")
 
 class ListProjectsHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self):
         url = settings.TPA_API_PROJECTS
-        _call_api_and_render(self, url, 'projects.html', "Failed to obtain project listings.")
+        yield _call_api_and_render(self, url, 'projects.html', "Failed to obtain project listings.")
 
 class JobDetailsHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
         url = '{}/{}/details'.format(settings.TPA_API_JOB, job_id)
-        _call_api_and_render(self, url, 'job.html', "Failed to obtain job details.")
+        yield _call_api_and_render(self, url, 'job.html', "Failed to obtain job details.")
 
 def _get_all_jobs():
     url = settings.TPA_API_JOBS
     return  _call_api(url)
 
 class ListJobsHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self):
-        j = _get_all_jobs()
+        j = yield _get_all_jobs()
         if j != None:
             self.render("jobs.html", data=j)
         else:
             self.render('fatal_error.html', summary="Failed to obtain job listings.", details="")
 
 class DashboardHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self):
-        jobs = _get_all_jobs()
-        if jobs == None:
-            self.render('fatal_error.html', summary="Failed to obtain job listings.", details="")
+        url = "{}/exec/status".format(settings.TPA_API_JOBS)
+        j = yield _call_api(url) # the most recent exec status for each job.
+        if j != None:
+            self.render("dashboard.html", data=j)
         else:
-            lists = [] 
-            for x in jobs:
-                url = "{}/{}/exec/status".format(settings.TPA_API_JOB, x['id'])
-                j = _call_api(url)
-                if j:
-                    lists.append(j[0]) # only one exec stata is the retured array. 
-            self.render("dashboard.html", data=lists)
+            self.render('fatal_error.html', summary="Failed to obtain job execution status.", details="")
 
 class ResourceConfigHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, param):
         filename = urllib.quote(param, safe='')
         url = '{}/resource/{}'.format(settings.TPA_API_CONFIG, filename)
-        _call_api_and_render(self, url, 'resource_config.html', "Failed to obtain resource configuration context.")
+        yield _call_api_and_render(self, url, 'resource_config.html', "Failed to obtain resource configuration context.")
 
 class TranslationConfigHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, param):
         filename = urllib.quote(param, safe='')
         url = '{}/translation/{}'.format(settings.TPA_API_CONFIG, filename)
-        _call_api_and_render(self, url, 'translation_config.html', "Failed to obtain translation configuration context.")
+        yield _call_api_and_render(self, url, 'translation_config.html', "Failed to obtain translation configuration context.")
 
 class LogContextHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, param):
         log_path = urllib.quote(param, safe='')
         url = '{}/{}/context'.format(settings.TPA_API_LOG, log_path)
-        j = _call_api(url)
+        j = yield _call_api(url)
         if j:
             self.render('log.html', path=param, data=j)
         else:
@@ -121,11 +165,12 @@ def _get_translation_slugs(job_id):
     return _call_api(url)
 
 class CheckSlugsHandler(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, param):
         job_id = urllib.unquote(param)
-        r = _get_resource_slugs(job_id)
+        r = yield _get_resource_slugs(job_id)
         if r:
-            t = _get_translation_slugs(job_id)
+            t = yield _get_translation_slugs(job_id)
             if t:
                 results = []
                 for x in r:
@@ -150,23 +195,25 @@ class CheckSlugsHandler(tornado.web.RequestHandler):
             self.render('fatal_error.html', summary="Failed to obtain job resource slugs.", details="")
 
 class ListTranslationProjects(tornado.web.RequestHandler):
+    @tornado.gen.coroutine
     def get(self, arg):
         platform = urllib.unquote(arg)
         url = '{}/{}/projects'.format(settings.TPA_API_TRANSLATION, platform)
-        j = _call_api(url)
+        j = yield _call_api(url)
         if j != None:
             self.render("translation_projects.html", platform=platform, projects=j)
         else:
             self.render('fatal_error.html', summary="Failed to obtain translation project listings.", details="")
 
-def _get_translation_project_resource_details(base_url, resources):
-    l = []
-    for x in resources:
-        url = '{}/resource/{}/details'.format(base_url, x['slug'])
-        j = _call_api(url)
-        if j != None:
-            l.append(j)
-    return l
+@tornado.gen.coroutine
+def _get_translation_project_resource_details(platform, pslug):
+    # details of all resources in the project are obtained at once.
+    url = '{}/{}/project/{}/resources/details'.format(settings.TPA_API_TRANSLATION, platform, pslug)
+    j = yield _call_api(url)
+    if j != None:
+        raise tornado.gen.Return(j)
+    else:
+        raise tornado.gen.Return([])
 
 def _get_translation_platform_project_details(platform, pslug):
     url = '{}/{}/project/{}/details'.format(settings.TPA_API_TRANSLATION, platform, pslug)
@@ -174,13 +221,13 @@ def _get_translation_platform_project_details(platform, pslug):
 
 class TranslationProjectDetails(tornado.web.RequestHandler):
     """ Returns project details and details for each resource in the project. """
+    @tornado.gen.coroutine
     def get(self, arg1, arg2):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
-        j = _get_translation_platform_project_details(platform, pslug)
+        # project details and resource details are obtained concurrently.
+        j, l = yield [_get_translation_platform_project_details(platform, pslug), _get_translation_project_resource_details(platform, pslug)]
         if j != None:
-            base_url = '{}/{}/project/{}'.format(settings.TPA_API_TRANSLATION, platform, pslug)
-            l = _get_translation_project_resource_details(base_url, j['resources'])
             self.render("translation_project_details.html", platform=platform, details=j, resources=l)
         else:
             self.render('fatal_error.html', summary="Failed to obtain translation project details.", details="")
@@ -191,34 +238,41 @@ def _get_translation_platform_translation_strings(platform, pslug, rslug, lang):
 
 class TranslationProjectTranslationStrings(tornado.web.RequestHandler):
     """ Returns summary of translated strings for specified language of resource in the project. """
+    @tornado.gen.coroutine
     def get(self, arg1, arg2, arg3, arg4):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
         rslug = urllib.unquote(arg3)
         lang = urllib.unquote(arg4)
-        j = _get_translation_platform_translation_strings(platform, pslug, rslug, lang)
+        j = yield _get_translation_platform_translation_strings(platform, pslug, rslug, lang)
         if j != None:
             self.render("translation_project_translation_strings.html", data=j)
         else:
             self.render('fatal_error.html', summary="Failed to obtain translation project translation strings.", details="")
 
-def _get_translation_platform_source_details(platform, pslug, rslug, source_key):
-    url = '{}/{}/project/{}/resource/{}/source/{}/details'.format(settings.TPA_API_TRANSLATION, platform, pslug, rslug, source_key)
-    return _call_api(url)
+def _prefetch_translation_platform_source_details(platform, pslug, rslug):
+    url = '{}/{}/project/{}/resource/{}/source/prefetch'.format(settings.TPA_API_TRANSLATION, platform, pslug, rslug)
+    return _post_api(url)
+
+def _get_translation_platform_source_details_url(platform, pslug, rslug, source_key):
+    return '{}/{}/project/{}/resource/{}/source/{}/details'.format(settings.TPA_API_TRANSLATION, platform, pslug, rslug, source_key)
 
 class TranslationProjectSourceStringDetails(tornado.web.RequestHandler):
     """ Returns list of details of source string for specified resource in the project. """
+    @tornado.gen.coroutine
     def get(self, arg1, arg2, arg3):
         platform = urllib.unquote(arg1)
         pslug = urllib.unquote(arg2)
         rslug = urllib.unquote(arg3)
-        p = _get_translation_platform_project_details(platform, pslug)
+        # details of all source strings are obtained at once, so that following queries for each string are served from cache.
+        p, _ = yield [_get_translation_platform_project_details(platform, pslug), _prefetch_translation_platform_source_details(platform, pslug, rslug)]
         if p:
-            l = _get_translation_platform_translation_strings(platform, pslug, rslug, p['source_language_code'])
+            l = yield _get_translation_platform_translation_strings(platform, pslug, rslug, p['source_language_code'])
             if l:
+                # strings whose details are not obtained are not listed.
+                details = yield _call_apis([_get_translation_platform_source_details_url(platform, pslug, rslug, x['key']) for x in l])
                 r = []
-                for x in l:
-                    j = _get_translation_platform_source_details(platform, pslug, rslug, x['key'])
+                for x, j in zip(l, details):
                     if j:
                         if platform == 'transifex':
                             j['source'] = x['source']
@@ -237,6 +291,7 @@ class SystemManagerServer():
     def __init__(self):
         self._jobs = []
         tornado.options.parse_command_line()
+        tornado.httpclient.AsyncHTTPClient.configure(None, max_clients=settings.TPA_API_MAX_CLIENTS)
         application = tornado.web.Application(
                 [
                     (r'/', IndexHandler),
@@ -12,5 +12,14 @@ TPA_API_PROJECT = urlparse.urljoin(TPA_SERVER, 'api/v0/project')
 TPA_API_PROJECTS = urlparse.urljoin(TPA_SERVER, 'api/v0/projects')
 TPA_API_TRANSLATION= urlparse.urljoin(TPA_SERVER, 'api/v0/translation')
 
+# Timeout in seconds for each TPA API call.
+TPA_API_TIMEOUT_SECONDS = 60
+
+# Max number of TPA API calls in flight at the same time (connections of the HTTP client).
+TPA_API_MAX_CLIENTS = 20
+
+# Max number of TPA API calls issued at the same time to render a page.
+TPA_API_MAX_FANOUT = 10
+
 # Port for this server.
 HTTP_PORT='8081'
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import tornado.gen
+import tornado.web
+import tornado.testing
+
+import settings
+import apih
+import core.translation as translation
+import core.plugins.transifex.utils as transifex_utils
+
+URL = '/api/v0/translation/transifex/project/p/resource/r/translation/ja/strings'
+
+class _Response(object):
+    def __init__(self, strings):
+        self._text = json.dumps(strings).encode('utf-8')
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self._text), chunk_size):
+            yield self._text[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+class _Results(object):
+    def __init__(self, response):
+        self.succeeded = True
+        self.response = response
+        self.message = None
+
+class TranslationTranslationStringsHandlerTest(tornado.testing.AsyncHTTPTestCase):
+    NUM_STRINGS = apih.TranslationTranslationStringsHandler.FLUSH_INTERVAL * 2 + 10
+
+    def setUp(self):
+        self._cache_dir = tempfile.mkdtemp()
+        self._orig = (settings.CACHE_DIR, translation.creds.get, transifex_utils.transifex.stream_translation_strings_details)
+        settings.CACHE_DIR = self._cache_dir
+        translation.creds.get = lambda platform: {'username': 'u', 'userpasswd': 'p'}
+        self.fetched = 0
+        def stream(pslug, rslug, lang, creds):
+            self.fetched += 1
+            strings = [{'key': 'k{}'.format(i), 'source_string': 's{}'.format(i), 'translation': 't{}'.format(i),
+                        'reviewed': False, 'last_update': '2018-01-01'} for i in range(self.NUM_STRINGS)]
+            return _Results(_Response(strings))
+        transifex_utils.transifex.stream_translation_strings_details = stream
+        super(TranslationTranslationStringsHandlerTest, self).setUp()
+
+    def tearDown(self):
+        super(TranslationTranslationStringsHandlerTest, self).tearDown()
+        settings.CACHE_DIR, translation.creds.get, transifex_utils.transifex.stream_translation_strings_details = self._orig
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    def get_app(self):
+        return tornado.web.Application([
+            (r'/api/v0/translation/([^/]+)/project/([^/]+)/resource/([^/]+)/translation/([^/]+)/strings', apih.TranslationTranslationStringsHandler)])
+
+    def _get_keys(self):
+        response = self.fetch(URL)
+        self.assertEqual(response.code, 200)
+        return [x['key'] for x in json.loads(response.body.decode('utf-8'))]
+
+    def test_streams_strings_from_platform_and_string_store(self):
+        expected = ['k{}'.format(i) for i in range(self.NUM_STRINGS)]
+        # from translation platform, stored in string store while streaming.
+        self.assertEqual(self._get_keys(), expected)
+        self.assertEqual(self.fetched, 1)
+        # from string store.
+        self.assertEqual(self._get_keys(), expected)
+        self.assertEqual(self.fetched, 1)
+
+class StringsReaderTest(tornado.testing.AsyncTestCase):
+    def _start(self, reader):
+        self.read = []
+        self.closed = False
+        def strings():
+            try:
+                for i in range(100):
+                    self.read.append(i)
+                    yield i
+            finally:
+                self.closed = True
+        t = threading.Thread(target=reader.read, args=(strings,))
+        t.start()
+        return t
+
+    @tornado.testing.gen_test
+    def test_reading_waits_for_slow_consumer(self):
+        reader = apih._StringsReader(self.io_loop, 1)
+        t = self._start(reader)
+        yield tornado.gen.sleep(0.2)
+        # True and [0] are pending, and reading thread waits with 1 read.
+        self.assertEqual(self.read, [0, 1])
+        x = yield reader.get()
+        self.assertEqual(x, True)
+        reader.done()
+        l = yield reader.get()
+        self.assertEqual(l, [0])
+        reader.done()
+        yield tornado.gen.sleep(0.2)
+        self.assertEqual(self.read, [0, 1, 2, 3])
+        reader.cancel()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertTrue(self.closed)
+        self.assertEqual(len(self.read), 4)
+
+    @tornado.testing.gen_test
+    def test_cancel_wakes_up_consumer_waiting_for_slow_reading(self):
+        reader = apih._StringsReader(self.io_loop, 1)
+        resume = threading.Event()
+        closed = []
+        def strings():
+            try:
+                yield 0
+                resume.wait(5)
+                yield 1
+            finally:
+                closed.append(True)
+        t = threading.Thread(target=reader.read, args=(strings,))
+        t.start()
+        for i in range(2):
+            yield reader.get()
+            reader.done()
+        f = reader.get()
+        self.io_loop.call_later(0.1, reader.cancel)
+        x = yield f
+        self.assertEqual(x, None)
+        self.assertTrue(reader.is_cancelled())
+        resume.set()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(closed, [True])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,8 +10,10 @@ import core.job as job
 import core.resource as resource
 import core.translation as translation
 import core.repository as repository
+import core.plugins.execstats as execstats
+from core.plugins.ledger import UploadLedger
 
-def upload_resource(translation_repository, resource_bundle, log_dir):
+def upload_resource(translation_repository, resource_bundle, log_dir, ledger=None):
     success = True
     trans_bundles = []
     for resource in resource_bundle:
@@ -24,22 +26,40 @@ def upload_resource(translation_repository, resource_bundle, log_dir):
                 'reason': "Resource not available in local repository.",
                 'resource_full_path': os.path.join(resource.repository_name, resource.resource_path)
                 }
-            logger.info("ExecStats='{}'".format(json.dumps(d)))
+            execstats.write(log_dir, d)
             continue
 
-        if not translation_repository.import_resource(resource):
+        if not resource.changed:
+            d = {
+                'operation': "ResourceUpload",
+                'results': "SKIPPED",
+                'reason': "Resource not changed since last upload.",
+                'resource_full_path': os.path.join(resource.repository_name, resource.resource_path)
+                }
+            execstats.write(log_dir, d)
+            continue
+
+        if translation_repository.import_resource(resource):
+            if ledger:
+                ledger.record(resource.resource_path, resource.commit, resource.content_hash)
+        else:
             success = False
 
+    if ledger and resource_bundle.head_commit:
+        ledger.commit = resource_bundle.head_commit
+        ledger.save()
+
     return success
 
 def upload_translation(resource_repository, resource_bundle, translation_repository, log_dir, trans_config):
     trans_bundles = []
+    require_all_languages = resource_repository.hold_pullrequest_until_all_languages_completes()
     for resource in resource_bundle:
         if not resource.available():
             logger.info("No resource available in local: '{}'".format(resource.resource_path))
             continue
 
-        trans_bundle = translation_repository.get_translation_bundle(resource.repository_name, resource.repository_branch, resource.resource_path, resource.resource_translations)
+        trans_bundle = translation_repository.get_translation_bundle(resource.repository_name, resource.repository_branch, resource.resource_path, resource.resource_translations, require_all_languages)
         if trans_bundle:
             trans_bundles.append(trans_bundle)
         else:
@@ -50,11 +70,24 @@ def upload_translation(resource_repository, resource_bundle, translation_reposit
         logger.info("Created branch for changes: '{}'.".format(feature_branch_name))
         additional_reviewers = trans_config.project_reviewers
         results = resource_repository.submit_pullrequest(feature_branch_name, additional_reviewers)
-        return results.errors == 0
+        if results.errors == 0:
+            _commit_watermarks(translation_repository, log_dir)
+            return True
+        else:
+            return False
     else:
         logger.info("No branch created for changes.")
+        _commit_watermarks(translation_repository, log_dir)
         return True
 
+def _commit_watermarks(translation_repository, log_dir):
+    # import_bundles() returns None also on errors, so exec stats are checked before recording watermarks.
+    records = execstats.read(log_dir) or []
+    if any(d.get('results') == 'FAILURE' for d in records):
+        logger.info("Translation watermarks not recorded due to failure(s) in this execution.")
+        return
+    translation_repository.commit_watermarks()
+
 def _upload(params):
     logger.info("Start processing: '{}'...".format(params['resource_config_file']))
 
@@ -82,7 +115,12 @@ def _upload(params):
         logger.info("End processing: '{}'.".format(params['resource_config_file']))
         return False
 
-    resource_bundle = resource_repo.get_resource_bundle()
+    # Upload ledger is used to skip uploading resources which have not been changed since the last upload.
+    ledger = None
+    if params['upload_destination_string'] == 'translation_repository':
+        ledger = UploadLedger(os.path.basename(params['resource_config_file']), os.path.basename(params['translation_config_file']))
+
+    resource_bundle = resource_repo.get_resource_bundle(ledger)
     num_resources = len(resource_bundle)
     if num_resources == 0:
         logger.info("End processing: '{}'.".format(params['resource_config_file']))
@@ -90,7 +128,7 @@ def _upload(params):
 
     success = False
     if params['upload_destination_string'] == 'translation_repository':
-        success = upload_resource(trans_repo, resource_bundle, params['log_dir'])
+        success = upload_resource(trans_repo, resource_bundle, params['log_dir'], ledger)
     elif params['upload_destination_string'] == 'resource_repository':
         success = upload_translation(resource_repo, resource_bundle, trans_repo, params['log_dir'], trans_config)
     else:
@@ -130,7 +168,7 @@ class ErrorFilter(logging.Filter):
     def filter(self, rec):
         return rec.levelno == logging.ERROR
 
-def _setup_logger():
+def setup_logger():
     global logger
     logger = logging.getLogger('tpa')
     logger.setLevel(logging.INFO)
@@ -150,19 +188,24 @@ def _setup_logger():
     h2.addFilter(ErrorFilter())
     logger.addHandler(h2)
 
-def main(argv):
-    _setup_logger()
+def run(argv):
+    """ Run uploader with given arguments. Return exit code. """
     params = _check_args(argv)
     if not params:
-        logging.shutdown()
-        sys.exit(1)
+        return 1
 
-    if _upload(params):
-        logging.shutdown()
-        sys.exit(0)
+    success = _upload(params)
+    execstats.write_summary(params['log_dir'])
+    if success:
+        return 0
     else:
-        logging.shutdown()
-        sys.exit(1)
+        return 1
+
+def main(argv):
+    setup_logger()
+    exit_code = run(argv)
+    logging.shutdown()
+    sys.exit(exit_code)
 
 if __name__ == '__main__':
     main(sys.argv[1:])
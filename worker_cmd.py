@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import resource
+import traceback
+
+import uploader_cmd
+
+def _run_job(argv, log_path, err_path):
+    """ Run uploader with stdout and stderr redirected to the log files of the execution.
+        Return exit code.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout = os.dup(1)
+    saved_stderr = os.dup(2)
+    with open(log_path, 'w') as log, open(err_path, 'w') as err:
+        os.dup2(log.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        try:
+            exit_code = uploader_cmd.run(argv)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_stdout, 1)
+            os.dup2(saved_stderr, 2)
+            os.close(saved_stdout)
+            os.close(saved_stderr)
+    return exit_code
+
+def _serve(channel_in, channel_out):
+    """ Execute jobs requested on channel_in until it is closed. See core/worker.py for the protocol. """
+    jobs = 0
+    for line in iter(channel_in.readline, ''):
+        request = json.loads(line)
+        exit_code = _run_job(request['argv'], request['log_path'], request['err_path'])
+        jobs += 1
+        reply = {
+            'exit_code': exit_code,
+            'jobs': jobs,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            }
+        channel_out.write(json.dumps(reply) + '\n')
+        channel_out.flush()
+
+def main():
+    # Keep original stdout for replies, and send anything else written to stdout
+    # outside of a job to /dev/null.
+    channel_out = os.fdopen(os.dup(1), 'w')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    uploader_cmd.setup_logger()
+    _serve(sys.stdin, channel_out)
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()